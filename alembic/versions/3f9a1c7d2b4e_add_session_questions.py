@@ -0,0 +1,54 @@
+"""Add session_questions
+
+Revision ID: 3f9a1c7d2b4e
+Revises: 6c544ded48dd
+Create Date: 2026-10-18 10:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9a1c7d2b4e'
+down_revision: Union[str, Sequence[str], None] = '6c544ded48dd'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('session_questions',
+    sa.Column('session_id', sa.Integer(), nullable=False),
+    sa.Column('position', sa.Integer(), nullable=False),
+    sa.Column('question_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['question_id'], ['questions.id'], ),
+    sa.ForeignKeyConstraint(['session_id'], ['quiz_sessions.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('session_id', 'position')
+    )
+    op.create_index(op.f('ix_session_questions_question_id'), 'session_questions', ['question_id'], unique=False)
+    op.create_index('ix_user_answers_session_question', 'user_answers', ['session_id', 'question_id'], unique=False)
+
+    # Existing sessions served the first questions stored under their topic, a quiz being
+    # 5 questions long. Link those, not every question the topic has accumulated since.
+    op.execute("""
+        INSERT INTO session_questions (session_id, position, question_id)
+        SELECT session_id, position, question_id
+        FROM (
+            SELECT s.id AS session_id,
+                   ROW_NUMBER() OVER (PARTITION BY s.id ORDER BY q.id) - 1 AS position,
+                   q.id AS question_id
+            FROM quiz_sessions s
+            JOIN questions q ON q.topic = s.topic
+        ) numbered
+        WHERE position < 5
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_user_answers_session_question', table_name='user_answers')
+    op.drop_index(op.f('ix_session_questions_question_id'), table_name='session_questions')
+    op.drop_table('session_questions')
@@ -0,0 +1,36 @@
+"""Add quiz_sessions.question_count
+
+Revision ID: 5a7c9e1b3d6f
+Revises: e1f3a5c7d9b2
+Create Date: 2026-10-18 18:22:36.481290
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a7c9e1b3d6f'
+down_revision: Union[str, Sequence[str], None] = 'e1f3a5c7d9b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('quiz_sessions', sa.Column('question_count', sa.Integer(), nullable=True))
+
+    # Existing sessions are as long as the questions linked to them
+    op.execute("""
+        UPDATE quiz_sessions
+        SET question_count = (
+            SELECT COUNT(*) FROM session_questions WHERE session_questions.session_id = quiz_sessions.id
+        )
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('quiz_sessions', 'question_count')
@@ -0,0 +1,36 @@
+"""Add quiz_sessions.answered_count
+
+Revision ID: 8b2e4f6a1c3d
+Revises: 3f9a1c7d2b4e
+Create Date: 2026-10-18 14:05:12.604113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b2e4f6a1c3d'
+down_revision: Union[str, Sequence[str], None] = '3f9a1c7d2b4e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('quiz_sessions', sa.Column('answered_count', sa.Integer(), server_default='0', nullable=True))
+
+    # Backfill from the answers already recorded
+    op.execute("""
+        UPDATE quiz_sessions
+        SET answered_count = (
+            SELECT COUNT(DISTINCT question_id) FROM user_answers WHERE user_answers.session_id = quiz_sessions.id
+        )
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('quiz_sessions', 'answered_count')
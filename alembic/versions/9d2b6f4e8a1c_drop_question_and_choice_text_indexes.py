@@ -0,0 +1,33 @@
+"""Drop the B-tree indexes on questions.question_text and choices.choice_text
+
+Revision ID: 9d2b6f4e8a1c
+Revises: 5a7c9e1b3d6f
+Create Date: 2026-10-18 20:41:07.905316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d2b6f4e8a1c'
+down_revision: Union[str, Sequence[str], None] = '5a7c9e1b3d6f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Nothing looks questions or choices up by their full text, near-duplicate questions
+    # are found by the in-memory question index. The tables predate the migrations, so
+    # databases created without create_all may not have these indexes.
+    op.drop_index('ix_questions_question_text', table_name='questions', if_exists=True)
+    op.drop_index('ix_choices_choice_text', table_name='choices', if_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index('ix_choices_choice_text', 'choices', ['choice_text'], unique=False)
+    op.create_index('ix_questions_question_text', 'questions', ['question_text'], unique=False)
@@ -0,0 +1,148 @@
+"""Add topics with full-text topic search
+
+Revision ID: b7e3d1f9c2a4
+Revises: 9d2b6f4e8a1c
+Create Date: 2026-10-18 22:05:13.672148
+
+"""
+import re
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e3d1f9c2a4'
+down_revision: Union[str, Sequence[str], None] = '9d2b6f4e8a1c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_topics = sa.table('topics', sa.column('key', sa.String), sa.column('name', sa.String),
+                   sa.column('question_count', sa.Integer), sa.column('updated_at', sa.DateTime))
+_topic_stats = sa.table('topic_stats', sa.column('topic', sa.String), sa.column('attempts', sa.Integer),
+                        sa.column('total_score', sa.Integer), sa.column('total_questions', sa.Integer),
+                        sa.column('best_score', sa.Integer), sa.column('last_completed_at', sa.DateTime))
+# Tables whose rows name their topic, oldest first when choosing a topic's spelling
+_TOPIC_TABLES = ('questions', 'quiz_sessions', 'quiz_results')
+
+
+def _clean(topic: str) -> str:
+    # core.topic_names.clean_topic and normalize_topic as of this revision
+    return re.sub(r"\s+", " ", topic).strip()
+
+
+def _normalize(topic: str) -> str:
+    return _clean(topic).casefold()
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+    op.create_table('topics',
+    sa.Column('key', sa.String(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('question_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('key')
+    )
+
+    if dialect == 'postgresql':
+        op.create_index('ix_topics_name_tsv', 'topics', [sa.text("to_tsvector('simple', name)")],
+                        unique=False, postgresql_using='gin')
+        op.create_index('ix_topics_key_trgm', 'topics', ['key'], unique=False,
+                        postgresql_using='gin', postgresql_ops={'key': 'gin_trgm_ops'})
+    elif dialect == 'sqlite':
+        # Created before the backfill, so the triggers index the existing topics
+        op.execute("""
+            CREATE VIRTUAL TABLE topics_fts USING fts5(
+                name, content='topics', content_rowid='rowid', tokenize='unicode61 remove_diacritics 2'
+            )
+        """)
+        op.execute("""
+            CREATE TRIGGER topics_fts_insert AFTER INSERT ON topics BEGIN
+                INSERT INTO topics_fts (rowid, name) VALUES (new.rowid, new.name);
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER topics_fts_delete AFTER DELETE ON topics BEGIN
+                INSERT INTO topics_fts (topics_fts, rowid, name) VALUES ('delete', old.rowid, old.name);
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER topics_fts_update AFTER UPDATE OF name ON topics BEGIN
+                INSERT INTO topics_fts (topics_fts, rowid, name) VALUES ('delete', old.rowid, old.name);
+                INSERT INTO topics_fts (rowid, name) VALUES (new.rowid, new.name);
+            END
+        """)
+
+    # One topic per normalized spelling of the stored topics, named with the spelling of
+    # its oldest question (or session, or result) like register_topic would have. Every
+    # row is then moved to that name and the split topic_stats rows are merged, so any
+    # spelling finds the topic's questions, results and stats.
+    conn = op.get_bind()
+    names: dict[str, str] = {}
+    question_counts: dict[str, int] = {}
+    spellings: dict[str, set[str]] = {table: set() for table in _TOPIC_TABLES}
+    for table in _TOPIC_TABLES:
+        rows = conn.execute(sa.text(
+            f"SELECT topic, MIN(id), COUNT(*) FROM {table} WHERE topic IS NOT NULL GROUP BY topic ORDER BY MIN(id)"
+        ))
+        for topic, _, count in rows:
+            key = _normalize(topic)
+            if not key:
+                continue
+            names.setdefault(key, _clean(topic))
+            spellings[table].add(topic)
+            if table == 'questions':
+                question_counts[key] = question_counts.get(key, 0) + count
+    stats = conn.execute(sa.select(_topic_stats)).all()
+    for row in stats:
+        if _normalize(row.topic):
+            names.setdefault(_normalize(row.topic), _clean(row.topic))
+
+    if names:
+        conn.execute(_topics.insert().values(updated_at=sa.func.current_timestamp()), [
+            {'key': key, 'name': name, 'question_count': question_counts.get(key, 0)}
+            for key, name in names.items()
+        ])
+    for table, topics in spellings.items():
+        renames = [
+            {'name': names[_normalize(topic)], 'topic': topic}
+            for topic in topics if names[_normalize(topic)] != topic
+        ]
+        if renames:
+            conn.execute(sa.text(f"UPDATE {table} SET topic = :name WHERE topic = :topic"), renames)
+
+    merged: dict[str, list] = {}
+    for row in stats:
+        if _normalize(row.topic):
+            merged.setdefault(_normalize(row.topic), []).append(row)
+    for key, rows in merged.items():
+        name = names[key]
+        if len(rows) == 1 and rows[0].topic == name:
+            continue
+        completed = [row.last_completed_at for row in rows if row.last_completed_at is not None]
+        conn.execute(_topic_stats.delete().where(_topic_stats.c.topic.in_([row.topic for row in rows])))
+        conn.execute(_topic_stats.insert().values(
+            topic=name,
+            attempts=sum(row.attempts for row in rows),
+            total_score=sum(row.total_score for row in rows),
+            total_questions=sum(row.total_questions for row in rows),
+            best_score=max(row.best_score for row in rows),
+            last_completed_at=max(completed) if completed else None,
+        ))
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Renamed topics and merged topic_stats rows keep their canonical spelling
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.drop_index('ix_topics_key_trgm', table_name='topics')
+        op.drop_index('ix_topics_name_tsv', table_name='topics')
+    op.drop_table('topics')
+    if dialect == 'sqlite':
+        op.execute('DROP TABLE IF EXISTS topics_fts')
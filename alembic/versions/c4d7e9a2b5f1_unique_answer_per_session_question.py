@@ -0,0 +1,48 @@
+"""Unique answer per session question
+
+Revision ID: c4d7e9a2b5f1
+Revises: 8b2e4f6a1c3d
+Create Date: 2026-10-18 15:31:47.220918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d7e9a2b5f1'
+down_revision: Union[str, Sequence[str], None] = '8b2e4f6a1c3d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Keep the first answer to each question, later duplicates came from re-submits
+    op.execute("""
+        DELETE FROM user_answers
+        WHERE id NOT IN (SELECT MIN(id) FROM user_answers GROUP BY session_id, question_id)
+    """)
+
+    # Duplicates were also counted in the session totals
+    op.execute("""
+        UPDATE quiz_sessions
+        SET total_score = (
+                SELECT COUNT(*) FROM user_answers
+                WHERE user_answers.session_id = quiz_sessions.id AND user_answers.is_correct
+            ),
+            answered_count = (
+                SELECT COUNT(*) FROM user_answers WHERE user_answers.session_id = quiz_sessions.id
+            )
+    """)
+
+    op.drop_index('ix_user_answers_session_question', table_name='user_answers')
+    op.create_index('uq_user_answers_session_question', 'user_answers', ['session_id', 'question_id'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_user_answers_session_question', table_name='user_answers')
+    op.create_index('ix_user_answers_session_question', 'user_answers', ['session_id', 'question_id'], unique=False)
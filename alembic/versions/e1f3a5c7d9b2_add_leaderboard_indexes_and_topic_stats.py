@@ -0,0 +1,50 @@
+"""Add leaderboard indexes and topic_stats
+
+Revision ID: e1f3a5c7d9b2
+Revises: c4d7e9a2b5f1
+Create Date: 2026-10-18 16:48:03.915377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1f3a5c7d9b2'
+down_revision: Union[str, Sequence[str], None] = 'c4d7e9a2b5f1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('topic_stats',
+    sa.Column('topic', sa.String(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('total_score', sa.Integer(), nullable=False),
+    sa.Column('total_questions', sa.Integer(), nullable=False),
+    sa.Column('best_score', sa.Integer(), nullable=False),
+    sa.Column('last_completed_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('topic')
+    )
+    op.create_index('ix_quiz_results_leaderboard', 'quiz_results', [sa.text('score DESC'), 'completed_at', 'id'], unique=False)
+    op.create_index('ix_quiz_results_topic_leaderboard', 'quiz_results', ['topic', sa.text('score DESC'), 'completed_at', 'id'], unique=False)
+
+    # One pass over the existing results, finalize keeps the totals current from here on
+    op.execute("""
+        INSERT INTO topic_stats (topic, attempts, total_score, total_questions, best_score, last_completed_at)
+        SELECT topic, COUNT(*), COALESCE(SUM(score), 0), COALESCE(SUM(total_questions), 0),
+               COALESCE(MAX(score), 0), MAX(completed_at)
+        FROM quiz_results
+        WHERE topic IS NOT NULL
+        GROUP BY topic
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_quiz_results_topic_leaderboard', table_name='quiz_results')
+    op.drop_index('ix_quiz_results_leaderboard', table_name='quiz_results')
+    op.drop_table('topic_stats')
@@ -0,0 +1,81 @@
+"""
+Benchmark of the "agent" and "direct" generation modes against a scripted mock model.
+
+No real LLM is called. Both modes go through litellm's acompletion, which is replaced
+by the in-process MockModel from mock_llm.py:
+
+- agent mode: the first turn calls get_educational_context, the second calls
+  initialize_quiz_session with the quiz, the third is a closing message
+- direct mode: a single turn returning the quiz JSON
+- chunked mode: a `--long-quiz` questions quiz, too long for one reply, written by
+  concurrent direct turns of at most questions_per_chunk() questions each
+
+Each turn waits `--latency-ms` plus the completion length divided by
+`--tokens-per-second`, to mimic a hosted model. Tokens are estimated as characters / 4
+of the request and the reply. The table reports LLM turns, tokens and wall time per quiz.
+
+Usage:
+    uv run python benchmarks/bench_generation_modes.py [--runs 5] [--latency-ms 400]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--database-url", default="sqlite:///./bench_generation_modes.db")
+parser.add_argument("--runs", type=int, default=5)
+parser.add_argument("--latency-ms", type=float, default=400, help="Fixed time to first token per turn")
+parser.add_argument("--long-quiz", type=int, default=40, help="Questions of the chunked mode quiz")
+parser.add_argument("--tokens-per-second", type=float, default=150, help="Completion speed of the mock model")
+args = parser.parse_args()
+
+# The app reads its settings at import time
+os.environ["DATABASE_URL"] = args.database_url
+os.environ.setdefault("OPEN_ROUTER_API_KEY", "benchmark")
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
+os.environ["QUIZ_CACHE_PREWARM_TOPICS"] = "0"
+os.environ["LOG_FILE"] = ""
+
+from app.core.config import settings
+from app.core.database import Base, engine
+from app.services import generation
+from mock_llm import MockModel
+
+async def main():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    model = MockModel(args.latency_ms, args.tokens_per_second)
+    print(f"{args.runs} quizzes per mode, {args.latency_ms:.0f}ms latency, {args.tokens_per_second:.0f} tokens/s")
+    print(f"{'mode':<7} | {'turns':>5} | {'tokens in':>9} | {'tokens out':>10} | {'median ms':>9}")
+    print("-" * 55)
+    with patch("google.adk.models.lite_llm.acompletion", model.acompletion), \
+            patch("litellm.acompletion", model.acompletion):
+        for mode in ("agent", "direct", "chunked"):
+            # Chunked mode is picked by run_generation for quizzes longer than one reply
+            settings.GENERATION_MODE = "direct" if mode == "chunked" else mode
+            question_count = args.long_quiz if mode == "chunked" else 5
+            timings = []
+            model.reset()
+            for _ in range(args.runs):
+                start = time.perf_counter()
+                await generation.run_generation("Benchmark", question_count, generation._noop_progress)
+                timings.append(time.perf_counter() - start)
+            timings.sort()
+            print(
+                f"{mode:<7} | {model.turns / args.runs:>5.1f} | {model.prompt_tokens // args.runs:>9} | "
+                f"{model.completion_tokens // args.runs:>10} | {timings[len(timings) // 2] * 1000:>9.0f}"
+            )
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,129 @@
+"""
+Benchmark for the initialize_quiz_session tool.
+
+Compares the previous row-by-row implementation (one commit and refresh per question)
+with the batched single-transaction path, for quizzes of 5, 50 and 500 questions.
+"bulk" inserts every question, "reuse" saves a quiz whose questions are already stored
+(QUESTION_REUSE_SIMILAR) and only links them to the new session.
+Database round trips are counted with SQLAlchemy cursor events.
+
+On PostgreSQL the question insert is one batched INSERT .. RETURNING. SQLite has no
+implicit insert sentinel, so SQLAlchemy issues one INSERT per question to keep the
+returned ids in order, still inside the single transaction.
+
+Usage:
+    uv run python benchmarks/bench_initialize_quiz_session.py [--database-url sqlite:///./bench.db]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--database-url", default="sqlite:///./bench_initialize_quiz_session.db")
+parser.add_argument("--sizes", default="5,50,500", help="Comma separated quiz sizes")
+parser.add_argument("--repeat", type=int, default=5, help="Runs per size, the median is reported")
+args = parser.parse_args()
+
+# The app reads its settings at import time
+os.environ["DATABASE_URL"] = args.database_url
+os.environ.setdefault("OPEN_ROUTER_API_KEY", "benchmark")
+
+from sqlalchemy import event
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, Base, engine
+from app.agent.tools import initialize_quiz_session
+from app.models.quiz import Question, Choice
+from app.models.session import QuizSession
+import app.models  # noqa: F401  (registers the tables)
+
+class RoundTripCounter:
+    def __init__(self):
+        self.statements = 0
+        self.commits = 0
+
+    def reset(self):
+        self.statements = 0
+        self.commits = 0
+
+counter = RoundTripCounter()
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    counter.statements += 1
+
+@event.listens_for(engine.sync_engine, "commit")
+def _count_commit(conn):
+    counter.commits += 1
+
+def build_payload(size: int) -> list[dict]:
+    return [
+        {
+            "question_text": f"Benchmark question {i}?",
+            "choices": [
+                {"choice_text": f"Choice {i}.{j}", "is_correct": j == 0}
+                for j in range(4)
+            ],
+        }
+        for i in range(size)
+    ]
+
+async def legacy_initialize_quiz_session(topic: str, questions_data: list[dict]) -> int:
+    """The previous implementation, kept here as the baseline."""
+    async with AsyncSessionLocal() as db:
+        db_session = QuizSession(topic=topic)
+        db.add(db_session)
+        await db.commit()
+        await db.refresh(db_session)
+        for q_data in questions_data:
+            db_question = Question(question_text=q_data["question_text"], topic=topic)
+            db.add(db_question)
+            await db.commit()
+            await db.refresh(db_question)
+            for c_data in q_data["choices"]:
+                db.add(Choice(
+                    choice_text=c_data["choice_text"],
+                    is_correct=c_data["is_correct"],
+                    question_id=db_question.id
+                ))
+        await db.commit()
+        return db_session.id
+
+async def measure(fn, payload: list[dict]) -> tuple[float, int, int]:
+    timings = []
+    for _ in range(args.repeat):
+        counter.reset()
+        start = time.perf_counter()
+        session_id = await fn("Benchmark", payload)
+        timings.append(time.perf_counter() - start)
+        assert session_id != -1, "quiz was not saved"
+    timings.sort()
+    return timings[len(timings) // 2], counter.statements, counter.commits
+
+async def main():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    print(f"{'questions':>9} | {'impl':<7} | {'statements':>10} | {'commits':>7} | {'median ms':>9}")
+    print("-" * 56)
+    for size in (int(s) for s in args.sizes.split(",")):
+        payload = build_payload(size)
+        for name, fn, reuse in (
+            ("legacy", legacy_initialize_quiz_session, False),
+            ("bulk", initialize_quiz_session, False),
+            ("reuse", initialize_quiz_session, True),
+        ):
+            settings.QUESTION_REUSE_SIMILAR = reuse
+            wall, statements, commits = await measure(fn, payload)
+            print(f"{size:>9} | {name:<7} | {statements:>10} | {commits:>7} | {wall * 1000:>9.1f}")
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,145 @@
+"""
+Benchmark of request throughput with logging off, with the previous synchronous
+handlers and with the queue based pipeline.
+
+Requests are POST /quiz/generate calls served from the question bank cache, which log
+one INFO line each and are sent through the ASGI app in process with httpx. A second
+table times the agent event dump (log_runner_events) with the old eager `str(event)`
+formatting against the lazy, sampled and truncated version.
+
+Usage:
+    uv run python benchmarks/bench_logging.py [--requests 2000] [--concurrency 20]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--database-url", default="sqlite:///./bench_logging.db")
+parser.add_argument("--requests", type=int, default=2000)
+parser.add_argument("--concurrency", type=int, default=20)
+parser.add_argument("--events", type=int, default=40, help="Runner events per dump")
+parser.add_argument("--event-size", type=int, default=20000, help="Characters in each event's str()")
+args = parser.parse_args()
+
+log_dir = tempfile.mkdtemp(prefix="bench_logging_")
+
+# The app reads its settings at import time
+os.environ["DATABASE_URL"] = args.database_url
+os.environ.setdefault("OPEN_ROUTER_API_KEY", "benchmark")
+os.environ["QUIZ_CACHE_PREWARM_TOPICS"] = "0"
+os.environ["LOG_FILE"] = os.path.join(log_dir, "app.log")
+
+import httpx
+from app.main import app
+from app.core.database import AsyncSessionLocal, Base, engine
+from app.core.logging_config import setup_logging, stop_logging
+from app.models.quiz import Question
+from app.services import quiz_cache
+from app.services.generation import log_runner_events, logger as generation_logger
+
+devnull = open(os.devnull, "w")
+
+def configure(mode: str) -> None:
+    stop_logging()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    logging.disable(logging.NOTSET)
+
+    if mode == "off":
+        logging.disable(logging.CRITICAL)
+    elif mode == "sync":
+        # The previous setup: formatting and file writes on the calling thread
+        formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+        for handler in (logging.StreamHandler(devnull),
+                        logging.FileHandler(os.path.join(log_dir, "sync.log"), encoding="utf-8")):
+            handler.setFormatter(formatter)
+            root.addHandler(handler)
+        root.setLevel(logging.INFO)
+    elif mode == "queue":
+        setup_logging(stream=devnull)
+
+async def seed_bank() -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as db:
+        questions = [Question(question_text=f"Benchmark question {i}?", topic="Benchmark") for i in range(5)]
+        db.add_all(questions)
+        await db.commit()
+        bank = quiz_cache.QuizBank(topic="Benchmark", question_ids=tuple(q.id for q in questions))
+    await quiz_cache.store_bank("Benchmark", bank)
+
+async def run_requests(client: httpx.AsyncClient) -> float:
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one():
+        async with semaphore:
+            response = await client.post("/quiz/generate", json={"topic": "Benchmark"})
+            assert response.status_code == 202, response.text
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(args.requests)))
+    return time.perf_counter() - start
+
+class FakeEvent:
+    def __init__(self, size: int):
+        self.size = size
+
+    def __str__(self):
+        return "e" * self.size
+
+def legacy_log_runner_events(topic: str, events: list) -> None:
+    """The previous event dump, formatted even when DEBUG is off."""
+    generation_logger.debug(f"--- runner events for topic '{topic}' ---")
+    for event in events:
+        generation_logger.debug(str(event))
+    generation_logger.debug("----------------------------")
+
+def time_event_dump(fn, level: int, runs: int = 50) -> float:
+    generation_logger.setLevel(level)
+    events = [FakeEvent(args.event_size) for _ in range(args.events)]
+    start = time.perf_counter()
+    for _ in range(runs):
+        fn("Benchmark", events)
+    generation_logger.setLevel(logging.NOTSET)
+    return (time.perf_counter() - start) / runs
+
+async def main():
+    await seed_bank()
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}")
+    print(f"{'logging':<8} | {'req/s':>8} | {'ms/req':>7}")
+    print("-" * 30)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for mode in ("off", "sync", "queue"):
+            configure(mode)
+            await run_requests(client)  # warm up
+            wall = await run_requests(client)
+            print(f"{mode:<8} | {args.requests / wall:>8.0f} | {wall * 1000 / args.requests:>7.2f}")
+
+    configure("queue")
+    print()
+    print(f"Event dump, {args.events} events of {args.event_size} chars")
+    print(f"{'impl':<7} | {'level':<5} | {'ms/run':>7}")
+    print("-" * 26)
+    for level in (logging.INFO, logging.DEBUG):
+        for name, fn in (("legacy", legacy_log_runner_events), ("lazy", log_runner_events)):
+            per_run = time_event_dump(fn, level)
+            print(f"{name:<7} | {logging.getLevelName(level):<5} | {per_run * 1000:>7.3f}")
+
+    stop_logging()
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
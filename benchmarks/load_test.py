@@ -0,0 +1,184 @@
+"""
+Load test of the full quiz flow: generate -> next -> submit -> finalize.
+
+Each simulated user asks for a quiz on one of `--topics` topics, polls the generation
+job until it finishes, answers every question and finalizes the quiz. `--users` users
+run with at most `--concurrency` at the same time. The report lists throughput and
+latency percentiles for every step.
+
+By default everything runs in this process: the mock LLM from mock_llm.py is started
+on `--mock-port`, the app is pointed at it through the LiteLlm settings and requests
+go through the ASGI app directly. Pass `--base-url` to load a running deployment
+instead (start it with the OPENROUTER_MODEL / OPENROUTER_API_BASE printed by
+mock_llm.py to keep it off OpenRouter).
+
+Usage:
+    uv run python benchmarks/load_test.py [--users 200] [--concurrency 20] [--topics 10]
+    uv run python benchmarks/load_test.py --base-url http://127.0.0.1:8000
+"""
+import argparse
+import asyncio
+import math
+import os
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--base-url", help="Load an already running app instead of an in-process one")
+parser.add_argument("--database-url", default="sqlite:///./load_test.db")
+parser.add_argument("--users", type=int, default=100)
+parser.add_argument("--concurrency", type=int, default=20)
+parser.add_argument("--topics", type=int, default=10, help="Distinct topics requested by the users")
+parser.add_argument("--mock-port", type=int, default=8900)
+parser.add_argument("--mock-latency-ms", type=float, default=400)
+parser.add_argument("--mock-tokens-per-second", type=float, default=150)
+parser.add_argument("--poll-interval", type=float, default=0.1, help="Seconds between job status polls")
+parser.add_argument("--seed", type=int, default=7)
+args = parser.parse_args()
+
+import httpx
+
+STEPS = ("generate", "job_wait", "next", "submit", "finalize", "session")
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return 0.0
+    return values[max(0, math.ceil(pct / 100 * len(values)) - 1)]
+
+class Recorder:
+    def __init__(self):
+        self.timings: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+
+    async def timed(self, step: str, request):
+        start = time.perf_counter()
+        response = await request
+        self.timings[step].append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            self.errors[step] += 1
+            response.raise_for_status()
+        return response.json()
+
+async def run_user(client: httpx.AsyncClient, recorder: Recorder, user: int, topic: str) -> None:
+    session_start = time.perf_counter()
+    job = await recorder.timed("generate", client.post("/quiz/generate", json={"topic": topic}))
+
+    wait_start = time.perf_counter()
+    while job["status"] not in ("completed", "failed"):
+        await asyncio.sleep(args.poll_interval)
+        job = (await client.get(f"/quiz/jobs/{job['job_id']}")).json()
+    recorder.timings["job_wait"].append(time.perf_counter() - wait_start)
+    if job["status"] == "failed":
+        recorder.errors["job_wait"] += 1
+        return
+
+    session_id = job["session_id"]
+    rng = random.Random(args.seed + user)
+    while True:
+        question = await recorder.timed("next", client.get("/quiz/next", params={"session_id": session_id}))
+        result = await recorder.timed("submit", client.post("/quiz/submit", json={
+            "session_id": session_id,
+            "question_id": question["id"],
+            "choice_id": rng.choice(question["choices"])["id"],
+        }))
+        if not result["next_question_available"]:
+            break
+
+    await recorder.timed("finalize", client.post("/quiz/finalize", json={
+        "session_id": session_id,
+        "user_name": f"Load User {user}",
+        "user_email": f"load{user}@example.com",
+    }))
+    recorder.timings["session"].append(time.perf_counter() - session_start)
+
+async def run_load(client: httpx.AsyncClient) -> tuple[Recorder, float]:
+    recorder = Recorder()
+    semaphore = asyncio.Semaphore(args.concurrency)
+    topics = [f"Load Topic {i}" for i in range(args.topics)]
+
+    async def limited(user: int):
+        async with semaphore:
+            try:
+                await run_user(client, recorder, user, topics[user % len(topics)])
+            except httpx.HTTPError:
+                pass  # counted by the recorder
+
+    start = time.perf_counter()
+    await asyncio.gather(*(limited(user) for user in range(args.users)))
+    return recorder, time.perf_counter() - start
+
+def report(recorder: Recorder, wall: float) -> None:
+    completed = len(recorder.timings["session"])
+    requests = sum(len(recorder.timings[step]) for step in ("generate", "next", "submit", "finalize"))
+    print(f"{args.users} users, concurrency {args.concurrency}, {args.topics} topics, {wall:.1f}s")
+    print(f"completed quizzes: {completed} ({completed / wall:.2f}/s), API requests: {requests / wall:.1f}/s")
+    print()
+    print(f"{'step':<9} | {'count':>6} | {'errors':>6} | {'p50 ms':>8} | {'p90 ms':>8} | {'p99 ms':>8} | {'max ms':>8}")
+    print("-" * 72)
+    for step in STEPS:
+        values = sorted(recorder.timings[step])
+        print(
+            f"{step:<9} | {len(values):>6} | {recorder.errors[step]:>6} | "
+            + " | ".join(f"{percentile(values, pct) * 1000:>8.1f}" for pct in (50, 90, 99, 100))
+        )
+
+def start_mock_llm():
+    """Runs the mock LLM server in a background thread of this process."""
+    import uvicorn
+    from mock_llm import MockModel, create_app
+
+    model = MockModel(args.mock_latency_ms, args.mock_tokens_per_second)
+    server = uvicorn.Server(uvicorn.Config(
+        create_app(model), host="127.0.0.1", port=args.mock_port, log_level="warning"
+    ))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, model
+
+async def main_in_process():
+    server, model = start_mock_llm()
+
+    # The app reads its settings at import time
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ["OPEN_ROUTER_API_KEY"] = "mock"
+    os.environ["OPENROUTER_MODEL"] = "openai/mock-educator"
+    os.environ["OPENROUTER_API_BASE"] = f"http://127.0.0.1:{args.mock_port}/v1"
+    os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
+    os.environ["QUIZ_CACHE_PREWARM_TOPICS"] = "0"
+    os.environ["LOG_FILE"] = ""
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    from app.main import app
+    from app.core.database import Base, engine
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=120) as client:
+        recorder, wall = await run_load(client)
+    report(recorder, wall)
+    print()
+    print(f"mock LLM: {model.turns} turns, {model.prompt_tokens} prompt tokens, {model.completion_tokens} completion tokens")
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
+    server.should_exit = True
+
+async def main_remote():
+    limits = httpx.Limits(max_connections=args.concurrency * 2)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=120, limits=limits) as client:
+        recorder, wall = await run_load(client)
+    report(recorder, wall)
+
+if __name__ == "__main__":
+    asyncio.run(main_remote() if args.base_url else main_in_process())
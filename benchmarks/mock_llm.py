@@ -0,0 +1,187 @@
+"""
+Deterministic stand-in for the OpenRouter model, for load tests without spending credits.
+
+Serves an OpenAI compatible POST /v1/chat/completions that plays the educator agent's
+side of the conversation:
+
+- tool calling requests: the first turn calls get_educational_context, the second calls
+  initialize_quiz_session with a generated quiz, later turns are a closing message
+- requests with a json_schema response_format (GENERATION_MODE=direct): the quiz JSON
+
+Every reply waits `--latency-ms` plus the completion length over `--tokens-per-second`.
+Token usage is estimated as characters / 4. Point the app at it through the LiteLlm
+settings used by create_educator_agent:
+
+    OPENROUTER_MODEL=openai/mock-educator
+    OPENROUTER_API_BASE=http://127.0.0.1:8900/v1
+
+Usage:
+    uv run python benchmarks/mock_llm.py [--port 8900] [--latency-ms 400] [--no-tool-calls]
+"""
+import argparse
+import asyncio
+import json
+import re
+import time
+import uuid
+import zlib
+from typing import Optional
+
+QUESTIONS_PER_QUIZ = 5
+
+def estimate_tokens(value) -> int:
+    text = value if isinstance(value, str) else json.dumps(value, default=str)
+    return max(1, len(text) // 4)
+
+def _field(message, name):
+    return message.get(name) if isinstance(message, dict) else getattr(message, name, None)
+
+def _text(content) -> str:
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content or ""
+
+def build_quiz(topic: str, questions: int = QUESTIONS_PER_QUIZ, focus: str = "") -> dict:
+    # Chunks on different focuses get different question numbers, like a real model would
+    # not repeat itself, and a reference keeps questions apart for the deduplication
+    first = zlib.crc32(focus.encode()) % 1000 if focus else 0
+    return {
+        "questions": [
+            {
+                "question_text": (
+                    f"{topic} question {first + i + 1} (ref {(first + i) * 7919 % 10007}): "
+                    "which statement is accurate?"
+                ),
+                "choices": [
+                    {"choice_text": f"{topic} option {j + 1} for question {i + 1}", "is_correct": j == i % 4}
+                    for j in range(4)
+                ],
+            }
+            for i in range(questions)
+        ]
+    }
+
+def _last_user_text(messages: list) -> str:
+    for message in reversed(messages):
+        if _field(message, "role") == "user":
+            return _text(_field(message, "content")).strip()
+    return ""
+
+def find_topic(messages: list) -> str:
+    text = _last_user_text(messages)
+    match = re.search(r"(?:questions about|quiz about|Topic:)\s*(.+?)\.?$", text)
+    return match.group(1).strip() if match else text or "General"
+
+def find_focus(messages: list) -> str:
+    match = re.search(r"focusing on (.+?)\. Topic:", _last_user_text(messages))
+    return match.group(1) if match else ""
+
+def find_question_count(messages: list) -> int:
+    match = re.search(r"(\d+) questions", _last_user_text(messages))
+    return int(match.group(1)) if match else QUESTIONS_PER_QUIZ
+
+class MockModel:
+    """Plays the model's side of the conversation and counts turns and tokens."""
+
+    def __init__(self, latency_ms: float = 400, tokens_per_second: float = 150, tool_calls: bool = True):
+        self.latency_ms = latency_ms
+        self.tokens_per_second = tokens_per_second
+        self.tool_calls = tool_calls
+        self.reset()
+
+    def reset(self) -> None:
+        self.turns = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def reply(self, request: dict) -> dict:
+        messages = request.get("messages") or []
+        topic = find_topic(messages)
+        questions = find_question_count(messages)
+        if request.get("response_format") or not self.tool_calls:
+            return {"role": "assistant", "content": json.dumps(build_quiz(topic, questions, find_focus(messages)))}
+
+        called = [
+            call["function"]["name"] if isinstance(call, dict) else call.function.name
+            for message in messages if _field(message, "role") == "assistant"
+            for call in (_field(message, "tool_calls") or [])
+        ]
+        if "get_educational_context" not in called:
+            tool, arguments = "get_educational_context", {"topic": topic}
+        elif "initialize_quiz_session" not in called:
+            tool, arguments = "initialize_quiz_session", {"topic": topic, "questions_data": build_quiz(topic, questions)["questions"]}
+        else:
+            return {"role": "assistant", "content": "Your quiz is ready! Good luck."}
+        return {
+            "role": "assistant",
+            "content": None,
+            "tool_calls": [{
+                "id": f"call_{uuid.uuid4().hex[:12]}",
+                "type": "function",
+                "function": {"name": tool, "arguments": json.dumps(arguments)},
+            }],
+        }
+
+    async def complete(self, request: dict) -> dict:
+        """Answers one chat completion request with an OpenAI style response body."""
+        message = self.reply(request)
+        prompt_tokens = estimate_tokens([request.get("messages"), request.get("tools"), request.get("response_format")])
+        completion_tokens = estimate_tokens(message)
+        self.turns += 1
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+
+        await asyncio.sleep(self.latency_ms / 1000 + completion_tokens / self.tokens_per_second)
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "mock-educator"),
+            "choices": [{
+                "index": 0,
+                "message": message,
+                "finish_reason": "tool_calls" if message.get("tool_calls") else "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    async def acompletion(self, **kwargs):
+        """Drop-in for litellm.acompletion, to run the mock in process."""
+        import litellm
+        return litellm.ModelResponse(**await self.complete(kwargs))
+
+def create_app(model: Optional[MockModel] = None):
+    from fastapi import FastAPI, Request
+
+    model = model or MockModel()
+    app = FastAPI(title="Mock educator LLM")
+
+    @app.post("/v1/chat/completions")
+    @app.post("/chat/completions")
+    async def chat_completions(request: Request):
+        return await model.complete(await request.json())
+
+    @app.get("/v1/stats")
+    async def stats():
+        return {"turns": model.turns, "prompt_tokens": model.prompt_tokens, "completion_tokens": model.completion_tokens}
+
+    return app
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=400)
+    parser.add_argument("--tokens-per-second", type=float, default=150)
+    parser.add_argument("--no-tool-calls", action="store_true", help="Always answer with the quiz JSON")
+    args = parser.parse_args()
+
+    model = MockModel(args.latency_ms, args.tokens_per_second, tool_calls=not args.no_tool_calls)
+    print(f"OPENROUTER_MODEL=openai/mock-educator OPENROUTER_API_BASE=http://{args.host}:{args.port}/v1")
+    uvicorn.run(create_app(model), host=args.host, port=args.port, log_level="warning")
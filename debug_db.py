@@ -1,10 +1,14 @@
-from src.app.core.database import SessionLocal
+import asyncio
+from sqlalchemy import select
+from src.app.core.database import AsyncSessionLocal
 from src.app.models.session import QuizSession
 
-db = SessionLocal()
-sessions = db.query(QuizSession).all()
-print("=== Quiz Sessions in Database ===")
-for s in sessions:
-    print(f'ID: {s.id}, Topic: "{s.topic}", Created: {s.created_at}')
-print(f"Total sessions: {len(sessions)}")
-db.close()
\ No newline at end of file
+async def main():
+    async with AsyncSessionLocal() as db:
+        sessions = (await db.scalars(select(QuizSession))).all()
+    print("=== Quiz Sessions in Database ===")
+    for s in sessions:
+        print(f'ID: {s.id}, Topic: "{s.topic}", Created: {s.created_at}')
+    print(f"Total sessions: {len(sessions)}")
+
+asyncio.run(main())
\ No newline at end of file
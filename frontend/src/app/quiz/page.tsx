@@ -27,8 +27,8 @@ export default function Home() {
     if (!topic) return;
     setLoading(true);
     try {
-      const res = await quizApi.generate(topic);
-      setSessionId(res.data.session_id);
+      const job = await quizApi.generateAndWait(topic);
+      setSessionId(job.session_id ?? null);
       setState('QUIZ');
     } catch (error) {
       console.error('Failed to start quiz', error);
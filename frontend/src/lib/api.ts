@@ -6,10 +6,16 @@ export const api = axios.create({
     baseURL: API_URL,
 });
 
-export interface QuizGenerateResponse {
-    session_id: number;
+export type QuizJobStatus = 'pending' | 'running' | 'completed' | 'failed';
+
+export interface QuizJobResponse {
+    job_id: string;
+    topic: string;
+    status: QuizJobStatus;
+    session_id?: number;
     message: string;
     total_questions: number;
+    error?: string;
 }
 
 export interface Choice {
@@ -48,9 +54,27 @@ export interface QuizResultResponse {
 }
 
 
+const JOB_POLL_INTERVAL_MS = 1500;
+
 export const quizApi = {
     generate: (topic: string) =>
-        api.post<QuizGenerateResponse>('/quiz/generate', { topic }),
+        api.post<QuizJobResponse>('/quiz/generate', { topic }),
+
+    getJob: (jobId: string) =>
+        api.get<QuizJobResponse>(`/quiz/jobs/${jobId}`),
+
+    // Starts a generation job and polls it until the quiz session is ready
+    generateAndWait: async (topic: string): Promise<QuizJobResponse> => {
+        let { data: job } = await quizApi.generate(topic);
+        while (job.status === 'pending' || job.status === 'running') {
+            await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+            ({ data: job } = await quizApi.getJob(job.job_id));
+        }
+        if (job.status === 'failed' || job.session_id == null) {
+            throw new Error(job.error || job.message);
+        }
+        return job;
+    },
 
     getNextQuestion: (sessionId: number) =>
         api.get<QuestionResponse>(`/quiz/next?session_id=${sessionId}`),
@@ -6,6 +6,7 @@ from google.adk.models.lite_llm import LiteLlm
 from google.genai import types
 from .tools import initialize_quiz_session, get_educational_context
 from .prompts import SYSTEM_INSTRUCTION
+from .telemetry import AGENT_CALLBACKS
 from ..core.config import settings
 
 logger = logging.getLogger(__name__)
@@ -53,7 +54,9 @@ def create_educator_agent() -> LlmAgent:
             model=lite_llm_model,
             tools=tools,
             instruction=SYSTEM_INSTRUCTION,
-            generate_content_config=generation_config
+            generate_content_config=generation_config,
+            # Latency and token metrics for every LLM and tool call
+            **AGENT_CALLBACKS
         )
         
         logger.info("✅ EducatorAgent initialized successfully with OpenRouter!")
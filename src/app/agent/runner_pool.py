@@ -0,0 +1,73 @@
+import itertools
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Optional
+from google.adk.runners import Runner
+from google.adk.sessions import Session
+
+logger = logging.getLogger(__name__)
+
+class RunnerPool:
+    """
+    A fixed set of ADK runners shared by every generation.
+
+    Each runner owns its in-memory session, artifact and memory services, so creating one
+    per request leaves those behind until garbage collection. Here runners are created
+    lazily up to `size` and handed out round-robin. Every generation gets its own ADK
+    session on the runner, which is deleted as soon as the generation is done.
+    """
+
+    def __init__(self, size: int, runner_factory: Callable[[], Runner]):
+        self.size = max(size, 1)
+        self._runner_factory = runner_factory
+        self._runners: list[Runner] = []
+        self._round_robin = itertools.count()
+        self.sessions_created = 0
+        self.sessions_deleted = 0
+
+    def _next_runner(self) -> Runner:
+        if len(self._runners) < self.size:
+            self._runners.append(self._runner_factory())
+            return self._runners[-1]
+        return self._runners[next(self._round_robin) % self.size]
+
+    @asynccontextmanager
+    async def session(self, user_id: str) -> AsyncIterator[tuple[Runner, Session]]:
+        """
+        Lends a runner together with a fresh ADK session that is evicted on exit.
+        """
+        runner = self._next_runner()
+        session = await runner.session_service.create_session(app_name=runner.app_name, user_id=user_id)
+        self.sessions_created += 1
+        try:
+            yield runner, session
+        finally:
+            try:
+                await runner.session_service.delete_session(
+                    app_name=runner.app_name, user_id=user_id, session_id=session.id
+                )
+                self.sessions_deleted += 1
+            except Exception as e:
+                logger.error(f"Failed to delete ADK session {session.id}: {e}")
+
+    async def live_sessions(self, user_id: Optional[str] = None) -> int:
+        """Counts the sessions still held by the runners' session services."""
+        total = 0
+        for runner in self._runners:
+            response = await runner.session_service.list_sessions(app_name=runner.app_name, user_id=user_id)
+            total += len(response.sessions)
+        return total
+
+    def stats(self) -> dict:
+        return {
+            "runners": len(self._runners),
+            "max_runners": self.size,
+            "sessions_created": self.sessions_created,
+            "sessions_deleted": self.sessions_deleted,
+        }
+
+    def reset(self) -> None:
+        """Drops every runner, the next generation creates new ones. Used by tests."""
+        self._runners.clear()
+        self.sessions_created = 0
+        self.sessions_deleted = 0
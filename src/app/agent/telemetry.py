@@ -0,0 +1,84 @@
+import time
+from typing import Any, Optional
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+from google.adk.tools import BaseTool, ToolContext
+
+from ..core.config import settings
+from ..core.metrics import registry
+
+# Token counts per LLM call, quizzes are a few thousand tokens at most
+TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+
+llm_call_seconds = registry.histogram(
+    "agent_llm_call_seconds", "Latency of each LLM call made by the agent", ["model", "outcome"])
+llm_tokens = registry.histogram(
+    "agent_llm_call_tokens", "Tokens per LLM call, 'in' is the prompt and 'out' the completion",
+    ["model", "direction"], buckets=TOKEN_BUCKETS)
+llm_tokens_total = registry.counter(
+    "agent_llm_tokens", "Tokens used by the agent across all calls", ["model", "direction"])
+tool_call_seconds = registry.histogram(
+    "agent_tool_call_seconds", "Latency of each tool call made by the agent", ["tool", "outcome"])
+
+# In-flight calls, keyed by invocation id (LLM) or function call id (tools)
+_llm_started: dict[str, tuple[float, str]] = {}
+_tool_started: dict[str, float] = {}
+
+def _observe_llm_call(key: str, outcome: str) -> Optional[str]:
+    """Records the call latency and returns the model it was made with."""
+    started = _llm_started.pop(key, None)
+    if started is None:
+        return None
+    start, model = started
+    llm_call_seconds.observe(time.perf_counter() - start, model=model, outcome=outcome)
+    return model
+
+async def before_model(callback_context: CallbackContext, llm_request: LlmRequest) -> None:
+    model = llm_request.model or settings.OPENROUTER_MODEL
+    _llm_started[callback_context.invocation_id] = (time.perf_counter(), model)
+    return None
+
+async def after_model(callback_context: CallbackContext, llm_response: LlmResponse) -> None:
+    if llm_response.partial:
+        return None
+    outcome = "error" if llm_response.error_code else "ok"
+    model = _observe_llm_call(callback_context.invocation_id, outcome) or settings.OPENROUTER_MODEL
+
+    usage = llm_response.usage_metadata
+    if usage:
+        for direction, tokens in (("in", usage.prompt_token_count), ("out", usage.candidates_token_count)):
+            if tokens:
+                llm_tokens.observe(tokens, model=model, direction=direction)
+                llm_tokens_total.inc(tokens, model=model, direction=direction)
+    return None
+
+async def on_model_error(callback_context: CallbackContext, llm_request: LlmRequest, error: Exception) -> None:
+    _observe_llm_call(callback_context.invocation_id, "error")
+    return None
+
+async def before_tool(tool: BaseTool, args: dict[str, Any], tool_context: ToolContext) -> None:
+    _tool_started[tool_context.function_call_id] = time.perf_counter()
+    return None
+
+def _observe_tool_call(tool: BaseTool, tool_context: ToolContext, outcome: str) -> None:
+    started = _tool_started.pop(tool_context.function_call_id, None)
+    if started is not None:
+        tool_call_seconds.observe(time.perf_counter() - started, tool=tool.name, outcome=outcome)
+
+async def after_tool(tool: BaseTool, args: dict[str, Any], tool_context: ToolContext, tool_response: Any) -> None:
+    _observe_tool_call(tool, tool_context, "ok")
+    return None
+
+async def on_tool_error(tool: BaseTool, args: dict[str, Any], tool_context: ToolContext, error: Exception) -> None:
+    _observe_tool_call(tool, tool_context, "error")
+    return None
+
+# Keyword arguments for LlmAgent that wire up the callbacks above
+AGENT_CALLBACKS = {
+    "before_model_callback": before_model,
+    "after_model_callback": after_model,
+    "on_model_error_callback": on_model_error,
+    "before_tool_callback": before_tool,
+    "after_tool_callback": after_tool,
+    "on_tool_error_callback": on_tool_error,
+}
@@ -1,15 +1,23 @@
 from typing import List, Dict
 import logging
-from ..core.database import SessionLocal
-from ..models.quiz import Question, Choice
-from ..models.session import QuizSession
+import time
+from pydantic import TypeAdapter, ValidationError
+from ..core.database import AsyncSessionLocal
+from ..core.metrics import registry
+from ..schemas.quiz import GeneratedQuestion
+from ..services.quiz_store import create_quiz_session
 
 logger = logging.getLogger(__name__)
 
 # Note: In Google ADK, tools are typically passed to the agent as a list of functions.
 # We will define them here so they can be imported.
 
-def initialize_quiz_session(topic: str, questions_data: list[dict]) -> int:
+_questions_adapter = TypeAdapter(List[GeneratedQuestion])
+
+initialize_seconds = registry.histogram(
+    "initialize_quiz_session_seconds", "Time spent validating and saving a generated quiz", ["outcome"])
+
+async def initialize_quiz_session(topic: str, questions_data: list[dict]) -> int:
     """
     Initializes a new quiz session and saves the generated questions and choices to the database.
     
@@ -22,50 +30,36 @@ def initialize_quiz_session(topic: str, questions_data: list[dict]) -> int:
     Returns:
         int: The unique ID of the newly created QuizSession.
     """
-    db = SessionLocal()
     logger.info(f"initialize_quiz_session called for topic: {topic}")
+    start = time.perf_counter()
+
+    # 1. Validate the whole payload before touching the database
     try:
-        # 1. Create the Session record
-        db_session = QuizSession(topic=topic)
-        db.add(db_session)
-        db.commit()
-        db.refresh(db_session)
-        logger.info(f"Created session with ID: {db_session.id}")
-        
-        # 2. Iterate through and save questions
-        for q_data in questions_data:
-            # logger.debug(f"Saving question: {q_data.get('question_text')}") 
-            db_question = Question(
-                question_text=q_data["question_text"],
-                topic=topic
-            )
-            db.add(db_question)
-            db.commit()
-            db.refresh(db_question)
-            
-            # 3. Save choices for this question
-            for c_data in q_data["choices"]:
-                db_choice = Choice(
-                    choice_text=c_data["choice_text"],
-                    is_correct=c_data["is_correct"],
-                    question_id=db_question.id
-                )
-                db.add(db_choice)
-        
-        db.commit()
-        logger.info(f"Successfully saved quiz session {db_session.id}")
-        return db_session.id
-    
-    except Exception as e:
-        db.rollback()
-        logger.error(f"Error in initialize_quiz_session: {e}")
+        questions = _questions_adapter.validate_python(questions_data)
+        if not questions:
+            raise ValueError("questions_data is empty")
+    except (ValidationError, ValueError) as e:
+        logger.error(f"Invalid quiz payload for topic '{topic}': {e}")
+        initialize_seconds.observe(time.perf_counter() - start, outcome="invalid")
         return -1
-    finally:
-        db.close()
+
+    # 2. Save the session, questions and choices in a single transaction
+    async with AsyncSessionLocal() as db:
+        try:
+            async with db.begin():
+                session_id = await create_quiz_session(db, topic, questions)
+            logger.info(f"Successfully saved quiz session {session_id} with {len(questions)} questions")
+            initialize_seconds.observe(time.perf_counter() - start, outcome="ok")
+            return session_id
+
+        except Exception as e:
+            logger.error(f"Error in initialize_quiz_session: {e}")
+            initialize_seconds.observe(time.perf_counter() - start, outcome="error")
+            return -1
 
 def get_educational_context(topic: str) -> str:
     """
-    Provides additional educational guidelines or context for a specific topic 
+    Provides additional educational guidelines or context for a specific topic
     to help the AI generate more accurate and challenging questions.
     """
     # This could be expanded to query a knowledge base or search tool.
@@ -1,182 +1,235 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-import re
+from typing import Optional
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+import json
 import logging
-from google.adk.runners import InMemoryRunner
-from google.genai import types
 
 from ..core.database import get_db
-from ..agent.core import get_educator_agent
+from ..core.query_budget import query_budget
 from ..schemas.quiz import (
+    ChoiceBase,
     QuizGenerateRequest, 
-    QuizGenerateResponse, 
+    QuizJobResponse, 
     QuestionResponse, 
     AnswerSubmission, 
     AnswerValidationResponse,
+    BatchAnswerSubmission,
+    BatchAnswerResult,
+    BatchAnswerResponse,
     QuizFinalizeRequest,
-    QuizResultResponse
+    QuizResultResponse,
+    QuizCacheStatsResponse,
+    GenerationStatsResponse
 )
-from ..models.session import QuizSession, UserAnswer
-from ..models.quiz import Question, Choice
-from ..models.result import QuizResult
+from ..services import quiz_cache, quiz_repository, session_cache
+from ..services.generation import generate_quiz_session, generation_flight
+from ..services.generation_jobs import GenerationJob, JobQueueFullError, job_manager
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/quiz", tags=["Quiz"])
 
-@router.post("/generate", response_model=QuizGenerateResponse)
-async def generate_quiz(request: QuizGenerateRequest, db: Session = Depends(get_db)):
-    # 1. Trigger the ADK Agent
-    # The agent will use its tools to find context and save the quiz to the DB
-    prompt = f"Please generate a professional quiz about {request.topic}."
-    
-    try:
-        # Get the educator agent (lazy-loaded on first use)
-        educator_agent = get_educator_agent()
-        
-        # Create a runner for this execution
-        # We use app_name="agents" to match the default agent directory structure in ADK
-        runner = InMemoryRunner(agent=educator_agent, app_name="agents")
-        
-        logger.info(f"Starting quiz generation for topic: {request.topic}")
-        
-        # Execute the agent using run_debug which handles session creation automatically
-        # and runs asynchronously, avoiding threading issues.
-        events = await runner.run_debug(
-            user_messages=prompt,
-            quiet=True # We are handling our own logging
-        )
-        
-        # Log all events from the runner to see what the ADK is doing
-        logger.debug(f"--- runner events for topic '{request.topic}' ---")
-        for event in events:
-            logger.debug(str(event))
-        logger.debug("----------------------------")
-        
-        # 2. Extract the Session ID from the agent's response
-        session_id = None
-        for event in events:
-            if event.content and event.content.parts:
-                for part in event.content.parts:
-                    if hasattr(part, 'function_response') and part.function_response:
-                        if part.function_response.name == 'initialize_quiz_session':
-                            session_id = part.function_response.response.get('result')
-                            break
-            if session_id:
-                break
-        
-        if not session_id or session_id == -1:
-            raise HTTPException(status_code=500, detail="AI Agent failed to initialize the quiz session.")
-
-        return QuizGenerateResponse(
-            session_id=session_id,
-            total_questions=5,
-            message="Your quiz has been generated successfully! You can now start the test."
+def _job_response(job: GenerationJob) -> QuizJobResponse:
+    return QuizJobResponse(
+        job_id=job.id,
+        topic=job.topic,
+        status=job.status.value,
+        session_id=job.session_id,
+        message=job.events[-1]["message"] if job.events else "",
+        total_questions=job.question_count,
+        error=job.error
+    )
+
+@router.post("/generate", response_model=QuizJobResponse, status_code=202)
+@query_budget(2)
+async def generate_quiz(request: QuizGenerateRequest, db: AsyncSession = Depends(get_db)):
+    # 1. Reuse a cached question bank for this topic when we have one
+    bank = await quiz_cache.get_cached_bank(request.topic, request.question_count)
+    if bank:
+        session_id = await quiz_cache.create_session_from_bank(db, bank, request.question_count)
+        logger.info(f"Quiz cache hit for topic '{request.topic}', created session {session_id}")
+        job = await job_manager.record_completed(
+            request.topic, request.question_count, session_id, "Your quiz is ready! You can now start the test."
         )
+        return _job_response(job)
+
+    # 2. Otherwise hand the agent run to the background workers and return right away
+    try:
+        job = await job_manager.submit(request.topic, request.question_count, generate_quiz_session)
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    return _job_response(job)
+
+@router.get("/jobs/{job_id}", response_model=QuizJobResponse)
+@query_budget(0)
+async def get_generation_job(job_id: str):
+    job = await job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _job_response(job)
+
+@router.get("/jobs/{job_id}/events")
+async def stream_generation_job(job_id: str):
+    if not await job_manager.get(job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def event_stream():
+        async for event in job_manager.stream(job_id):
+            yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/cache/stats", response_model=QuizCacheStatsResponse)
+async def get_cache_stats():
+    return QuizCacheStatsResponse(**await quiz_cache.bank_cache().stats())
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+@router.get("/generation/stats", response_model=GenerationStatsResponse)
+async def get_generation_stats():
+    counters = await quiz_cache.bank_cache().counters("generations")
+    return GenerationStatsResponse(**generation_flight.stats(), total_generations=counters["generations"])
 
 @router.get("/next", response_model=QuestionResponse)
-async def get_next_question(session_id: int, db: Session = Depends(get_db)):
-    session = db.query(QuizSession).filter(QuizSession.id == session_id).first()
+@query_budget(1)
+async def get_next_question(session_id: int, db: AsyncSession = Depends(get_db)):
+    # Served from the session cache, the database is only read on a cache miss
+    session = await session_cache.get_session(db, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
-    answered_ids = db.query(UserAnswer.question_id).filter(
-        UserAnswer.session_id == session_id
-    ).all()
-    answered_ids = [r[0] for r in answered_ids]
-
-    next_q = db.query(Question).filter(
-        Question.topic == session.topic,
-        ~Question.id.in_(answered_ids) if answered_ids else True
-    ).order_by(Question.id.asc()).first()
-
-    if not next_q:
+    position = await session.next_position()
+    if position is None:
         raise HTTPException(status_code=400, detail="No more questions available.")
 
+    next_q = await session.question_at(position)
     return QuestionResponse(
         id=next_q.id,
         question_text=next_q.question_text,
-        choices=next_q.choices,
-        current_number=len(answered_ids) + 1,
-        total_questions=5
+        choices=[ChoiceBase(id=c.id, choice_text=c.choice_text) for c in next_q.choices],
+        current_number=position + 1,
+        total_questions=session.total_questions
     )
 
-@router.post("/submit", response_model=AnswerValidationResponse)
-async def submit_answer(submission: AnswerSubmission, db: Session = Depends(get_db)):
-    # 1. Get the session and the selected choice
-    session = db.query(QuizSession).filter(QuizSession.id == submission.session_id).first()
-    choice = db.query(Choice).filter(Choice.id == submission.choice_id).first()
-    question = db.query(Question).filter(Question.id == submission.question_id).first()
+def _explain(question: session_cache.CachedQuestion, is_correct: bool) -> tuple[Optional[int], Optional[str]]:
+    """The correct choice and explanation shown after a wrong answer."""
+    if is_correct:
+        return None, None
+    correct_choice = question.correct_choice
+
+    # For now, provide a simple static explanation to avoid the threading issue
+    explanation = f"The correct answer is '{correct_choice.choice_text if correct_choice else 'unknown'}'. This is the most accurate option based on the question requirements."
+    return (correct_choice.id if correct_choice else None), explanation
 
-    if not session or not choice or not question:
+@router.post("/submit", response_model=AnswerValidationResponse)
+@query_budget(3)
+async def submit_answer(submission: AnswerSubmission, db: AsyncSession = Depends(get_db)):
+    # 1. Validate the session, question and choice against the session cache
+    session = await session_cache.get_session(db, submission.session_id)
+    question = (await session.questions_by_id([submission.question_id]))[0] if session else None
+    choice = question.choice(submission.choice_id) if question else None
+
+    if not session or not question or not choice:
         raise HTTPException(status_code=404, detail="Session, Question, or Choice not found")
 
-    # 2. Record the user answer
-    db_answer = UserAnswer(
-        session_id=submission.session_id,
-        question_id=submission.question_id,
-        choice_id=submission.choice_id,
-        is_correct=choice.is_correct
+    # 2. Record the user answer, a re-submit gets back the answer recorded first
+    answer = await quiz_repository.record_answer(
+        db, submission.session_id, submission.question_id, submission.choice_id,
+        is_correct=choice.id == question.correct_choice_id
     )
-    db.add(db_answer)
-    
-    if choice.is_correct:
-        session.total_score += 1
-    
-    db.commit()
+    if not answer:
+        raise HTTPException(status_code=404, detail="Session not found")
+    await db.commit()
+
+    await session.save_answers([(question, answer.is_correct)])
 
     # 3. Handle Explanation if wrong
-    explanation = None
-    correct_choice_id = None
-    if not choice.is_correct:
-        correct_choice = db.query(Choice).filter(
-            Choice.question_id == question.id, 
-            Choice.is_correct == True
-        ).first()
-        correct_choice_id = correct_choice.id if correct_choice else None
-        
-        # For now, provide a simple static explanation to avoid the threading issue
-        explanation = f"The correct answer is '{correct_choice.choice_text if correct_choice else 'unknown'}'. This is the most accurate option based on the question requirements."
+    correct_choice_id, explanation = _explain(question, answer.is_correct)
 
     # 4. Check if there are more questions
-    answered_count = db.query(UserAnswer).filter(UserAnswer.session_id == submission.session_id).count()
-
     return AnswerValidationResponse(
-        is_correct=choice.is_correct,
+        is_correct=answer.is_correct,
         correct_choice_id=correct_choice_id,
         explanation=explanation,
-        next_question_available=(answered_count < 5)
+        next_question_available=answer.answered_count < session.total_questions
     )
 
-@router.post("/finalize", response_model=QuizResultResponse)
-async def finalize_quiz(request: QuizFinalizeRequest, db: Session = Depends(get_db)):
-    session = db.query(QuizSession).filter(QuizSession.id == request.session_id).first()
+@router.post("/submit/batch", response_model=BatchAnswerResponse)
+@query_budget(4)
+async def submit_answers(submission: BatchAnswerSubmission, db: AsyncSession = Depends(get_db)):
+    # 1. Validate and grade every answer against the session cache, nothing is stored if one is invalid
+    session = await session_cache.get_session(db, submission.session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
-    # Save to the permanent results table
-    db_result = QuizResult(
-        user_name=request.user_name,
-        user_email=request.user_email,
-        topic=session.topic,
-        score=session.total_score,
-        total_questions=5
+    questions = await session.questions_by_id([item.question_id for item in submission.answers])
+    graded = []
+    for item, question in zip(submission.answers, questions):
+        choice = question.choice(item.choice_id) if question else None
+        if not question or not choice:
+            raise HTTPException(
+                status_code=404, detail=f"Question {item.question_id} or choice {item.choice_id} not found"
+            )
+        if any(q.id == question.id for q, _ in graded):
+            raise HTTPException(status_code=400, detail=f"Question {question.id} is answered more than once")
+        graded.append((question, choice))
+
+    # 2. One bulk insert and one score update in a single transaction
+    answers = await quiz_repository.record_answers(db, submission.session_id, [
+        (question.id, choice.id, choice.id == question.correct_choice_id) for question, choice in graded
+    ])
+    if not answers:
+        raise HTTPException(status_code=404, detail="Session not found")
+    await db.commit()
+
+    await session.save_answers([
+        (question, answer.is_correct) for (question, _), answer in zip(graded, answers)
+    ])
+
+    results = []
+    for (question, _), answer in zip(graded, answers):
+        correct_choice_id, explanation = _explain(question, answer.is_correct)
+        results.append(BatchAnswerResult(
+            question_id=question.id,
+            is_correct=answer.is_correct,
+            correct_choice_id=correct_choice_id,
+            explanation=explanation,
+            already_answered=not answer.created
+        ))
+
+    return BatchAnswerResponse(
+        results=results,
+        score=answers[-1].score,
+        answered_count=answers[-1].answered_count,
+        next_question_available=answers[-1].answered_count < session.total_questions
     )
-    db.add(db_result)
-    
-    session.status = "completed"
-    db.commit()
-    db.refresh(db_result)
+
+@router.post("/finalize", response_model=QuizResultResponse)
+@query_budget(3)
+async def finalize_quiz(request: QuizFinalizeRequest, db: AsyncSession = Depends(get_db)):
+    # Save to the permanent results table and close the session
+    try:
+        db_result = await quiz_repository.complete_session(
+            db, request.session_id, request.user_name, request.user_email
+        )
+    except quiz_repository.SessionAlreadyCompletedError:
+        raise HTTPException(status_code=409, detail="This quiz has already been finalized")
+    if not db_result:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    await db.commit()
+    await session_cache.invalidate_snapshot(request.session_id)
 
     return QuizResultResponse(
         user_name=db_result.user_name,
         topic=db_result.topic,
         score=db_result.score,
-        total_questions=5,
-        percentage=(db_result.score / 5) * 100,
+        total_questions=db_result.total_questions,
+        percentage=(db_result.score / db_result.total_questions) * 100 if db_result.total_questions else 0.0,
         completed_at=db_result.completed_at
     )
 
@@ -0,0 +1,66 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.database import get_db
+from ..core.query_budget import query_budget
+from ..schemas.quiz import LeaderboardEntry, LeaderboardResponse, TopicStatsResponse
+from ..services import results_repository
+from ..services.results_repository import InvalidCursorError, LeaderboardCursor
+
+router = APIRouter(prefix="/results", tags=["Results"])
+
+def _percentage(score: int, total_questions: int) -> float:
+    return (score / total_questions) * 100 if total_questions else 0.0
+
+@router.get("/leaderboard", response_model=LeaderboardResponse)
+@query_budget(1)
+async def get_leaderboard(
+    topic: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    try:
+        after = LeaderboardCursor.decode(cursor) if cursor else None
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # One extra row tells whether another page follows
+    results = await results_repository.get_leaderboard(db, limit + 1, topic=topic, after=after)
+    page = results[:limit]
+    next_cursor = None
+    if len(results) > limit:
+        last = page[-1]
+        next_cursor = LeaderboardCursor(score=last.score, completed_at=last.completed_at, id=last.id).encode()
+
+    return LeaderboardResponse(
+        entries=[
+            LeaderboardEntry(
+                user_name=r.user_name,
+                topic=r.topic,
+                score=r.score,
+                total_questions=r.total_questions,
+                percentage=_percentage(r.score, r.total_questions),
+                completed_at=r.completed_at
+            )
+            for r in page
+        ],
+        next_cursor=next_cursor
+    )
+
+@router.get("/topics/{topic}/stats", response_model=TopicStatsResponse)
+@query_budget(1)
+async def get_topic_stats(topic: str, db: AsyncSession = Depends(get_db)):
+    stats = await results_repository.get_topic_stats(db, topic)
+    if not stats:
+        raise HTTPException(status_code=404, detail="No results for this topic yet")
+
+    return TopicStatsResponse(
+        topic=stats.topic,
+        attempts=stats.attempts,
+        average_score=stats.total_score / stats.attempts if stats.attempts else 0.0,
+        average_percentage=_percentage(stats.total_score, stats.total_questions),
+        best_score=stats.best_score,
+        last_completed_at=stats.last_completed_at
+    )
@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.config import settings
+from ..core.database import get_db
+from ..core.query_budget import query_budget
+from ..schemas.quiz import TopicSearchResponse, TopicSuggestion
+from ..services import topics
+
+router = APIRouter(prefix="/topics", tags=["Topics"])
+
+@router.get("/search", response_model=TopicSearchResponse)
+@query_budget(1)
+async def search_topics(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Autocomplete for the topic field: existing topics with a ready question bank, so
+    picking one starts a quiz from stored questions instead of a new generation.
+    """
+    matches = await topics.search_topics(db, q, min_questions=settings.QUIZ_DEFAULT_QUESTIONS, limit=limit)
+    return TopicSearchResponse(
+        suggestions=[TopicSuggestion(topic=t.name, question_count=t.question_count) for t in matches]
+    )
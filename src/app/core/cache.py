@@ -0,0 +1,368 @@
+import json
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Hashable, Optional, Sequence
+
+from .config import settings
+
+class TTLCache:
+    """
+    A small in-process LRU cache with per-entry expiry.
+
+    Entries older than their TTL are treated as misses and dropped on access.
+    When `max_size` is reached the least recently used entry is evicted.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, record_stats: bool = True) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                if record_stats:
+                    self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            if record_stats:
+                self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._store(key, value, ttl_seconds)
+
+    def merge(self, key: Hashable, fields: dict, ttl_seconds: Optional[float] = None) -> None:
+        """
+        Updates the dict stored under `key` with `fields` in one step, in place, starting
+        from an empty dict when there is no live entry.
+        """
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            entry = self._entries.get(key)
+            stored = entry[1] if entry is not None and entry[0] > time.monotonic() else {}
+            stored.update(fields)
+            self._store(key, stored, ttl_seconds)
+
+    def _store(self, key: Hashable, value: Any, ttl_seconds: Optional[float]) -> None:
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def contains(self, key: Hashable) -> bool:
+        """Checks for a live entry without touching the hit/miss counters or LRU order."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[0] > time.monotonic()
+
+    def pop(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            return entry[1] if entry else None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+        }
+
+# --- Pluggable backends ---
+
+class CacheNamespace(ABC):
+    """
+    A named group of cache entries with its own TTL and size limit.
+
+    Values must be JSON compatible (dicts, lists, strings, numbers) so every backend
+    can store them. Counters created with `incr` are shared by all app workers
+    that use the same backend.
+    """
+
+    def __init__(self, name: str, max_size: int, ttl_seconds: float):
+        self.name = name
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[Any]: ...
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None: ...
+
+    @abstractmethod
+    async def get_many(self, keys: Sequence[str]) -> list[Optional[Any]]:
+        """`get` of several keys in one round trip, None for the missing ones."""
+
+    @abstractmethod
+    async def set_many(self, entries: dict[str, Any], ttl_seconds: Optional[float] = None) -> None:
+        """`set` of several keys in one round trip."""
+
+    @abstractmethod
+    async def set_fields(self, key: str, fields: dict[str, Any], ttl_seconds: Optional[float] = None) -> None:
+        """
+        Adds or replaces fields of the hash stored under `key` atomically, so concurrent
+        writers of different fields never lose each other's updates.
+        """
+
+    @abstractmethod
+    async def get_fields(self, key: str, fields: Sequence[str]) -> dict[str, Any]:
+        """The given fields of the hash stored under `key`, missing fields are left out."""
+
+    @abstractmethod
+    async def delete(self, key: str) -> None: ...
+
+    @abstractmethod
+    async def exists(self, key: str) -> bool: ...
+
+    @abstractmethod
+    async def incr(self, counter: str, amount: int = 1) -> int: ...
+
+    @abstractmethod
+    async def counters(self, *names: str) -> dict[str, int]: ...
+
+    @abstractmethod
+    async def size(self) -> Optional[int]:
+        """Number of live entries, or None when the backend cannot tell cheaply."""
+
+    @abstractmethod
+    async def clear(self) -> None: ...
+
+    async def lookup(self, key: str) -> Optional[Any]:
+        """`get` that also counts hits and misses for the namespace."""
+        value = await self.get(key)
+        await self.incr("hits" if value is not None else "misses")
+        return value
+
+    async def stats(self) -> dict:
+        counts = await self.counters("hits", "misses", "evictions")
+        lookups = counts["hits"] + counts["misses"]
+        return {
+            "size": await self.size(),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            **counts,
+            "hit_ratio": (counts["hits"] / lookups) if lookups else 0.0,
+        }
+
+class CacheBackend(ABC):
+    def __init__(self):
+        self._namespaces: dict[str, CacheNamespace] = {}
+
+    def namespace(self, name: str, max_size: int, ttl_seconds: float) -> CacheNamespace:
+        if name not in self._namespaces:
+            self._namespaces[name] = self._create_namespace(name, max_size, ttl_seconds)
+        return self._namespaces[name]
+
+    @abstractmethod
+    def _create_namespace(self, name: str, max_size: int, ttl_seconds: float) -> CacheNamespace: ...
+
+    async def close(self) -> None:
+        return None
+
+class MemoryCacheNamespace(CacheNamespace):
+    def __init__(self, name: str, max_size: int, ttl_seconds: float):
+        super().__init__(name, max_size, ttl_seconds)
+        self._entries = TTLCache(max_size=max_size, ttl_seconds=ttl_seconds)
+        self._counters: dict[str, int] = {}
+
+    async def get(self, key: str) -> Optional[Any]:
+        return self._entries.get(key, record_stats=False)
+
+    async def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        self._entries.set(key, value, ttl_seconds)
+
+    async def get_many(self, keys: Sequence[str]) -> list[Optional[Any]]:
+        return [self._entries.get(key, record_stats=False) for key in keys]
+
+    async def set_many(self, entries: dict[str, Any], ttl_seconds: Optional[float] = None) -> None:
+        for key, value in entries.items():
+            self._entries.set(key, value, ttl_seconds)
+
+    async def set_fields(self, key: str, fields: dict[str, Any], ttl_seconds: Optional[float] = None) -> None:
+        self._entries.merge(key, fields, ttl_seconds)
+
+    async def get_fields(self, key: str, fields: Sequence[str]) -> dict[str, Any]:
+        stored = self._entries.get(key, record_stats=False) or {}
+        return {field: stored[field] for field in fields if field in stored}
+
+    async def delete(self, key: str) -> None:
+        self._entries.pop(key)
+
+    async def exists(self, key: str) -> bool:
+        return self._entries.contains(key)
+
+    async def incr(self, counter: str, amount: int = 1) -> int:
+        self._counters[counter] = self._counters.get(counter, 0) + amount
+        return self._counters[counter]
+
+    async def counters(self, *names: str) -> dict[str, int]:
+        values = {name: self._counters.get(name, 0) for name in names}
+        if "evictions" in values:
+            values["evictions"] = self._entries.evictions
+        return values
+
+    async def size(self) -> Optional[int]:
+        return len(self._entries)
+
+    async def clear(self) -> None:
+        self._entries.clear()
+        self._counters.clear()
+
+class MemoryCacheBackend(CacheBackend):
+    """Process-local backend, each uvicorn worker has its own copy of the data."""
+
+    def _create_namespace(self, name: str, max_size: int, ttl_seconds: float) -> CacheNamespace:
+        return MemoryCacheNamespace(name, max_size, ttl_seconds)
+
+class RedisCacheNamespace(CacheNamespace):
+    """
+    Stores JSON encoded entries under "<prefix><namespace>:<key>" with a Redis TTL.
+    Size limits are left to the server's maxmemory policy.
+    """
+
+    def __init__(self, client, prefix: str, name: str, max_size: int, ttl_seconds: float):
+        super().__init__(name, max_size, ttl_seconds)
+        self._client = client
+        self._prefix = f"{prefix}{name}:"
+        self._counter_prefix = f"{prefix}{name}:__counter__:"
+
+    def _key(self, key: str) -> str:
+        return f"{self._prefix}{key}"
+
+    async def get(self, key: str) -> Optional[Any]:
+        raw = await self._client.get(self._key(key))
+        return json.loads(raw) if raw is not None else None
+
+    async def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        await self._client.set(self._key(key), json.dumps(value, separators=(",", ":")), px=int(ttl * 1000))
+
+    async def get_many(self, keys: Sequence[str]) -> list[Optional[Any]]:
+        if not keys:
+            return []
+        raw = await self._client.mget([self._key(key) for key in keys])
+        return [json.loads(value) if value is not None else None for value in raw]
+
+    async def set_many(self, entries: dict[str, Any], ttl_seconds: Optional[float] = None) -> None:
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        async with self._client.pipeline(transaction=False) as pipe:
+            for key, value in entries.items():
+                pipe.set(self._key(key), json.dumps(value, separators=(",", ":")), px=int(ttl * 1000))
+            await pipe.execute()
+
+    async def set_fields(self, key: str, fields: dict[str, Any], ttl_seconds: Optional[float] = None) -> None:
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        async with self._client.pipeline(transaction=True) as pipe:
+            pipe.hset(self._key(key), mapping={
+                field: json.dumps(value, separators=(",", ":")) for field, value in fields.items()
+            })
+            pipe.pexpire(self._key(key), int(ttl * 1000))
+            await pipe.execute()
+
+    async def get_fields(self, key: str, fields: Sequence[str]) -> dict[str, Any]:
+        if not fields:
+            return {}
+        raw = await self._client.hmget(self._key(key), list(fields))
+        return {field: json.loads(value) for field, value in zip(fields, raw) if value is not None}
+
+    async def delete(self, key: str) -> None:
+        await self._client.delete(self._key(key))
+
+    async def exists(self, key: str) -> bool:
+        return bool(await self._client.exists(self._key(key)))
+
+    async def incr(self, counter: str, amount: int = 1) -> int:
+        return await self._client.incrby(f"{self._counter_prefix}{counter}", amount)
+
+    async def counters(self, *names: str) -> dict[str, int]:
+        values = await self._client.mget([f"{self._counter_prefix}{name}" for name in names])
+        return {name: int(value or 0) for name, value in zip(names, values)}
+
+    async def size(self) -> Optional[int]:
+        return None
+
+    async def clear(self) -> None:
+        keys = [key async for key in self._client.scan_iter(match=f"{self._prefix}*")]
+        if keys:
+            await self._client.delete(*keys)
+
+class RedisCacheBackend(CacheBackend):
+    """Backend shared by every worker and pod that points at the same Redis server."""
+
+    def __init__(self, client, prefix: str):
+        super().__init__()
+        self._client = client
+        self._prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str, prefix: str) -> "RedisCacheBackend":
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package") from e
+        return cls(redis.from_url(url), prefix)
+
+    def _create_namespace(self, name: str, max_size: int, ttl_seconds: float) -> CacheNamespace:
+        return RedisCacheNamespace(self._client, self._prefix, name, max_size, ttl_seconds)
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+_backend: Optional[CacheBackend] = None
+
+def create_cache_backend() -> CacheBackend:
+    if settings.CACHE_BACKEND == "memory":
+        return MemoryCacheBackend()
+    if settings.CACHE_BACKEND == "redis":
+        return RedisCacheBackend.from_url(settings.REDIS_URL, settings.CACHE_KEY_PREFIX)
+    raise ValueError(f"Unknown CACHE_BACKEND '{settings.CACHE_BACKEND}', expected 'memory' or 'redis'")
+
+def get_cache_backend() -> CacheBackend:
+    """Lazily creates the backend selected in Settings."""
+    global _backend
+    if _backend is None:
+        _backend = create_cache_backend()
+    return _backend
+
+def set_cache_backend(backend: Optional[CacheBackend]) -> None:
+    """Replaces the active backend, used by tests and at shutdown."""
+    global _backend
+    _backend = backend
+
+async def close_cache_backend() -> None:
+    global _backend
+    if _backend is not None:
+        await _backend.close()
+        _backend = None
@@ -4,9 +4,26 @@ from functools import lru_cache
 class Settings(BaseSettings):
     # App Settings
     PROJECT_NAME: str = "Agentic Quiz Platform"
+    DEBUG: bool = False  # Adds X-DB-Query-Count / X-DB-Query-Time-Ms headers to every response
     
+    # Logging Settings
+    LOG_LEVEL: str = "INFO"
+    LOG_JSON: bool = True  # One JSON object per line, False for plain text
+    LOG_FILE: str = "app.log"  # Empty string disables the file handler
+    LOG_FILE_MAX_BYTES: int = 10 * 1024 * 1024
+    LOG_FILE_BACKUP_COUNT: int = 5
+    LOG_EVENT_SAMPLE_RATE: float = 0.1  # Share of agent runs whose events are dumped at DEBUG level
+    LOG_EVENT_MAX_CHARS: int = 2000  # Each dumped event is cut to this length
+
     # Database Settings
     DATABASE_URL: str
+    DB_POOL_SIZE: int = 5  # Connections kept open per worker
+    DB_MAX_OVERFLOW: int = 10  # Extra connections opened during bursts, closed when returned
+    DB_POOL_TIMEOUT: float = 30  # Seconds to wait for a free connection before failing
+    DB_POOL_RECYCLE: int = 1800  # Reconnect connections older than this, -1 disables
+    DB_POOL_PRE_PING: bool = True  # Test connections on checkout to drop stale ones
+    QUERY_BUDGET_ENFORCE: bool = False  # Fail requests that exceed their route's query_budget (tests)
+    QUERY_REPEAT_WARNING: int = 3  # Warn about a likely N+1 when one statement repeats this often in a request
     
     # AI Settings (Legacy - keeping for backward compatibility)
     GOOGLE_API_KEY: str | None = None
@@ -18,6 +35,40 @@ class Settings(BaseSettings):
     OPENROUTER_MAX_TOKENS: int = 2048  # Reduced to stay within credit limits
     OPENROUTER_TEMPERATURE: float = 0.7
 
+    # Cache Backend Settings
+    CACHE_BACKEND: str = "memory"  # "memory" (per worker) or "redis" (shared by every worker)
+    REDIS_URL: str = "redis://localhost:6379/0"
+    CACHE_KEY_PREFIX: str = "quizzly:"
+
+    # Quiz Length Settings
+    QUIZ_DEFAULT_QUESTIONS: int = 5  # Used when /quiz/generate does not ask for a question_count
+    QUIZ_MAX_QUESTIONS: int = 200
+
+    # Quiz Cache Settings
+    QUIZ_CACHE_ENABLED: bool = True
+    QUIZ_CACHE_TTL_SECONDS: int = 3600
+    QUIZ_CACHE_MAX_TOPICS: int = 500
+    QUIZ_CACHE_PREWARM_TOPICS: int = 20  # 0 disables the background pre-warm job
+    QUIZ_CACHE_PREWARM_INTERVAL_SECONDS: int = 900
+
+    # Session Snapshot Cache Settings
+    SESSION_CACHE_TTL_SECONDS: int = 1800
+    SESSION_CACHE_MAX_SESSIONS: int = 10000
+
+    # Generation Job Settings
+    GENERATION_MODE: str = "agent"  # "agent" (tool calling ADK agent) or "direct" (one structured-output call)
+    GENERATION_MAX_CONCURRENCY: int = 4  # Agent runs executing at the same time per worker
+    GENERATION_MAX_PENDING_JOBS: int = 100
+    GENERATION_JOB_TTL_SECONDS: int = 3600  # How long finished jobs stay available for polling
+    GENERATION_JOB_CACHE_MAX_JOBS: int = 10000  # Job snapshots kept by the memory cache backend
+    AGENT_RUNNER_POOL_SIZE: int = 1  # ADK runners shared by all generations in a worker
+    GENERATION_TOKENS_PER_QUESTION: int = 150  # Output budget of one question, sizes the chunks of large quizzes
+    GENERATION_CHUNK_CONCURRENCY: int = 4  # Chunk calls of one large quiz in flight at the same time
+
+    # Question Bank Settings
+    QUESTION_REUSE_SIMILAR: bool = True  # Link stored near-identical questions instead of inserting duplicates
+    QUESTION_SIMILARITY_THRESHOLD: float = 0.8  # Estimated word and word-pair overlap of near-identical questions
+
     model_config = SettingsConfigDict(env_file=".env", case_sensitive=True)
 
 @lru_cache()
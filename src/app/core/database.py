@@ -1,20 +1,136 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import os
+import time
+from datetime import datetime, timezone
+from sqlalchemy import event, exc
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from .config import settings
+from .metrics import registry
+from .query_budget import instrument_engine
 
-# Create the SQLAlchemy engine
-engine = create_engine(settings.DATABASE_URL)
+# Async drivers used for each sync dialect found in DATABASE_URL.
+# Alembic keeps using the sync URL, the app always talks through the async driver.
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
 
-# Create a sessionmaker for creating database sessions
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def get_async_database_url(url: str) -> str:
+    """
+    Maps a sync database URL (postgresql://, sqlite://) to its async driver equivalent.
+    URLs that already name an async driver are returned unchanged.
+    """
+    db_url = make_url(url)
+    async_driver = ASYNC_DRIVERS.get(db_url.drivername)
+    if async_driver:
+        db_url = db_url.set(drivername=async_driver)
+    return db_url.render_as_string(hide_password=False)
+
+# --- Connection pool ---
+
+WORKER = str(os.getpid())
+
+pool_checkouts = registry.counter(
+    "db_pool_checkouts", "Connections handed out by the pool", ["worker"])
+pool_checkins = registry.counter(
+    "db_pool_checkins", "Connections returned to the pool", ["worker"])
+pool_timeouts = registry.counter(
+    "db_pool_timeouts", "Checkouts that gave up after DB_POOL_TIMEOUT seconds", ["worker"])
+pool_wait_seconds = registry.histogram(
+    "db_pool_wait_seconds", "Time spent waiting for a pooled connection", ["worker"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0))
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that records how long each checkout waited for a connection,
+    including time spent opening a new one and the pre-ping.
+    """
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            pool_timeouts.inc(worker=WORKER)
+            raise
+        finally:
+            pool_wait_seconds.observe(time.perf_counter() - start, worker=WORKER)
+
+def get_engine_options(url: str) -> dict:
+    """
+    Pool options from Settings. In-memory SQLite keeps SQLAlchemy's default pool,
+    since every new connection there would open a different empty database.
+    """
+    db_url = make_url(url)
+    if db_url.get_backend_name() == "sqlite" and db_url.database in (None, "", ":memory:"):
+        return {}
+    return {
+        "poolclass": InstrumentedAsyncQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+# Create the async SQLAlchemy engine
+engine = create_async_engine(get_async_database_url(settings.DATABASE_URL), **get_engine_options(settings.DATABASE_URL))
+instrument_engine(engine)
+
+@event.listens_for(engine.sync_engine.pool, "checkout")
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    pool_checkouts.inc(worker=WORKER)
+
+@event.listens_for(engine.sync_engine.pool, "checkin")
+def _on_checkin(dbapi_connection, connection_record):
+    pool_checkins.inc(worker=WORKER)
+
+def pool_status() -> dict:
+    """Current usage of this worker's pool, read at scrape time."""
+    pool = engine.sync_engine.pool
+    if not isinstance(pool, AsyncAdaptedQueuePool):
+        return {}
+    capacity = pool.size() + max(pool._max_overflow, 0)
+    checked_out = pool.checkedout()
+    return {
+        "size": pool.size(),
+        "max_overflow": pool._max_overflow,
+        "checked_out": checked_out,
+        "idle": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "saturation": checked_out / capacity if capacity else 0.0,
+    }
+
+registry.gauge(
+    "db_pool_connections", "Pool size, usage and saturation (checked_out / (size + max_overflow))",
+    ["worker", "state"],
+    callback=lambda: [({"worker": WORKER, "state": state}, value) for state, value in pool_status().items()]
+)
+
+# Create a sessionmaker for creating async database sessions
+# expire_on_commit=False keeps loaded attributes usable after commit without lazy IO
+AsyncSessionLocal = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
 
 # Create a base class for database models
 Base = declarative_base()
 
+def utcnow() -> datetime:
+    """The current UTC time without tzinfo, the way the DateTime columns store it."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def upsert_insert(db: AsyncSession, model):
+    """
+    INSERT statement with on_conflict_do_nothing / on_conflict_do_update for the
+    database behind `db`. Both PostgreSQL and SQLite spell ON CONFLICT the same way.
+    """
+    dialect = db.get_bind().dialect.name
+    return (postgresql.insert if dialect == "postgresql" else sqlite.insert)(model)
+
 # Dependency to get a database session for each request
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
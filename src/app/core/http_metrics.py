@@ -0,0 +1,48 @@
+import time
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .metrics import registry
+
+http_requests = registry.counter(
+    "http_requests", "HTTP requests handled", ["method", "route", "status"])
+http_request_seconds = registry.histogram(
+    "http_request_seconds", "HTTP request latency until the response is fully sent", ["method", "route", "status"])
+
+class MetricsMiddleware:
+    """
+    Records request count and latency per route template and status code.
+
+    Routes are labelled by their path template ("/quiz/jobs/{job_id}") rather than the raw
+    path, and unmatched paths share one label, so the number of series stays bounded.
+    Written as plain ASGI middleware so streaming responses are timed to their last chunk.
+    """
+
+    def __init__(self, app: ASGIApp, excluded_paths: tuple[str, ...] = ("/metrics",)):
+        self.app = app
+        self.excluded_paths = excluded_paths
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.excluded_paths:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            labels = {
+                "method": scope["method"],
+                "route": getattr(route, "path", None) or "unmatched",
+                "status": str(status_code),
+            }
+            http_requests.inc(**labels)
+            http_request_seconds.observe(time.perf_counter() - start, **labels)
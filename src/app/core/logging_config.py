@@ -1,19 +1,130 @@
+import atexit
+import copy
+import json
 import logging
+import logging.handlers
+import queue
+import random
 import sys
+from datetime import datetime, timezone
+from typing import Any, Optional, TextIO
 
-def setup_logging():
+from .config import settings
+
+# Attributes every LogRecord has, anything else was passed through `extra=`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats records as one JSON object per line, including any `extra=` fields.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "timestamp": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                payload[key] = value
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            payload["stack_info"] = self.formatStack(record.stack_info)
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+class ExceptionKeepingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Puts records on the queue with their message merged, like QueueHandler, but with
+    exc_info and stack_info kept, so the listener's formatter renders the traceback
+    itself (as its own JSON field with JsonFormatter) instead of finding it pasted
+    into the message.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        return record
+
+class Truncated:
+    """
+    Defers `str(value)` until a handler actually emits the record, then cuts it short.
+
+        logger.debug("ADK event %s", Truncated(event))
+    """
+    __slots__ = ("value", "max_chars")
+
+    def __init__(self, value: Any, max_chars: Optional[int] = None):
+        self.value = value
+        self.max_chars = settings.LOG_EVENT_MAX_CHARS if max_chars is None else max_chars
+
+    def __str__(self) -> str:
+        text = str(self.value)
+        if len(text) <= self.max_chars:
+            return text
+        return f"{text[:self.max_chars]}... [{len(text) - self.max_chars} more chars]"
+
+def sample_event_dump(logger: logging.Logger) -> bool:
+    """
+    Decides whether a run's debug event dump is written at all: only when DEBUG is
+    enabled for the logger, and then for LOG_EVENT_SAMPLE_RATE of the runs.
+    """
+    return logger.isEnabledFor(logging.DEBUG) and random.random() < settings.LOG_EVENT_SAMPLE_RATE
+
+def setup_logging(stream: TextIO = sys.stdout) -> logging.handlers.QueueListener:
     """
     Configures the application-wide logging.
+
+    Request handlers only put records on an in-memory queue. A background listener
+    thread formats them and writes to stdout and a size-rotated log file, so disk I/O
+    never blocks the event loop.
     """
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        handlers=[
-            logging.StreamHandler(sys.stdout),
-            logging.FileHandler("app.log", encoding="utf-8")
-        ]
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    formatter = (
+        JsonFormatter() if settings.LOG_JSON
+        else logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
     )
-    
+    handlers: list[logging.Handler] = [logging.StreamHandler(stream)]
+    if settings.LOG_FILE:
+        handlers.append(logging.handlers.RotatingFileHandler(
+            settings.LOG_FILE,
+            maxBytes=settings.LOG_FILE_MAX_BYTES,
+            backupCount=settings.LOG_FILE_BACKUP_COUNT,
+            encoding="utf-8",
+        ))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(ExceptionKeepingQueueHandler(log_queue))
+    root.setLevel(settings.LOG_LEVEL)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
     # Set third-party loggers to warning to reduce noise
     logging.getLogger("httpx").setLevel(logging.WARNING)
     logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING) # Set to INFO to see SQL queries
+    return _listener
+
+def stop_logging() -> None:
+    """Flushes queued records and stops the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
@@ -0,0 +1,125 @@
+import contextvars
+import logging
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Callable, Optional, TypeVar
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+F = TypeVar("F", bound=Callable)
+
+@dataclass
+class QueryStats:
+    """SQL statements issued while handling one request."""
+    statements: int = 0
+    duration: float = 0.0
+    by_statement: Counter = field(default_factory=Counter)
+
+    def most_repeated(self) -> tuple[Optional[str], int]:
+        if not self.by_statement:
+            return None, 0
+        return self.by_statement.most_common(1)[0]
+
+_current: contextvars.ContextVar[Optional[QueryStats]] = contextvars.ContextVar("query_stats", default=None)
+
+def current_query_stats() -> Optional[QueryStats]:
+    return _current.get()
+
+def detach_query_stats() -> None:
+    """Stops counting in the current task, for background work started by a request."""
+    _current.set(None)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None:
+        return
+    starts = conn.info.get("query_start")
+    if starts:
+        stats.duration += time.perf_counter() - starts.pop()
+    stats.statements += 1
+    stats.by_statement[statement] += 1
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Counts the statements sent through `engine` against the current request."""
+    if not event.contains(engine.sync_engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+def query_budget(max_statements: int) -> Callable[[F], F]:
+    """
+    Declares how many SQL statements a route may issue per request.
+
+        @router.get("/next")
+        @query_budget(5)
+        async def get_next_question(...): ...
+
+    Requests over budget are logged, and fail with a 500 when QUERY_BUDGET_ENFORCE is on (tests).
+    """
+    def decorator(fn: F) -> F:
+        fn.__query_budget__ = max_statements
+        return fn
+    return decorator
+
+class QueryStatsMiddleware:
+    """
+    Tracks the SQL statements of every HTTP request.
+
+    With DEBUG on, the count and time are returned in X-DB-Query-Count and
+    X-DB-Query-Time-Ms. The route's query_budget is checked before the response starts,
+    and a statement repeated QUERY_REPEAT_WARNING times or more is reported as a likely N+1.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current.set(stats)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message = self._check(scope, stats, message)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+
+    def _check(self, scope: Scope, stats: QueryStats, message: Message) -> Message:
+        route = scope.get("route")
+        path = getattr(route, "path", scope["path"])
+
+        statement, repeats = stats.most_repeated()
+        if repeats >= settings.QUERY_REPEAT_WARNING:
+            logger.warning(f"Possible N+1 on {path}: statement ran {repeats} times: {statement[:200]}")
+
+        budget = getattr(getattr(route, "endpoint", None), "__query_budget__", None)
+        if budget is not None and stats.statements > budget:
+            logger.warning(f"{path} issued {stats.statements} SQL statements, its budget is {budget}")
+            if settings.QUERY_BUDGET_ENFORCE:
+                # The route has already run, only its status can still change
+                message = {**message, "status": 500, "headers": list(message.get("headers", [])) + [
+                    (b"x-query-budget-exceeded", f"{stats.statements}/{budget}".encode()),
+                ]}
+
+        if settings.DEBUG:
+            message = {**message, "headers": list(message.get("headers", [])) + [
+                (b"x-db-query-count", str(stats.statements).encode()),
+                (b"x-db-query-time-ms", f"{stats.duration * 1000:.2f}".encode()),
+            ]}
+        return message
@@ -0,0 +1,61 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+class SingleFlight:
+    """
+    Collapses concurrent calls that share a key into a single execution.
+
+    The first caller for a key runs the function, every caller arriving while it is
+    still running awaits the same result instead of starting its own execution.
+    """
+
+    def __init__(self):
+        self._calls: dict[Hashable, asyncio.Future] = {}
+        self.executions = 0
+        self.deduplicated = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> tuple[Any, bool]:
+        """
+        Returns:
+            tuple: The result and whether it was shared from another caller's execution.
+        """
+        future = self._calls.get(key)
+        if future is not None:
+            self.deduplicated += 1
+            # shield() so a waiter that gets cancelled does not cancel the shared call
+            return await asyncio.shield(future), True
+
+        future = asyncio.get_running_loop().create_future()
+        # Mark errors as retrieved, there may be nobody else waiting for them
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._calls[key] = future
+        self.executions += 1
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            self._calls.pop(key, None)
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def stats(self) -> dict:
+        return {
+            "executions": self.executions,
+            "deduplicated": self.deduplicated,
+            "in_flight": self.in_flight,
+        }
+
+    def reset(self) -> None:
+        self._calls.clear()
+        self.executions = 0
+        self.deduplicated = 0
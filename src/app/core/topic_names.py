@@ -0,0 +1,11 @@
+import re
+
+def clean_topic(topic: str) -> str:
+    """The display form of a topic typed by a user: trimmed, with single spaces."""
+    return re.sub(r"\s+", " ", topic).strip()
+
+def normalize_topic(topic: str) -> str:
+    """
+    Builds the lookup key for a topic, so "Python", " python " and "PYTHON" share an entry.
+    """
+    return clean_topic(topic).casefold()
@@ -1,12 +1,38 @@
-from fastapi import FastAPI
+import asyncio
+import contextlib
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from .api.quiz_routes import router as quiz_router
+from .api.results_routes import router as results_router
+from .api.topic_routes import router as topic_router
+from .core.cache import close_cache_backend
+from .core.config import settings
+from .core import metrics
+from .core.http_metrics import MetricsMiddleware
 from .core.logging_config import setup_logging
+from .core.query_budget import QueryStatsMiddleware
+from .services.quiz_cache import run_prewarm_loop
 
 # Initialize logging before creating the app
 setup_logging()
 
-app = FastAPI(title="Quizzly.ai - AI-Powered Quiz Platform")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Start the quiz cache pre-warm job in the background
+    prewarm_task = None
+    if settings.QUIZ_CACHE_ENABLED and settings.QUIZ_CACHE_PREWARM_TOPICS > 0:
+        prewarm_task = asyncio.create_task(run_prewarm_loop())
+
+    yield
+
+    if prewarm_task:
+        prewarm_task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await prewarm_task
+    await close_cache_backend()
+
+app = FastAPI(title="Quizzly.ai - AI-Powered Quiz Platform", lifespan=lifespan)
 
 # Add CORS middleware to allow frontend connections
 app.add_middleware(
@@ -17,9 +43,22 @@ app.add_middleware(
     allow_headers=["*"],  # Allow all headers
 )
 
-# Register the quiz routes
+# Request count and latency per route, served on /metrics
+app.add_middleware(MetricsMiddleware)
+
+# SQL statements per request, checked against each route's query_budget
+app.add_middleware(QueryStatsMiddleware)
+
+# Register the quiz, results and topic routes
 app.include_router(quiz_router)
+app.include_router(results_router)
+app.include_router(topic_router)
 
 @app.get("/")
 async def root():
     return {"message": "Welcome to Quizzly.ai - Your AI-Powered Quiz Platform"}
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    # Prometheus scrape endpoint, each worker reports its own numbers
+    return Response(content=metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
@@ -1,3 +1,4 @@
 from .quiz import Question, Choice
-from .session import QuizSession, UserAnswer
-from .result import QuizResult
+from .session import QuizSession, SessionQuestion, UserAnswer
+from .result import QuizResult, TopicStats
+from .topic import Topic
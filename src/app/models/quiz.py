@@ -6,7 +6,7 @@ class Question(Base):
     __tablename__ = "questions"
 
     id = Column(Integer, primary_key=True, index=True)
-    question_text = Column(String, index=True)
+    question_text = Column(String)
     topic = Column(String, index=True)
     
     # Relationship to choices
@@ -16,7 +16,7 @@ class Choice(Base):
     __tablename__ = "choices"
 
     id = Column(Integer, primary_key=True, index=True)
-    choice_text = Column(String, index=True)
+    choice_text = Column(String)
     is_correct = Column(Boolean, default=False)
     question_id = Column(Integer, ForeignKey("questions.id"))
 
@@ -1,6 +1,5 @@
-from sqlalchemy import Column, Integer, String, DateTime
-from datetime import datetime
-from ..core.database import Base
+from sqlalchemy import Column, Integer, String, DateTime, Index
+from ..core.database import Base, utcnow
 
 class QuizResult(Base):
     __tablename__ = "quiz_results"
@@ -10,5 +9,25 @@ class QuizResult(Base):
     user_email = Column(String, index=True)
     topic = Column(String, index=True)
     score = Column(Integer)
-    total_questions = Column(Integer, default=5)
-    completed_at = Column(DateTime, default=datetime.utcnow)
+    total_questions = Column(Integer)
+    completed_at = Column(DateTime, default=utcnow)
+
+    # Leaderboard order (score DESC, completed_at, id) overall and per topic, read with keyset pagination
+    __table_args__ = (
+        Index("ix_quiz_results_leaderboard", score.desc(), "completed_at", "id"),
+        Index("ix_quiz_results_topic_leaderboard", "topic", score.desc(), "completed_at", "id"),
+    )
+
+class TopicStats(Base):
+    """
+    Running totals of the results of each topic, updated by every finalized quiz
+    so topic analytics never scan quiz_results.
+    """
+    __tablename__ = "topic_stats"
+
+    topic = Column(String, primary_key=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    total_score = Column(Integer, nullable=False, default=0)
+    total_questions = Column(Integer, nullable=False, default=0)
+    best_score = Column(Integer, nullable=False, default=0)
+    last_completed_at = Column(DateTime)
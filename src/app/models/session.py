@@ -1,20 +1,48 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, DateTime, Index
 from sqlalchemy.orm import relationship
-from datetime import datetime
-from ..core.database import Base
+from ..core.database import Base, utcnow
 
 class QuizSession(Base):
     __tablename__ = "quiz_sessions"
 
     id = Column(Integer, primary_key=True, index=True)
     topic = Column(String, index=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=utcnow)
     status = Column(String, default="active") # active, completed
     total_score = Column(Integer, default=0)
+    question_count = Column(Integer)  # Questions in this quiz
+    answered_count = Column(Integer, default=0, server_default="0")  # Questions answered so far
 
     # Relationship to user answers
     answers = relationship("UserAnswer", back_populates="session", cascade="all, delete-orphan")
 
+    # Questions served in this session, in order
+    questions = relationship(
+        "SessionQuestion",
+        back_populates="session",
+        order_by="SessionQuestion.position",
+        cascade="all, delete-orphan"
+    )
+
+class SessionQuestion(Base):
+    __tablename__ = "session_questions"
+
+    # The (session_id, position) primary key doubles as the index for "next question" lookups
+    session_id = Column(Integer, ForeignKey("quiz_sessions.id", ondelete="CASCADE"), primary_key=True)
+    position = Column(Integer, primary_key=True)
+    question_id = Column(Integer, ForeignKey("questions.id"), nullable=False, index=True)
+
+    session = relationship("QuizSession", back_populates="questions")
+    question = relationship("Question")
+
+    # Answers given to this question in this session, lets one query load questions and progress
+    answers = relationship(
+        "UserAnswer",
+        primaryjoin="and_(foreign(UserAnswer.session_id) == SessionQuestion.session_id, "
+                    "foreign(UserAnswer.question_id) == SessionQuestion.question_id)",
+        viewonly=True,
+    )
+
 class UserAnswer(Base):
     __tablename__ = "user_answers"
 
@@ -26,3 +54,8 @@ class UserAnswer(Base):
 
     # Relationship back to session
     session = relationship("QuizSession", back_populates="answers")
+
+    __table_args__ = (
+        # One answer per question and session, re-submits are ignored by the upsert in quiz_repository
+        Index("uq_user_answers_session_question", "session_id", "question_id", unique=True),
+    )
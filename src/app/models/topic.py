@@ -0,0 +1,45 @@
+from sqlalchemy import Column, Integer, String, DateTime, DDL, Index, event, func, literal_column
+from ..core.database import Base, utcnow
+
+class Topic(Base):
+    """
+    One row per normalized topic, so "Python", "python " and "PYTHON" are a single topic
+    with a single question bank. `name` is the spelling the topic was first generated
+    with, stored on its questions, sessions and results.
+    """
+    __tablename__ = "topics"
+
+    key = Column(String, primary_key=True)  # core.topic_names.normalize_topic(name)
+    name = Column(String, nullable=False)
+    question_count = Column(Integer, nullable=False, default=0, server_default="0")
+    updated_at = Column(DateTime, default=utcnow)
+
+    # Topic search on PostgreSQL: word prefixes through the tsvector index, typos through trigrams
+    __table_args__ = (
+        Index(
+            "ix_topics_name_tsv", func.to_tsvector(literal_column("'simple'"), name), postgresql_using="gin"
+        ).ddl_if(dialect="postgresql"),
+        Index(
+            "ix_topics_key_trgm", key, postgresql_using="gin", postgresql_ops={"key": "gin_trgm_ops"}
+        ).ddl_if(dialect="postgresql"),
+    )
+
+# Topic search on SQLite: an FTS5 index over topics.name, kept in sync by triggers
+SQLITE_TOPIC_SEARCH_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS topics_fts USING fts5("
+    "name, content='topics', content_rowid='rowid', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS topics_fts_insert AFTER INSERT ON topics BEGIN "
+    "INSERT INTO topics_fts (rowid, name) VALUES (new.rowid, new.name); END",
+    "CREATE TRIGGER IF NOT EXISTS topics_fts_delete AFTER DELETE ON topics BEGIN "
+    "INSERT INTO topics_fts (topics_fts, rowid, name) VALUES ('delete', old.rowid, old.name); END",
+    "CREATE TRIGGER IF NOT EXISTS topics_fts_update AFTER UPDATE OF name ON topics BEGIN "
+    "INSERT INTO topics_fts (topics_fts, rowid, name) VALUES ('delete', old.rowid, old.name); "
+    "INSERT INTO topics_fts (rowid, name) VALUES (new.rowid, new.name); END",
+)
+
+event.listen(
+    Topic.__table__, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql")
+)
+for statement in SQLITE_TOPIC_SEARCH_DDL:
+    event.listen(Topic.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(Topic.__table__, "after_drop", DDL("DROP TABLE IF EXISTS topics_fts").execute_if(dialect="sqlite"))
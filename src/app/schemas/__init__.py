@@ -1,9 +1,23 @@
 from .quiz import (
     QuestionResponse,
+    GeneratedChoice,
+    GeneratedQuestion,
+    GeneratedQuiz,
     QuizGenerateRequest,
-    QuizGenerateResponse,
+    QuizJobResponse,
     AnswerSubmission,
     AnswerValidationResponse,
+    BatchAnswer,
+    BatchAnswerSubmission,
+    BatchAnswerResult,
+    BatchAnswerResponse,
     QuizFinalizeRequest,
-    QuizResultResponse
+    QuizResultResponse,
+    LeaderboardEntry,
+    LeaderboardResponse,
+    TopicStatsResponse,
+    TopicSuggestion,
+    TopicSearchResponse,
+    QuizCacheStatsResponse,
+    GenerationStatsResponse
 )
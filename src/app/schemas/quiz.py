@@ -1,6 +1,8 @@
-from pydantic import BaseModel, EmailStr, ConfigDict
+from pydantic import BaseModel, EmailStr, ConfigDict, Field, field_validator
 from typing import List, Optional
 from datetime import datetime
+from ..core.config import settings
+from ..core.topic_names import clean_topic
 
 # --- Choices & Questions ---
 
@@ -21,13 +23,46 @@ class QuestionResponse(BaseModel):
 
 # --- Quiz Generation ---
 
+class GeneratedChoice(BaseModel):
+    choice_text: str = Field(min_length=1)
+    is_correct: bool = False
+
+class GeneratedQuestion(BaseModel):
+    """A question as produced by the agent, validated before anything is written to the database."""
+    question_text: str = Field(min_length=1)
+    choices: List[GeneratedChoice] = Field(min_length=2)
+
+    @field_validator("choices")
+    @classmethod
+    def exactly_one_correct(cls, choices: List[GeneratedChoice]) -> List[GeneratedChoice]:
+        if sum(1 for c in choices if c.is_correct) != 1:
+            raise ValueError("each question needs exactly one correct choice")
+        return choices
+
+class GeneratedQuiz(BaseModel):
+    """The JSON document requested from the model in direct generation mode."""
+    questions: List[GeneratedQuestion] = Field(min_length=1)
+
 class QuizGenerateRequest(BaseModel):
     topic: str
-
-class QuizGenerateResponse(BaseModel):
-    session_id: int
+    question_count: int = Field(default=settings.QUIZ_DEFAULT_QUESTIONS, ge=1, le=settings.QUIZ_MAX_QUESTIONS)
+
+    @field_validator("topic")
+    @classmethod
+    def clean(cls, topic: str) -> str:
+        topic = clean_topic(topic)
+        if not topic:
+            raise ValueError("topic must not be empty")
+        return topic
+
+class QuizJobResponse(BaseModel):
+    job_id: str
+    topic: str
+    status: str  # pending, running, completed, failed
+    session_id: Optional[int] = None
     message: str
-    total_questions: int = 5
+    total_questions: int
+    error: Optional[str] = None
 
 # --- Answer Submission ---
 
@@ -42,6 +77,27 @@ class AnswerValidationResponse(BaseModel):
     explanation: Optional[str] = None
     next_question_available: bool
 
+class BatchAnswer(BaseModel):
+    question_id: int
+    choice_id: int
+
+class BatchAnswerSubmission(BaseModel):
+    session_id: int
+    answers: List[BatchAnswer] = Field(min_length=1, max_length=200)
+
+class BatchAnswerResult(BaseModel):
+    question_id: int
+    is_correct: bool
+    correct_choice_id: Optional[int] = None
+    explanation: Optional[str] = None
+    already_answered: bool = False  # The answer recorded earlier was graded instead of this one
+
+class BatchAnswerResponse(BaseModel):
+    results: List[BatchAnswerResult]
+    score: int
+    answered_count: int
+    next_question_available: bool
+
 # --- Finalization & Results ---
 
 class QuizFinalizeRequest(BaseModel):
@@ -59,3 +115,48 @@ class QuizResultResponse(BaseModel):
 
     model_config = ConfigDict(from_attributes=True)
 
+class LeaderboardEntry(BaseModel):
+    user_name: str
+    topic: str
+    score: int
+    total_questions: int
+    percentage: float
+    completed_at: datetime
+
+class LeaderboardResponse(BaseModel):
+    entries: List[LeaderboardEntry]
+    next_cursor: Optional[str] = None  # Pass back as ?cursor= for the next page, None on the last page
+
+class TopicStatsResponse(BaseModel):
+    topic: str
+    attempts: int
+    average_score: float
+    average_percentage: float
+    best_score: int
+    last_completed_at: Optional[datetime] = None
+
+# --- Topics ---
+
+class TopicSuggestion(BaseModel):
+    topic: str
+    question_count: int  # Stored questions, quizzes up to this length start without generation
+
+class TopicSearchResponse(BaseModel):
+    suggestions: List[TopicSuggestion]
+
+# --- Caching ---
+
+class QuizCacheStatsResponse(BaseModel):
+    size: Optional[int] = None  # Not reported by the Redis backend
+    max_size: int
+    ttl_seconds: float
+    hits: int
+    misses: int
+    evictions: int
+    hit_ratio: float
+
+class GenerationStatsResponse(BaseModel):
+    executions: int  # Agent runs actually started
+    deduplicated: int  # Requests served by another request's agent run
+    in_flight: int
+    total_generations: int = 0  # Successful generations across all workers sharing the cache
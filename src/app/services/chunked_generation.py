@@ -0,0 +1,142 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+
+from ..agent.tools import initialize_quiz_session
+from ..core.config import settings
+from ..schemas.quiz import GeneratedQuestion
+from .direct_generation import QuizOutputError, chunk_sizes, request_quiz
+from .question_index import QuestionIndex, signature
+
+logger = logging.getLogger(__name__)
+
+# Aspects of a topic handed to the chunks in turn, so parallel calls do not all write
+# the same introductory questions
+SUBTOPIC_FOCUSES = (
+    "core concepts and definitions",
+    "common misconceptions",
+    "practical applications",
+    "problem solving and worked examples",
+    "terminology and notation",
+    "history and key contributors",
+    "comparisons with related ideas",
+    "advanced details and edge cases",
+)
+
+# Extra rounds asked for when deduplication or failed chunks leave the quiz short
+TOP_UP_ROUNDS = 1
+
+@dataclass(frozen=True)
+class Chunk:
+    size: int
+    focus: str
+
+def plan_chunks(question_count: int, offset: int = 0) -> list[Chunk]:
+    """Splits a quiz into chunk requests that each fit in OPENROUTER_MAX_TOKENS, one focus per chunk."""
+    return [
+        Chunk(size=size, focus=SUBTOPIC_FOCUSES[(offset + i) % len(SUBTOPIC_FOCUSES)])
+        for i, size in enumerate(chunk_sizes(question_count))
+    ]
+
+class QuestionDeduplicator:
+    """
+    Keeps the first of every group of near-identical questions.
+
+    Questions are compared through their MinHash signatures in a QuestionIndex, the way
+    stored questions are matched for reuse, so rewordings like "What is X?" / "What's X"
+    from different chunks are caught as well.
+    """
+
+    def __init__(self, threshold: float):
+        self._index = QuestionIndex(threshold)
+        self.questions: list[GeneratedQuestion] = []
+        self.dropped = 0
+
+    def add(self, question: GeneratedQuestion) -> bool:
+        sig = signature(question.question_text)
+        if self._index.find_similar("", question.question_text, sig) is not None:
+            self.dropped += 1
+            return False
+        self._index.add(len(self.questions), "", question.question_text, sig)
+        self.questions.append(question)
+        return True
+
+async def _request_chunks(
+    topic: str, chunks: list[Chunk], semaphore: asyncio.Semaphore, on_chunk_done: Callable[[], Awaitable[None]]
+) -> list[Optional[list[GeneratedQuestion]]]:
+    """Runs the chunk requests concurrently, a failed chunk comes back as None."""
+    async def run(chunk: Chunk) -> Optional[list[GeneratedQuestion]]:
+        async with semaphore:
+            try:
+                quiz = await request_quiz(topic, chunk.size, focus=chunk.focus)
+            except QuizOutputError as e:
+                logger.warning(f"Chunk '{chunk.focus}' of topic '{topic}' returned an invalid quiz: {e}")
+                return None
+            except Exception as e:
+                logger.error(f"Chunk '{chunk.focus}' of topic '{topic}' failed: {e}")
+                return None
+        await on_chunk_done()
+        return quiz.questions[:chunk.size]
+
+    return await asyncio.gather(*(run(chunk) for chunk in chunks))
+
+async def generate_quiz_chunked(
+    topic: str, question_count: int, report_progress: Callable[[str], Awaitable[None]]
+) -> int:
+    """
+    Generates a long quiz with concurrent structured-output calls and saves it in one transaction.
+
+    The quiz is split into chunks of at most questions_per_chunk() questions, each on its
+    own subtopic, run at most GENERATION_CHUNK_CONCURRENCY at a time. Near-identical
+    questions across chunks are dropped and the shortfall, if any, is asked for again
+    in up to TOP_UP_ROUNDS more rounds. Wall time grows with the number of chunk rounds
+    rather than the number of questions.
+
+    Returns:
+        int: The ID of the new QuizSession.
+
+    Raises:
+        QuizOutputError: The chunks produced fewer than `question_count` distinct questions,
+            even after the top-up rounds.
+    """
+    semaphore = asyncio.Semaphore(settings.GENERATION_CHUNK_CONCURRENCY)
+    dedup = QuestionDeduplicator(settings.QUESTION_SIMILARITY_THRESHOLD)
+    chunks = plan_chunks(question_count)
+    done = 0
+    total = len(chunks)
+
+    async def on_chunk_done() -> None:
+        nonlocal done
+        done += 1
+        await report_progress(f"Wrote {done} of {total} question sets")
+
+    for round_number in range(TOP_UP_ROUNDS + 1):
+        for questions in await _request_chunks(topic, chunks, semaphore, on_chunk_done):
+            for question in questions or ():
+                if len(dedup.questions) < question_count:
+                    dedup.add(question)
+
+        missing = question_count - len(dedup.questions)
+        if missing <= 0 or round_number == TOP_UP_ROUNDS:
+            break
+        # Ask for the shortfall on the next subtopics
+        chunks = plan_chunks(missing, offset=total)
+        total += len(chunks)
+        logger.info(f"Topic '{topic}' is {missing} question(s) short after round {round_number + 1}")
+
+    logger.info(
+        f"Chunked generation for topic '{topic}': {len(dedup.questions)}/{question_count} questions, "
+        f"{total} chunk(s), {dedup.dropped} duplicate(s) dropped"
+    )
+    if len(dedup.questions) < question_count:
+        # A shorter quiz than the one asked for is not saved
+        raise QuizOutputError(
+            f"Only {len(dedup.questions)} of {question_count} questions could be generated for topic '{topic}'"
+        )
+
+    await report_progress("Saving your questions")
+    session_id = await initialize_quiz_session(topic, [q.model_dump() for q in dedup.questions])
+    if session_id == -1:
+        raise QuizOutputError(f"The quiz for topic '{topic}' could not be saved")
+    return session_id
@@ -0,0 +1,110 @@
+import json
+import logging
+import re
+import time
+from typing import Optional
+from pydantic import ValidationError
+
+from ..agent.prompts import DIRECT_INSTRUCTION
+from ..agent.telemetry import llm_call_seconds, llm_tokens, llm_tokens_total
+from ..core.config import settings
+from ..core.database import AsyncSessionLocal
+from ..schemas.quiz import GeneratedQuiz
+from .quiz_store import create_quiz_session
+
+logger = logging.getLogger(__name__)
+
+class QuizOutputError(ValueError):
+    """Raised when the model's reply is not a valid quiz document."""
+
+# Some models wrap JSON replies in a markdown code fence even when asked not to
+_CODE_FENCE = re.compile(r"^\s*```(?:json)?\s*(.*?)\s*```\s*$", re.DOTALL)
+
+def quiz_response_format() -> dict:
+    """OpenAI style response_format asking for a document that matches GeneratedQuiz."""
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": "quiz", "schema": GeneratedQuiz.model_json_schema()},
+    }
+
+def parse_quiz(content: str) -> GeneratedQuiz:
+    match = _CODE_FENCE.match(content or "")
+    try:
+        return GeneratedQuiz.model_validate_json(match.group(1) if match else content or "")
+    except ValidationError as e:
+        raise QuizOutputError(f"Model reply is not a valid quiz: {e}") from e
+
+def questions_per_chunk() -> int:
+    """How many questions one call can return within OPENROUTER_MAX_TOKENS."""
+    return max(1, settings.OPENROUTER_MAX_TOKENS // settings.GENERATION_TOKENS_PER_QUESTION)
+
+def chunk_sizes(question_count: int) -> list[int]:
+    """
+    Splits a quiz into calls of at most questions_per_chunk() questions, as even as possible,
+    e.g. 30 questions at 13 per call -> [10, 10, 10].
+    """
+    chunks = -(-question_count // questions_per_chunk())
+    base, extra = divmod(question_count, chunks)
+    return [base + 1 if i < extra else base for i in range(chunks)]
+
+def _record_usage(response, model: str) -> None:
+    usage = getattr(response, "usage", None)
+    if not usage:
+        return
+    for direction, tokens in (("in", usage.prompt_tokens), ("out", usage.completion_tokens)):
+        if tokens:
+            llm_tokens.observe(tokens, model=model, direction=direction)
+            llm_tokens_total.inc(tokens, model=model, direction=direction)
+
+async def request_quiz(topic: str, question_count: int, focus: Optional[str] = None) -> GeneratedQuiz:
+    """
+    Asks the model for `question_count` questions in a single call and validates the JSON it returns.
+    `focus` narrows the questions down to one aspect of the topic.
+    """
+    # litellm is slow to import, only load it once direct mode is used
+    import litellm
+
+    model = settings.OPENROUTER_MODEL
+    start = time.perf_counter()
+    try:
+        response = await litellm.acompletion(
+            model=model,
+            api_key=settings.OPEN_ROUTER_API_KEY,
+            api_base=settings.OPENROUTER_API_BASE,
+            max_tokens=settings.OPENROUTER_MAX_TOKENS,
+            temperature=settings.OPENROUTER_TEMPERATURE,
+            response_format=quiz_response_format(),
+            messages=[
+                {"role": "system", "content": DIRECT_INSTRUCTION.format(question_count=question_count)},
+                {"role": "user", "content": (
+                    f"Write {question_count} questions" + (f" focusing on {focus}" if focus else "") + f". Topic: {topic}"
+                )},
+            ],
+        )
+    except Exception:
+        llm_call_seconds.observe(time.perf_counter() - start, model=model, outcome="error")
+        raise
+    llm_call_seconds.observe(time.perf_counter() - start, model=model, outcome="ok")
+    _record_usage(response, model)
+
+    return parse_quiz(response.choices[0].message.content)
+
+async def generate_quiz_direct(topic: str, question_count: int) -> int:
+    """
+    Generates a quiz with one structured-output LLM call and saves it in one transaction.
+    Quizzes longer than questions_per_chunk() go through chunked_generation instead.
+
+    Returns:
+        int: The ID of the new QuizSession.
+
+    Raises:
+        QuizOutputError: The reply is not a valid quiz or has fewer than `question_count` questions.
+    """
+    quiz = await request_quiz(topic, question_count)
+    logger.info(f"Direct generation returned {len(quiz.questions)} questions for topic: {topic}")
+    if len(quiz.questions) < question_count:
+        raise QuizOutputError(f"Model returned {len(quiz.questions)} of {question_count} questions")
+
+    async with AsyncSessionLocal() as db:
+        async with db.begin():
+            return await create_quiz_session(db, topic, quiz.questions[:question_count])
@@ -0,0 +1,223 @@
+import logging
+import time
+from contextlib import aclosing
+from typing import Awaitable, Callable, Optional
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+from ..agent.core import get_educator_agent
+from ..agent.runner_pool import RunnerPool
+from ..core.config import settings
+from ..core.database import AsyncSessionLocal
+from ..core.logging_config import Truncated, sample_event_dump
+from ..core.metrics import registry
+from ..core.single_flight import SingleFlight
+from ..core.topic_names import normalize_topic
+from . import quiz_cache
+from .generation_jobs import job_manager
+from .chunked_generation import generate_quiz_chunked
+from .direct_generation import QuizOutputError, generate_quiz_direct, questions_per_chunk
+
+logger = logging.getLogger(__name__)
+
+# Callback used to report human readable progress while a quiz is generated
+ProgressCallback = Callable[[str], Awaitable[None]]
+
+class GenerationError(Exception):
+    """Raised when the agent run finishes without a usable quiz session."""
+
+generation_seconds = registry.histogram(
+    "quiz_generation_seconds", "Duration of a full generation, from prompt to saved quiz", ["mode", "outcome"])
+
+# One agent execution per topic, quiz length and model settings, shared by every concurrent request
+generation_flight = SingleFlight()
+
+# ADK sessions need a user, every generation runs under the same service account
+AGENT_USER_ID = "quiz-generator"
+
+def create_runner() -> InMemoryRunner:
+    # We use app_name="agents" to match the default agent directory structure in ADK
+    return InMemoryRunner(agent=get_educator_agent(), app_name="agents")
+
+# Runners shared by all generations, each run gets its own short-lived ADK session
+runner_pool = RunnerPool(settings.AGENT_RUNNER_POOL_SIZE, create_runner)
+
+async def _noop_progress(message: str) -> None:
+    return None
+
+def generation_key(topic: str, question_count: int) -> tuple:
+    return (
+        normalize_topic(topic),
+        question_count,
+        settings.OPENROUTER_MODEL,
+        settings.OPENROUTER_TEMPERATURE,
+    )
+
+async def generate_quiz_session(
+    topic: str, question_count: int, report_progress: Optional[ProgressCallback] = None
+) -> int:
+    """
+    Generates a quiz of `question_count` questions for a topic and returns the ID of a
+    quiz session owned by the caller.
+
+    Topics with enough stored questions are served from them, under any spelling of the
+    topic. Concurrent calls for the same topic and length share a single agent run. The caller that started
+    the run gets the session created by the agent, every other caller gets its own clone.
+    Only the caller that starts a run takes a generation slot, the others wait for its result.
+    """
+    report_progress = report_progress or _noop_progress
+
+    # A run for this topic may have finished moments ago
+    bank = await quiz_cache.get_cached_bank(topic, question_count, record_stats=False)
+    if bank:
+        async with AsyncSessionLocal() as db:
+            return await quiz_cache.create_session_from_bank(db, bank, question_count)
+
+    # Questions stored by earlier runs, when the cache no longer holds the topic
+    async with AsyncSessionLocal() as db:
+        bank = await quiz_cache.load_bank_for_topic(db, topic)
+        if bank and len(bank.question_ids) >= question_count:
+            await quiz_cache.store_bank(topic, bank)
+            await report_progress("Reusing questions generated for the same topic")
+            return await quiz_cache.create_session_from_bank(db, bank, question_count)
+
+    session_id, shared = await generation_flight.do(
+        generation_key(topic, question_count),
+        lambda: _run_in_slot(topic, question_count, report_progress)
+    )
+    if not shared:
+        return session_id
+
+    await report_progress("Reusing a quiz generated for the same topic")
+    return await clone_quiz_session(session_id)
+
+async def _run_in_slot(topic: str, question_count: int, report_progress: ProgressCallback) -> int:
+    if job_manager.slots_busy:
+        await report_progress("Your quiz is waiting for a free generator")
+    async with job_manager.slot():
+        return await run_generation(topic, question_count, report_progress)
+
+async def clone_quiz_session(session_id: int) -> int:
+    """
+    Creates a new quiz session over the questions of an existing one.
+    """
+    async with AsyncSessionLocal() as db:
+        bank = await quiz_cache.load_bank_for_session(db, session_id)
+        if not bank:
+            raise GenerationError(f"Quiz session {session_id} has no questions to clone.")
+        return await quiz_cache.create_session_from_bank(db, bank)
+
+# Progress shown to the user when the agent calls one of its tools
+TOOL_PROGRESS = {
+    "get_educational_context": "The AI agent is researching the topic",
+    "initialize_quiz_session": "Saving your questions",
+}
+
+def find_session_id(event) -> Optional[int]:
+    """
+    Returns the result of an initialize_quiz_session call carried by a runner event, if any.
+    """
+    if not event.content or not event.content.parts:
+        return None
+    for part in event.content.parts:
+        function_response = getattr(part, "function_response", None)
+        if function_response and function_response.name == "initialize_quiz_session":
+            return function_response.response.get("result")
+    return None
+
+def find_tool_calls(event) -> list[str]:
+    if not event.content or not event.content.parts:
+        return []
+    return [
+        part.function_call.name for part in event.content.parts
+        if getattr(part, "function_call", None)
+    ]
+
+async def run_generation(topic: str, question_count: int, report_progress: ProgressCallback) -> int:
+    """
+    Generates a quiz with the configured GENERATION_MODE and returns the ID of the new session.
+
+    "agent" lets the educator agent research the topic and save the quiz through its tools.
+    "direct" asks the model for the quiz as JSON documents and saves it ourselves.
+
+    The agent saves the whole quiz with one tool call, which has to fit in one reply of
+    OPENROUTER_MAX_TOKENS. Quizzes longer than that always use "chunked" mode: concurrent
+    direct calls on different subtopics, deduplicated and saved together.
+    """
+    mode = settings.GENERATION_MODE
+    if question_count > questions_per_chunk():
+        mode = "chunked"
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        if mode == "chunked":
+            session_id = await _run_chunked(topic, question_count, report_progress)
+        elif mode == "direct":
+            session_id = await _run_direct(topic, question_count, report_progress)
+        else:
+            session_id = await _run_agent(topic, question_count, report_progress)
+        outcome = "ok"
+    finally:
+        generation_seconds.observe(time.perf_counter() - start, mode=mode, outcome=outcome)
+
+    await quiz_cache.bank_cache().incr("generations")
+
+    async with AsyncSessionLocal() as db:
+        generated_bank = await quiz_cache.load_bank_for_session(db, session_id)
+    # The agent saves whatever its tool call carried, which can be fewer questions than asked for
+    if not generated_bank or len(generated_bank.question_ids) < question_count:
+        saved = len(generated_bank.question_ids) if generated_bank else 0
+        raise GenerationError(f"The quiz was saved with {saved} of {question_count} questions.")
+
+    # Remember the generated questions so the next request for this topic skips the LLM
+    await quiz_cache.store_bank(topic, generated_bank)
+
+    return session_id
+
+async def _run_direct(topic: str, question_count: int, report_progress: ProgressCallback) -> int:
+    await report_progress("The AI is writing your questions")
+    try:
+        return await generate_quiz_direct(topic, question_count)
+    except QuizOutputError as e:
+        raise GenerationError(str(e)) from e
+
+async def _run_chunked(topic: str, question_count: int, report_progress: ProgressCallback) -> int:
+    await report_progress("The AI is writing your questions")
+    try:
+        return await generate_quiz_chunked(topic, question_count, report_progress)
+    except QuizOutputError as e:
+        raise GenerationError(str(e)) from e
+
+async def _run_agent(topic: str, question_count: int, report_progress: ProgressCallback) -> int:
+    # 1. Trigger the ADK Agent
+    # The agent will use its tools to find context and save the quiz to the DB
+    prompt = f"Please generate a professional quiz of {question_count} questions about {topic}."
+
+    logger.info(f"Starting quiz generation for topic: {topic}")
+    await report_progress("The AI agent is writing your questions")
+
+    # 2. Consume the runner's events as they arrive and stop as soon as the quiz is saved.
+    # Events are not kept, only a sample of runs is logged at DEBUG level.
+    log_events = sample_event_dump(logger)
+    session_id = None
+    event_count = 0
+    message = types.Content(role="user", parts=[types.Part(text=prompt)])
+    async with runner_pool.session(AGENT_USER_ID) as (runner, session):
+        events = runner.run_async(user_id=AGENT_USER_ID, session_id=session.id, new_message=message)
+        async with aclosing(events):
+            async for event in events:
+                event_count += 1
+                if log_events:
+                    logger.debug("runner event %d for topic '%s': %s", event_count, topic, Truncated(event))
+
+                for tool_name in find_tool_calls(event):
+                    if tool_name in TOOL_PROGRESS:
+                        await report_progress(TOOL_PROGRESS[tool_name])
+
+                session_id = find_session_id(event)
+                if session_id is not None:
+                    break
+
+    if not session_id or session_id == -1:
+        raise GenerationError("AI Agent failed to initialize the quiz session.")
+    return session_id
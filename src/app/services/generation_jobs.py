@@ -0,0 +1,231 @@
+import asyncio
+import logging
+import time
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+from ..core.cache import CacheNamespace, get_cache_backend
+from ..core.config import settings
+from ..core.query_budget import detach_query_stats
+
+logger = logging.getLogger(__name__)
+
+class JobStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+TERMINAL_STATUSES = {JobStatus.COMPLETED, JobStatus.FAILED}
+
+# A generation function receives the topic, the number of questions and a progress callback
+# and returns a session ID
+GenerateFn = Callable[[str, int, Callable[[str], Awaitable[None]]], Awaitable[int]]
+
+# How often a stream re-reads a job that runs on another worker
+REMOTE_POLL_SECONDS = 0.5
+
+class JobQueueFullError(Exception):
+    """Raised when too many generation jobs are already waiting for a worker."""
+
+@dataclass
+class GenerationJob:
+    id: str
+    topic: str
+    question_count: int
+    status: JobStatus = JobStatus.PENDING
+    session_id: Optional[int] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    events: list[dict] = field(default_factory=list)
+    _changed: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in TERMINAL_STATUSES
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "topic": self.topic,
+            "question_count": self.question_count,
+            "status": self.status.value,
+            "session_id": self.session_id,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "events": self.events,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "GenerationJob":
+        return cls(**{**data, "status": JobStatus(data["status"])})
+
+    def publish(self, event_type: str, message: str) -> None:
+        """Records a progress event and wakes up every stream waiting on this job."""
+        self.events.append({
+            "type": event_type,
+            "status": self.status.value,
+            "message": message,
+            "session_id": self.session_id,
+            "error": self.error,
+        })
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+def job_cache() -> CacheNamespace:
+    """Job snapshots keyed by job id, in the configured cache backend."""
+    return get_cache_backend().namespace(
+        "generation_jobs",
+        max_size=settings.GENERATION_JOB_CACHE_MAX_JOBS,
+        ttl_seconds=settings.GENERATION_JOB_TTL_SECONDS,
+    )
+
+class GenerationJobManager:
+    """
+    Runs quiz generations in the background on a bounded pool of workers.
+
+    Every request gets its own job and session. Deduplicating agent runs for the
+    same topic is handled by the generation function itself, which also takes one of
+    the max_concurrency slots around the runs it actually executes, so jobs that join
+    a run in flight or reuse stored questions do not hold one.
+
+    The worker running a job keeps it in memory and mirrors every change to the cache
+    backend, so with CACHE_BACKEND=redis any uvicorn worker can report and stream it.
+    With the memory backend a job is only visible to the worker that accepted it.
+    """
+
+    def __init__(self, max_concurrency: int, max_pending: int, job_ttl_seconds: float):
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending
+        self.job_ttl_seconds = job_ttl_seconds
+        self._jobs: dict[str, GenerationJob] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def submit(self, topic: str, question_count: int, generate: GenerateFn) -> GenerationJob:
+        self._prune_finished_jobs()
+
+        if len(self._tasks) >= self.max_pending:
+            raise JobQueueFullError("Too many quizzes are being generated right now. Please try again shortly.")
+
+        job = GenerationJob(id=uuid.uuid4().hex, topic=topic, question_count=question_count)
+        self._jobs[job.id] = job
+        await self._publish(job, "queued", "Your quiz request has been received")
+
+        task = asyncio.create_task(self._run(job, generate))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def record_completed(
+        self, topic: str, question_count: int, session_id: int, message: str
+    ) -> GenerationJob:
+        """Registers a job that finished without running in the background, e.g. a cache hit."""
+        job = GenerationJob(
+            id=uuid.uuid4().hex, topic=topic, question_count=question_count,
+            status=JobStatus.COMPLETED, session_id=session_id
+        )
+        job.finished_at = time.time()
+        self._jobs[job.id] = job
+        await self._publish(job, "completed", message)
+        return job
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Holds one of the max_concurrency generation slots of this worker."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            yield
+
+    @property
+    def slots_busy(self) -> bool:
+        return self._semaphore is not None and self._semaphore.locked()
+
+    async def get(self, job_id: str) -> Optional[GenerationJob]:
+        """The job, live when it runs on this worker, otherwise its last snapshot."""
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job
+        data = await job_cache().get(job_id)
+        return GenerationJob.from_dict(data) if data else None
+
+    async def stream(self, job_id: str) -> AsyncIterator[dict]:
+        """
+        Yields every progress event of a job, starting from the first one,
+        and finishes once the job has completed or failed.
+        Jobs of other workers are followed by re-reading their snapshot.
+        """
+        sent = 0
+        while True:
+            job = self._jobs.get(job_id)
+            changed = job._changed if job is not None else None
+            if job is None:
+                job = await self.get(job_id)
+                if job is None:
+                    return
+            while sent < len(job.events):
+                yield job.events[sent]
+                sent += 1
+            if job.is_finished:
+                return
+            if changed is not None:
+                await changed.wait()
+            else:
+                await asyncio.sleep(REMOTE_POLL_SECONDS)
+
+    async def _publish(self, job: GenerationJob, event_type: str, message: str) -> None:
+        job.publish(event_type, message)
+        try:
+            await job_cache().set(job.id, job.to_dict())
+        except Exception as e:
+            # Other workers see a stale status, the job itself carries on
+            logger.warning(f"Could not save generation job {job.id}: {e}")
+
+    async def _run(self, job: GenerationJob, generate: GenerateFn) -> None:
+        # The task inherited the submitting request's context, its queries are not the request's
+        detach_query_stats()
+
+        async def report_progress(message: str) -> None:
+            await self._publish(job, "progress", message)
+
+        try:
+            job.status = JobStatus.RUNNING
+            await self._publish(job, "started", "Generating your quiz")
+            job.session_id = await generate(job.topic, job.question_count, report_progress)
+            job.status = JobStatus.COMPLETED
+            job.finished_at = time.time()
+            await self._publish(job, "completed", "Your quiz has been generated successfully! You can now start the test.")
+        except Exception as e:
+            logger.error(f"Generation job {job.id} for topic '{job.topic}' failed: {e}")
+            job.status = JobStatus.FAILED
+            job.error = str(e)
+            job.finished_at = time.time()
+            await self._publish(job, "failed", "We could not generate your quiz.")
+
+    def _prune_finished_jobs(self) -> None:
+        cutoff = time.time() - self.job_ttl_seconds
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_at is not None and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def clear(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        self._jobs.clear()
+        self._tasks.clear()
+        self._semaphore = None
+
+job_manager = GenerationJobManager(
+    max_concurrency=settings.GENERATION_MAX_CONCURRENCY,
+    max_pending=settings.GENERATION_MAX_PENDING_JOBS,
+    job_ttl_seconds=settings.GENERATION_JOB_TTL_SECONDS,
+)
@@ -0,0 +1,176 @@
+import asyncio
+import logging
+import re
+import zlib
+from collections import defaultdict
+from typing import Optional, Sequence
+
+import numpy as np
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..core.metrics import registry
+from ..core.topic_names import normalize_topic
+from ..models.quiz import Question
+
+logger = logging.getLogger(__name__)
+
+# MinHash signature length and its split into LSH bands. 16 bands of 8 rows put two
+# questions in a shared bucket from ~0.7 similarity on (95% of the pairs at 0.8), the
+# candidates are then checked against QUESTION_SIMILARITY_THRESHOLD on the full
+# signature, an estimate within ±0.05 of the real word and word-pair overlap.
+NUM_PERMUTATIONS = 128
+BANDS = 16
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+# (a * x + b) mod p permutations with a fixed seed, so signatures stay comparable across
+# workers and restarts. a * x wraps around 64 bits on purpose, small coefficients would
+# barely wrap mod p and order the shingles alike in every permutation.
+_rng = np.random.default_rng(20240601)
+_A = _rng.integers(1, _MERSENNE_PRIME, NUM_PERMUTATIONS, dtype=np.uint64)
+_B = _rng.integers(0, _MERSENNE_PRIME, NUM_PERMUTATIONS, dtype=np.uint64)
+
+_WORD = re.compile(r"\w+")
+_PENDING_KEY = "question_index_pending"
+
+index_lookups = registry.counter(
+    "question_index_lookups", "Generated questions checked against the question index", ["outcome"])
+
+def shingles(text: str) -> set[str]:
+    """The words of a question and its word pairs, so word order counts as well."""
+    words = _WORD.findall(text.casefold())
+    return set(words) | {f"{a} {b}" for a, b in zip(words, words[1:])}
+
+def signature(text: str) -> np.ndarray:
+    """MinHash signature of a question text, the share of equal slots estimates Jaccard similarity."""
+    hashes = np.fromiter((zlib.crc32(s.encode()) for s in shingles(text) or {""}), dtype=np.uint64)
+    return ((np.outer(hashes, _A) + _B) % _MERSENNE_PRIME).min(axis=0).astype(np.uint32)
+
+class QuestionIndex:
+    """
+    In-memory MinHash/LSH index of the stored questions, partitioned by normalized topic.
+
+    Finds the stored questions that are near-identical to a new one without comparing it
+    to the whole bank: only questions sharing an LSH bucket with it are scored.
+    """
+
+    def __init__(self, threshold: float):
+        self.threshold = threshold
+        self._signatures: dict[int, np.ndarray] = {}
+        self._buckets: defaultdict[tuple, list[int]] = defaultdict(list)
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    @staticmethod
+    def _band_keys(topic_key: str, sig: np.ndarray) -> list[tuple]:
+        return [
+            (topic_key, band, sig[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND].tobytes())
+            for band in range(BANDS)
+        ]
+
+    def add(self, question_id: int, topic: str, text: str, sig: Optional[np.ndarray] = None) -> None:
+        if question_id in self._signatures:
+            return
+        sig = signature(text) if sig is None else sig
+        self._signatures[question_id] = sig
+        for key in self._band_keys(normalize_topic(topic), sig):
+            self._buckets[key].append(question_id)
+
+    def find_similar(
+        self, topic: str, text: str, sig: Optional[np.ndarray] = None
+    ) -> Optional[tuple[int, float]]:
+        """The most similar stored question of the topic and its similarity, if at or above the threshold."""
+        sig = signature(text) if sig is None else sig
+        candidates = list(dict.fromkeys(
+            question_id
+            for key in self._band_keys(normalize_topic(topic), sig)
+            for question_id in self._buckets.get(key, ())
+        ))
+        if not candidates:
+            return None
+        similarities = (np.stack([self._signatures[c] for c in candidates]) == sig).mean(axis=1)
+        best = int(similarities.argmax())
+        if similarities[best] < self.threshold:
+            return None
+        return candidates[best], float(similarities[best])
+
+    def distinct(self, question_ids: Sequence[int]) -> list[int]:
+        """Drops the questions near-identical to an earlier one of `question_ids`, keeping the order."""
+        seen = QuestionIndex(self.threshold)
+        kept = []
+        for question_id in question_ids:
+            sig = self._signatures.get(question_id)
+            if sig is not None:
+                if seen.find_similar("", "", sig) is not None:
+                    continue
+                seen.add(question_id, "", "", sig)
+            kept.append(question_id)
+        return kept
+
+_index: Optional[QuestionIndex] = None
+_building = False
+# Questions committed while the index is being built, added once it is ready
+_committed_while_building: list[tuple[int, str, np.ndarray]] = []
+
+def _build_index(rows: Sequence[tuple[int, Optional[str], Optional[str]]]) -> QuestionIndex:
+    index = QuestionIndex(settings.QUESTION_SIMILARITY_THRESHOLD)
+    for question_id, topic, text in rows:
+        index.add(question_id, topic or "", text or "")
+    return index
+
+async def get_question_index(db: AsyncSession) -> Optional[QuestionIndex]:
+    """
+    The worker's question index, built from the questions table with one query on first use.
+
+    Signing the questions takes ~250µs each, so the first caller builds the index in a
+    worker thread while the event loop keeps serving. Callers arriving meanwhile get
+    None and carry on as if nothing matched.
+
+    Questions saved through create_quiz_session are added when their transaction commits.
+    Questions saved by other workers are only seen after a restart, near-duplicates
+    across workers are then possible but nothing else depends on the index.
+    """
+    global _index, _building
+    if _index is not None or _building:
+        return _index
+
+    _building = True
+    try:
+        rows = (await db.execute(select(Question.id, Question.topic, Question.question_text))).all()
+        index = await asyncio.to_thread(_build_index, rows)
+        for question_id, topic, sig in _committed_while_building:
+            index.add(question_id, topic, "", sig)
+        logger.info(f"Question index built with {len(index)} questions")
+        _index = index
+    finally:
+        _building = False
+        _committed_while_building.clear()
+    return _index
+
+def reset_question_index() -> None:
+    """Drops the index, the next use rebuilds it from the database. Used by tests."""
+    global _index, _building
+    _index = None
+    _building = False
+    _committed_while_building.clear()
+
+def index_on_commit(db: AsyncSession, question_id: int, topic: str, sig: np.ndarray) -> None:
+    """Adds a question to the index once the caller's transaction commits, never on rollback."""
+    db.sync_session.info.setdefault(_PENDING_KEY, []).append((question_id, topic, sig))
+
+@event.listens_for(Session, "after_commit")
+def _add_committed(session: Session) -> None:
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending and _index is not None:
+        for question_id, topic, sig in pending:
+            _index.add(question_id, topic, "", sig)
+    elif pending and _building:
+        _committed_while_building.extend(pending)
+
+@event.listens_for(Session, "after_rollback")
+def _drop_rolled_back(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
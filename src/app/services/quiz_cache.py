@@ -0,0 +1,153 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Optional
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.cache import CacheNamespace, get_cache_backend
+from ..core.config import settings
+from ..core.database import AsyncSessionLocal
+from ..core.topic_names import normalize_topic
+from ..models.quiz import Question
+from ..models.result import QuizResult
+from ..models.session import QuizSession, SessionQuestion
+from ..models.topic import Topic
+from .question_index import get_question_index
+from .quiz_store import link_session_questions
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class QuizBank:
+    """
+    A generated set of questions that new sessions on the same topic can reuse.
+    A bank serves any quiz length up to its own size, shorter quizzes take its first questions.
+    """
+    topic: str
+    question_ids: tuple[int, ...]
+
+    def to_dict(self) -> dict:
+        return {"topic": self.topic, "question_ids": list(self.question_ids)}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "QuizBank":
+        return cls(topic=data["topic"], question_ids=tuple(data["question_ids"]))
+
+def bank_cache() -> CacheNamespace:
+    """Question banks keyed by normalized topic, in the configured cache backend."""
+    return get_cache_backend().namespace(
+        "quiz_banks",
+        max_size=settings.QUIZ_CACHE_MAX_TOPICS,
+        ttl_seconds=settings.QUIZ_CACHE_TTL_SECONDS,
+    )
+
+async def get_cached_bank(topic: str, question_count: int, record_stats: bool = True) -> Optional[QuizBank]:
+    """The cached bank of a topic, when it has at least `question_count` questions."""
+    if not settings.QUIZ_CACHE_ENABLED:
+        return None
+    cache = bank_cache()
+    key = normalize_topic(topic)
+    data = await (cache.lookup(key) if record_stats else cache.get(key))
+    bank = QuizBank.from_dict(data) if data else None
+    return bank if bank and len(bank.question_ids) >= question_count else None
+
+async def store_bank(topic: str, bank: QuizBank) -> None:
+    """Caches a bank for its topic, unless a larger one is already cached."""
+    if not settings.QUIZ_CACHE_ENABLED:
+        return
+    cache = bank_cache()
+    key = normalize_topic(topic)
+    current = await cache.get(key)
+    if current and len(current["question_ids"]) > len(bank.question_ids):
+        return
+    await cache.set(key, bank.to_dict())
+
+async def load_bank_for_topic(db: AsyncSession, topic: str) -> Optional[QuizBank]:
+    """
+    Loads the most recently generated questions stored for a registered topic, under any
+    spelling of it ("python" finds the questions of "Python"), up to QUIZ_MAX_QUESTIONS.
+    With QUESTION_REUSE_SIMILAR on, near-identical questions only count once.
+    The bank carries the topic's canonical name.
+    Returns None when the topic does not have a default-length quiz worth of questions.
+    """
+    rows = (await db.execute(
+        select(Question.id, Topic.name)
+        .join(Topic, Topic.name == Question.topic)
+        .where(Topic.key == normalize_topic(topic))
+        .order_by(Question.id.desc())
+        .limit(settings.QUIZ_MAX_QUESTIONS)
+    )).all()
+    question_ids = [row.id for row in rows]
+    index = await get_question_index(db) if settings.QUESTION_REUSE_SIMILAR else None
+    if index is not None:
+        question_ids = index.distinct(question_ids)
+
+    if len(question_ids) < settings.QUIZ_DEFAULT_QUESTIONS:
+        return None
+    return QuizBank(topic=rows[0].name, question_ids=tuple(sorted(question_ids)))
+
+async def load_bank_for_session(db: AsyncSession, session_id: int) -> Optional[QuizBank]:
+    rows = (await db.execute(
+        select(QuizSession.topic, SessionQuestion.question_id)
+        .join(SessionQuestion, SessionQuestion.session_id == QuizSession.id)
+        .where(QuizSession.id == session_id)
+        .order_by(SessionQuestion.position)
+    )).all()
+
+    if not rows:
+        return None
+    return QuizBank(topic=rows[0].topic, question_ids=tuple(row.question_id for row in rows))
+
+async def create_session_from_bank(db: AsyncSession, bank: QuizBank, question_count: Optional[int] = None) -> int:
+    """
+    Starts a new quiz session over the first `question_count` questions of an existing
+    question bank (all of them by default) without calling the agent.
+    """
+    question_ids = bank.question_ids[:question_count]
+    db_session = QuizSession(topic=bank.topic, question_count=len(question_ids))
+    db.add(db_session)
+    await db.flush()
+    await link_session_questions(db, db_session.id, question_ids)
+    await db.commit()
+    return db_session.id
+
+async def prewarm_popular_topics(limit: int) -> int:
+    """
+    Fills the cache with the most played topics, ranked by their number of quiz results.
+    Only topics that already have questions in the database are loaded, so no LLM calls are made.
+
+    Returns:
+        int: The number of topics added to the cache.
+    """
+    warmed = 0
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(
+            select(QuizResult.topic, func.count(QuizResult.id).label("plays"))
+            .where(QuizResult.topic.is_not(None))
+            .group_by(QuizResult.topic)
+            .order_by(func.count(QuizResult.id).desc())
+            .limit(limit)
+        )).all()
+
+        for topic, _plays in rows:
+            if await bank_cache().exists(normalize_topic(topic)):
+                continue
+            bank = await load_bank_for_topic(db, topic)
+            if bank:
+                await store_bank(topic, bank)
+                warmed += 1
+
+    logger.info(f"Quiz cache pre-warm loaded {warmed} topic(s)")
+    return warmed
+
+async def run_prewarm_loop() -> None:
+    """
+    Background job that periodically re-warms the cache until cancelled.
+    """
+    while True:
+        try:
+            await prewarm_popular_topics(settings.QUIZ_CACHE_PREWARM_TOPICS)
+        except Exception as e:
+            logger.error(f"Quiz cache pre-warm failed: {e}")
+        await asyncio.sleep(settings.QUIZ_CACHE_PREWARM_INTERVAL_SECONDS)
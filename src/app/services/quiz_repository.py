@@ -0,0 +1,162 @@
+from dataclasses import dataclass
+from typing import Optional, Sequence
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+
+from ..core.database import upsert_insert
+from ..models.quiz import Question
+from ..models.result import QuizResult
+from ..models.session import QuizSession, SessionQuestion, UserAnswer
+from . import results_repository
+
+class SessionAlreadyCompletedError(Exception):
+    """Raised when a session that already has a result is finalized again."""
+
+@dataclass(frozen=True)
+class RecordedAnswer:
+    """The stored answer to a question and the session counters after it."""
+    choice_id: int
+    is_correct: bool
+    answered_count: int
+    score: int
+    created: bool  # False when the question had already been answered
+
+async def get_session_with_questions(db: AsyncSession, session_id: int) -> Optional[QuizSession]:
+    """
+    Loads a session with its questions, their choices and the answers already given,
+    in a single joined query.
+    """
+    questions = joinedload(QuizSession.questions)
+    result = await db.scalars(
+        select(QuizSession)
+        .where(QuizSession.id == session_id)
+        .options(
+            questions.joinedload(SessionQuestion.question).joinedload(Question.choices),
+            questions.joinedload(SessionQuestion.answers),
+        )
+    )
+    return result.unique().one_or_none()
+
+async def record_answer(
+    db: AsyncSession, session_id: int, question_id: int, choice_id: int, is_correct: bool
+) -> Optional[RecordedAnswer]:
+    """
+    Stores the answer to a question once and bumps the session counters server side.
+    See record_answers, of which this is the single answer case.
+    """
+    answers = await record_answers(db, session_id, [(question_id, choice_id, is_correct)])
+    return answers[0] if answers else None
+
+async def record_answers(
+    db: AsyncSession, session_id: int, answers: Sequence[tuple[int, int, bool]]
+) -> Optional[list[RecordedAnswer]]:
+    """
+    Stores graded (question_id, choice_id, is_correct) answers of a session, one per
+    question, with one multi-row insert and bumps the session counters with one UPDATE,
+    whatever the number of answers.
+
+    Re-submits (double clicks, client retries, racing requests) hit the unique
+    (session_id, question_id) index and leave the answer and counters untouched; the
+    answer recorded first is returned instead, read back in one extra query. The
+    counters come back through RETURNING, so no COUNT over user_answers is needed.
+
+    Runs in the caller's transaction. Returns the answers in the order given, or None
+    when the session does not exist.
+    """
+    created = set((await db.scalars(
+        upsert_insert(db, UserAnswer)
+        .values([
+            {"session_id": session_id, "question_id": question_id, "choice_id": choice_id, "is_correct": is_correct}
+            for question_id, choice_id, is_correct in answers
+        ])
+        .on_conflict_do_nothing(index_elements=[UserAnswer.session_id, UserAnswer.question_id])
+        .returning(UserAnswer.question_id)
+    )).all())
+
+    counters = None
+    stored = {}
+    if len(created) < len(answers):
+        rows = (await db.execute(
+            select(UserAnswer.question_id, UserAnswer.choice_id, UserAnswer.is_correct,
+                   QuizSession.answered_count, QuizSession.total_score)
+            .join(QuizSession, QuizSession.id == UserAnswer.session_id)
+            .where(
+                UserAnswer.session_id == session_id,
+                UserAnswer.question_id.in_([a[0] for a in answers if a[0] not in created]),
+            )
+        )).all()
+        stored = {row.question_id: row for row in rows}
+        if rows:
+            counters = (rows[0].answered_count, rows[0].total_score)
+
+    if created:
+        # Atomic increments, concurrent submits for other questions never overwrite each other
+        row = (await db.execute(
+            update(QuizSession)
+            .where(QuizSession.id == session_id)
+            .values(
+                answered_count=QuizSession.answered_count + len(created),
+                total_score=QuizSession.total_score + sum(
+                    1 for question_id, _, is_correct in answers if is_correct and question_id in created
+                ),
+            )
+            .returning(QuizSession.answered_count, QuizSession.total_score)
+        )).one_or_none()
+        counters = (row.answered_count, row.total_score) if row else None
+
+    if counters is None or len(created) + len(stored) < len(answers):
+        return None
+
+    answered_count, score = counters
+    return [
+        RecordedAnswer(
+            choice_id=choice_id, is_correct=is_correct,
+            answered_count=answered_count, score=score, created=True,
+        ) if question_id in created else RecordedAnswer(
+            choice_id=stored[question_id].choice_id, is_correct=stored[question_id].is_correct,
+            answered_count=answered_count, score=score, created=False,
+        )
+        for question_id, choice_id, is_correct in answers
+    ]
+
+async def complete_session(
+    db: AsyncSession, session_id: int, user_name: str, user_email: str
+) -> Optional[QuizResult]:
+    """
+    Marks a session completed, saves its result and adds it to the topic's running
+    totals, in three statements.
+
+    A result is final once saved: only the request that moves the session to
+    "completed" writes one, so repeats and racing requests never add a second result
+    or count the attempt twice in the topic stats.
+
+    Runs in the caller's transaction. Returns None when the session does not exist.
+
+    Raises:
+        SessionAlreadyCompletedError: The session was already finalized.
+    """
+    row = (await db.execute(
+        update(QuizSession)
+        .where(QuizSession.id == session_id, QuizSession.status != "completed")
+        .values(status="completed")
+        .returning(QuizSession.topic, QuizSession.total_score, QuizSession.question_count)
+    )).one_or_none()
+    if row is None:
+        if await db.scalar(select(QuizSession.id).where(QuizSession.id == session_id)) is not None:
+            raise SessionAlreadyCompletedError(f"Session {session_id} is already finalized")
+        return None
+
+    result = await db.scalar(
+        insert(QuizResult)
+        .values(
+            user_name=user_name,
+            user_email=user_email,
+            topic=row.topic,
+            score=row.total_score,
+            total_questions=row.question_count or 0,
+        )
+        .returning(QuizResult)
+    )
+    await results_repository.update_topic_stats(db, result)
+    return result
@@ -0,0 +1,97 @@
+from typing import Sequence
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.config import settings
+from ..core.database import utcnow
+from ..models.quiz import Question, Choice
+from ..models.session import QuizSession, SessionQuestion
+from ..schemas.quiz import GeneratedQuestion
+from .question_index import get_question_index, index_lookups, index_on_commit, signature
+from .topics import register_topic
+
+async def create_quiz_session(db: AsyncSession, topic: str, questions: Sequence[GeneratedQuestion]) -> int:
+    """
+    Writes a quiz session with its questions and choices using batched inserts.
+
+    The statements run in the caller's transaction: one upsert of the topic, one
+    multi-row insert for the questions (ids come back through RETURNING), one
+    multi-row insert for the choices, one insert for the session and one for the
+    session's question order, regardless of how many questions the quiz has.
+
+    With QUESTION_REUSE_SIMILAR on, questions near-identical to one already stored for
+    the topic are not inserted again: the session links the stored question instead.
+
+    Returns:
+        int: The ID of the new QuizSession.
+    """
+    topic, question_ids = await store_questions(db, topic, questions)
+    session_id = await db.scalar(
+        insert(QuizSession)
+        .values(
+            topic=topic, status="active", total_score=0, answered_count=0,
+            question_count=len(questions), created_at=utcnow()
+        )
+        .returning(QuizSession.id)
+    )
+
+    await link_session_questions(db, session_id, question_ids)
+    return session_id
+
+async def store_questions(
+    db: AsyncSession, topic: str, questions: Sequence[GeneratedQuestion]
+) -> tuple[str, list[int]]:
+    """
+    Saves generated questions with their choices under the topic's canonical name,
+    reusing the stored near-identical questions when QUESTION_REUSE_SIMILAR is on.
+
+    Returns:
+        The canonical topic name and the question ids, in the order given.
+    """
+    reused: dict[int, int] = {}  # position -> id of the stored question
+    signatures = []
+    if settings.QUESTION_REUSE_SIMILAR:
+        index = await get_question_index(db)
+        signatures = [signature(q.question_text) for q in questions]
+        for position, (question, sig) in enumerate(zip(questions, signatures)):
+            # Nothing matches while the index is still being built
+            match = index.find_similar(topic, question.question_text, sig) if index else None
+            # A session holds a question once, a second match is stored as a new question
+            if match and match[0] not in reused.values():
+                reused[position] = match[0]
+        index_lookups.inc(len(reused), outcome="reused")
+        index_lookups.inc(len(questions) - len(reused), outcome="new")
+
+    new_positions = [position for position in range(len(questions)) if position not in reused]
+    topic = await register_topic(db, topic, len(new_positions))
+    new_ids = []
+    if new_positions:
+        new_ids = (await db.scalars(
+            insert(Question).returning(Question.id, sort_by_parameter_order=True),
+            [{"question_text": questions[p].question_text, "topic": topic} for p in new_positions]
+        )).all()
+
+    choice_rows = [
+        {"choice_text": c.choice_text, "is_correct": c.is_correct, "question_id": question_id}
+        for question_id, position in zip(new_ids, new_positions)
+        for c in questions[position].choices
+    ]
+    if choice_rows:
+        await db.execute(insert(Choice), choice_rows)
+
+    question_ids = dict(reused)
+    for question_id, position in zip(new_ids, new_positions):
+        question_ids[position] = question_id
+        if signatures:
+            index_on_commit(db, question_id, topic, signatures[position])
+    return topic, [question_ids[position] for position in range(len(questions))]
+
+async def link_session_questions(db: AsyncSession, session_id: int, question_ids: Sequence[int]) -> None:
+    """
+    Attaches questions to a session in the order they should be served.
+    """
+    if question_ids:
+        await db.execute(insert(SessionQuestion), [
+            {"session_id": session_id, "position": position, "question_id": question_id}
+            for position, question_id in enumerate(question_ids)
+        ])
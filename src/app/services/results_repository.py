@@ -0,0 +1,90 @@
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional, Sequence
+from sqlalchemy import and_, case, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.database import upsert_insert
+from ..models.result import QuizResult, TopicStats
+from .topics import canonical_name
+
+class InvalidCursorError(ValueError):
+    """Raised when a leaderboard cursor cannot be decoded."""
+
+@dataclass(frozen=True)
+class LeaderboardCursor:
+    """Position of the last entry of a page in leaderboard order."""
+    score: int
+    completed_at: datetime
+    id: int
+
+    def encode(self) -> str:
+        raw = json.dumps([self.score, self.completed_at.isoformat(), self.id])
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    @classmethod
+    def decode(cls, cursor: str) -> "LeaderboardCursor":
+        try:
+            score, completed_at, result_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            return cls(score=int(score), completed_at=datetime.fromisoformat(completed_at), id=int(result_id))
+        except (binascii.Error, ValueError, TypeError) as e:
+            raise InvalidCursorError("Invalid leaderboard cursor") from e
+
+async def update_topic_stats(db: AsyncSession, result: QuizResult) -> None:
+    """
+    Adds a finalized result to its topic's running totals in one upsert.
+    Runs in the caller's transaction.
+    """
+    stmt = upsert_insert(db, TopicStats).values(
+        topic=result.topic,
+        attempts=1,
+        total_score=result.score,
+        total_questions=result.total_questions,
+        best_score=result.score,
+        last_completed_at=result.completed_at,
+    )
+    new = stmt.excluded
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=[TopicStats.topic],
+        set_={
+            "attempts": TopicStats.attempts + 1,
+            "total_score": TopicStats.total_score + new.total_score,
+            "total_questions": TopicStats.total_questions + new.total_questions,
+            "best_score": case((new.best_score > TopicStats.best_score, new.best_score), else_=TopicStats.best_score),
+            "last_completed_at": case(
+                (or_(TopicStats.last_completed_at.is_(None), new.last_completed_at > TopicStats.last_completed_at),
+                 new.last_completed_at),
+                else_=TopicStats.last_completed_at,
+            ),
+        },
+    ))
+
+async def get_topic_stats(db: AsyncSession, topic: str) -> Optional[TopicStats]:
+    """The running totals of a topic, given in any spelling."""
+    return await db.scalar(select(TopicStats).where(TopicStats.topic == canonical_name(topic)))
+
+async def get_leaderboard(
+    db: AsyncSession, limit: int, topic: Optional[str] = None, after: Optional[LeaderboardCursor] = None
+) -> Sequence[QuizResult]:
+    """
+    Best results first (score DESC, then the earliest to get there), optionally for one
+    topic given in any spelling.
+
+    Pages continue from `after` with a keyset condition instead of an OFFSET, so every
+    page is a range scan of the leaderboard index however deep it is.
+    """
+    stmt = select(QuizResult).order_by(QuizResult.score.desc(), QuizResult.completed_at, QuizResult.id).limit(limit)
+    if topic is not None:
+        stmt = stmt.where(QuizResult.topic == canonical_name(topic))
+    if after is not None:
+        stmt = stmt.where(or_(
+            QuizResult.score < after.score,
+            and_(QuizResult.score == after.score, or_(
+                QuizResult.completed_at > after.completed_at,
+                and_(QuizResult.completed_at == after.completed_at, QuizResult.id > after.id),
+            )),
+        ))
+    return (await db.scalars(stmt)).all()
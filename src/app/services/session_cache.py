@@ -0,0 +1,236 @@
+from dataclasses import dataclass, field
+from typing import Optional, Sequence
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.cache import CacheNamespace, get_cache_backend
+from ..core.config import settings
+from . import quiz_repository
+
+@dataclass(frozen=True)
+class CachedChoice:
+    id: int
+    choice_text: str
+
+@dataclass(frozen=True)
+class CachedQuestion:
+    id: int
+    position: int
+    question_text: str
+    choices: tuple[CachedChoice, ...]
+    correct_choice_id: Optional[int]
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "position": self.position,
+            "question_text": self.question_text,
+            "choices": [[c.id, c.choice_text] for c in self.choices],
+            "correct_choice_id": self.correct_choice_id,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "CachedQuestion":
+        return cls(
+            id=data["id"],
+            position=data["position"],
+            question_text=data["question_text"],
+            choices=tuple(CachedChoice(id=c[0], choice_text=c[1]) for c in data["choices"]),
+            correct_choice_id=data["correct_choice_id"],
+        )
+
+    def choice(self, choice_id: int) -> Optional[CachedChoice]:
+        return next((c for c in self.choices if c.id == choice_id), None)
+
+    @property
+    def correct_choice(self) -> Optional[CachedChoice]:
+        return self.choice(self.correct_choice_id) if self.correct_choice_id else None
+
+@dataclass
+class QuizSnapshot:
+    """A session's questions and answers as stored in the database."""
+    session_id: int
+    topic: str
+    questions: tuple[CachedQuestion, ...]
+    progress: dict[str, int] = field(default_factory=dict)  # str(position) -> 1 if correct else 0
+
+    @property
+    def total_questions(self) -> int:
+        return len(self.questions)
+
+# Marks a progress hash that was built from the database, rather than from answer
+# fields written after the entry expired or was invalidated
+_LOADED_FIELD = "loaded"
+# Progress hash field holding a position no later than the first unanswered one
+_NEXT_FIELD = "next"
+# Positions checked per read while moving the next-question cursor forward
+_SCAN_WINDOW = 8
+
+def snapshot_cache() -> CacheNamespace:
+    """Cached quiz sessions, in the configured cache backend."""
+    return get_cache_backend().namespace(
+        "session_snapshots",
+        # Per session: the summary, the progress and every question under its position and its id
+        max_size=settings.SESSION_CACHE_MAX_SESSIONS * (2 * settings.QUIZ_MAX_QUESTIONS + 2),
+        ttl_seconds=settings.SESSION_CACHE_TTL_SECONDS,
+    )
+
+def _progress_key(session_id: int) -> str:
+    return f"{session_id}:progress"
+
+def _position_key(session_id: int, position: int) -> str:
+    return f"{session_id}:q:{position}"
+
+def _question_key(session_id: int, question_id: int) -> str:
+    return f"{session_id}:id:{question_id}"
+
+class CachedSession:
+    """
+    Read-through access to one quiz session, for /quiz/next and /quiz/submit.
+
+    The cache holds a small summary (topic and length), each question twice, under its
+    position and under its id, and a progress hash with one field per answered position
+    (1 = correct, 0 = wrong) plus a cursor to the first open position. Every call reads
+    a fixed number of entries, whatever the length of the quiz. Submits add their own
+    fields atomically, so concurrent answers to different questions never undo each
+    other. Any missing entry reloads the whole session from the database in one query.
+    """
+
+    def __init__(self, db: AsyncSession, session_id: int, topic: str, total_questions: int,
+                 cursor: int, snapshot: Optional[QuizSnapshot] = None):
+        self.db = db
+        self.session_id = session_id
+        self.topic = topic
+        self.total_questions = total_questions
+        self._cursor = cursor
+        self._snapshot = snapshot
+
+    async def next_position(self) -> Optional[int]:
+        """
+        The first unanswered position, None once every question is answered.
+
+        The cursor only moves past positions whose answer is cached, and cached answers
+        are never removed, so it never skips an open question. Moving it forward is
+        written back, so each position is stepped over once per session.
+        """
+        cache = snapshot_cache()
+        position = self._cursor
+        while position < self.total_questions:
+            window = [str(p) for p in range(position, min(position + _SCAN_WINDOW, self.total_questions))]
+            answered = await cache.get_fields(_progress_key(self.session_id), window)
+            open_position = next((p for p in window if p not in answered), None)
+            if open_position is not None:
+                position = int(open_position)
+                break
+            position += len(window)
+        if position != self._cursor:
+            await cache.set_fields(_progress_key(self.session_id), {_NEXT_FIELD: position})
+            self._cursor = position
+        return position if position < self.total_questions else None
+
+    async def question_at(self, position: int) -> Optional[CachedQuestion]:
+        if self._snapshot is None and 0 <= position < self.total_questions:
+            data = await snapshot_cache().get(_position_key(self.session_id, position))
+            if data is not None:
+                return CachedQuestion.from_dict(data)
+            await self._reload()
+        questions = self._snapshot.questions if self._snapshot is not None else ()
+        return questions[position] if 0 <= position < len(questions) else None
+
+    async def questions_by_id(self, question_ids: Sequence[int]) -> list[Optional[CachedQuestion]]:
+        """The session's questions with the given ids, None for ids outside the quiz."""
+        if self._snapshot is None:
+            found = await snapshot_cache().get_many([_question_key(self.session_id, qid) for qid in question_ids])
+            if all(data is not None for data in found):
+                return [CachedQuestion.from_dict(data) for data in found]
+            # An id outside the quiz and an evicted entry look the same, the database tells them apart
+            await self._reload()
+        by_id = {q.id: q for q in self._snapshot.questions}
+        return [by_id.get(question_id) for question_id in question_ids]
+
+    async def save_answers(self, answers: list[tuple[CachedQuestion, bool]]) -> None:
+        """Adds graded (question, is_correct) answers to the cached progress."""
+        # When the entry expired meanwhile, the fields land in a hash without the loaded
+        # marker and the next read rebuilds it from the database
+        await snapshot_cache().set_fields(_progress_key(self.session_id), {
+            str(question.position): int(is_correct) for question, is_correct in answers
+        })
+
+    async def _reload(self) -> None:
+        snapshot = await _cache_snapshot(self.db, self.session_id)
+        self._snapshot = snapshot or QuizSnapshot(self.session_id, self.topic, ())
+
+async def load_snapshot(db: AsyncSession, session_id: int) -> Optional[QuizSnapshot]:
+    """
+    Builds a session snapshot from the database, in one query.
+    """
+    session = await quiz_repository.get_session_with_questions(db, session_id)
+    if not session:
+        return None
+
+    questions = tuple(
+        CachedQuestion(
+            id=sq.question.id,
+            position=position,
+            question_text=sq.question.question_text,
+            choices=tuple(CachedChoice(id=c.id, choice_text=c.choice_text) for c in sq.question.choices),
+            correct_choice_id=next((c.id for c in sq.question.choices if c.is_correct), None),
+        )
+        for position, sq in enumerate(session.questions)
+    )
+    return QuizSnapshot(
+        session_id=session.id,
+        topic=session.topic,
+        questions=questions,
+        progress={
+            str(position): int(sq.answers[0].is_correct)
+            for position, sq in enumerate(session.questions) if sq.answers
+        },
+    )
+
+async def _cache_snapshot(db: AsyncSession, session_id: int) -> Optional[QuizSnapshot]:
+    """Loads a session from the database and caches every entry of it."""
+    snapshot = await load_snapshot(db, session_id)
+    if snapshot is None:
+        return None
+    cache = snapshot_cache()
+    entries = {}
+    for question in snapshot.questions:
+        data = question.to_dict()
+        entries[_position_key(session_id, question.position)] = data
+        entries[_question_key(session_id, question.id)] = data
+    await cache.set_many(entries)
+    # Merged with any answer saved meanwhile, which the load may have missed. The
+    # cursor is computed from the loaded answers, so it can only be early.
+    await cache.set_fields(_progress_key(session_id), {
+        **snapshot.progress, _LOADED_FIELD: 1, _NEXT_FIELD: _first_unanswered(snapshot),
+    })
+    await cache.set(str(session_id), {"topic": snapshot.topic, "total": snapshot.total_questions})
+    return snapshot
+
+def _first_unanswered(snapshot: QuizSnapshot) -> int:
+    return next(
+        (p for p in range(snapshot.total_questions) if str(p) not in snapshot.progress), snapshot.total_questions
+    )
+
+async def get_session(db: AsyncSession, session_id: int) -> Optional[CachedSession]:
+    """
+    The cached session, only hits the database on a cache miss.
+    """
+    cache = snapshot_cache()
+    summary = await cache.lookup(str(session_id))
+    progress = await cache.get_fields(_progress_key(session_id), [_LOADED_FIELD, _NEXT_FIELD]) if summary else {}
+    if summary and _LOADED_FIELD in progress:
+        return CachedSession(db, session_id, summary["topic"], summary["total"], progress.get(_NEXT_FIELD, 0))
+
+    snapshot = await _cache_snapshot(db, session_id)
+    if snapshot is None:
+        return None
+    return CachedSession(
+        db, session_id, snapshot.topic, snapshot.total_questions, _first_unanswered(snapshot), snapshot
+    )
+
+async def invalidate_snapshot(session_id: int) -> None:
+    # The question entries never change, they are left to expire
+    cache = snapshot_cache()
+    await cache.delete(str(session_id))
+    await cache.delete(_progress_key(session_id))
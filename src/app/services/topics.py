@@ -0,0 +1,69 @@
+import re
+from typing import Sequence
+from sqlalchemy import ColumnElement, column, func, literal_column, or_, select, table
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.database import upsert_insert, utcnow
+from ..core.topic_names import clean_topic, normalize_topic
+from ..models.topic import Topic
+
+_WORD = re.compile(r"\w+")
+
+async def register_topic(db: AsyncSession, topic: str, new_questions: int) -> str:
+    """
+    Adds `new_questions` stored questions to a topic's bank, creating the topic on first use.
+    Returns the topic's canonical name, the spelling it was first registered with.
+    Runs in the caller's transaction.
+    """
+    stmt = upsert_insert(db, Topic).values(
+        key=normalize_topic(topic), name=clean_topic(topic), question_count=new_questions, updated_at=utcnow()
+    )
+    return await db.scalar(
+        stmt.on_conflict_do_update(
+            index_elements=[Topic.key],
+            set_={"question_count": Topic.question_count + stmt.excluded.question_count,
+                  "updated_at": stmt.excluded.updated_at},
+        ).returning(Topic.name)
+    )
+
+def canonical_name(topic: str) -> ColumnElement[str]:
+    """
+    SQL expression for the canonical name of a topic typed in any spelling, to filter
+    rows stored under that name within the same query. A topic without a Topic row
+    keeps the spelling given.
+    """
+    return func.coalesce(
+        select(Topic.name).where(Topic.key == normalize_topic(topic)).scalar_subquery(), topic
+    )
+
+_topics_fts = table("topics_fts", column("rowid"))
+
+async def search_topics(db: AsyncSession, query: str, min_questions: int, limit: int) -> Sequence[Topic]:
+    """
+    Topics matching what a user is typing, that have at least `min_questions` stored questions.
+
+    Every word of `query` matches as a prefix ("pyth bas" finds "Python basics"). On
+    PostgreSQL this goes through the tsvector index of topics.name, and the trigram
+    index of topics.key also catches typos ("pyhton"). SQLite uses the topics_fts FTS5 table.
+    Best matches first, then the largest question banks.
+    """
+    words = _WORD.findall(normalize_topic(query))
+    if not words:
+        return []
+
+    stmt = select(Topic).where(Topic.question_count >= min_questions).limit(limit)
+    if db.get_bind().dialect.name == "postgresql":
+        key = normalize_topic(query)
+        tsvector = func.to_tsvector(literal_column("'simple'"), Topic.name)
+        tsquery = func.to_tsquery("simple", " & ".join(f"{word}:*" for word in words))
+        stmt = stmt.where(or_(tsvector.op("@@")(tsquery), Topic.key.op("%")(key))).order_by(
+            func.similarity(Topic.key, key).desc(), Topic.question_count.desc()
+        )
+    else:
+        fts_query = " ".join(f'"{word}"*' for word in words)
+        stmt = (
+            stmt.join(_topics_fts, _topics_fts.c.rowid == literal_column("topics.rowid"))
+            .where(literal_column("topics_fts").op("MATCH")(fts_query))
+            .order_by(func.bm25(literal_column("topics_fts")), Topic.question_count.desc())
+        )
+    return (await db.scalars(stmt)).all()
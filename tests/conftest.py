@@ -0,0 +1,11 @@
+import os
+
+# Point the app at the test database before any app module builds its engine.
+# Code paths that open their own sessions (agent tools, background jobs) then share the test data.
+os.environ["DATABASE_URL"] = "sqlite:///./test_endpoints.db"
+os.environ.setdefault("OPEN_ROUTER_API_KEY", "test-key")
+os.environ.setdefault("QUIZ_CACHE_PREWARM_TOPICS", "0")
+# Use litellm's bundled model cost map instead of downloading it
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
+# Requests over their route's query_budget fail with a 500
+os.environ.setdefault("QUERY_BUDGET_ENFORCE", "True")
@@ -0,0 +1,157 @@
+import asyncio
+import time
+import pytest
+import sys
+import os
+
+# Set up path to import app correctly
+sys.path.insert(0, os.path.abspath(os.path.join(os.getcwd(), "src")))
+
+from app.core.cache import MemoryCacheBackend, RedisCacheBackend, TTLCache
+from app.core.single_flight import SingleFlight
+
+def test_ttl_cache_hit_and_miss():
+    cache = TTLCache(max_size=2, ttl_seconds=60)
+    assert cache.get("python") is None
+    cache.set("python", 1)
+    assert cache.get("python") == 1
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_ratio"] == 0.5
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(max_size=2, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")  # "b" is now the least recently used entry
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+def test_ttl_cache_expires_entries():
+    cache = TTLCache(max_size=2, ttl_seconds=0.01)
+    cache.set("a", 1)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+def test_single_flight_shares_one_execution():
+    flight = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def main():
+        return await asyncio.gather(*(flight.do("key", work) for _ in range(5)))
+
+    results = asyncio.run(main())
+
+    assert len(calls) == 1
+    assert [r[0] for r in results] == ["result"] * 5
+    assert sum(1 for _, shared in results if shared) == 4
+    assert flight.stats() == {"executions": 1, "deduplicated": 4, "in_flight": 0}
+
+def test_single_flight_propagates_errors_to_waiters():
+    flight = SingleFlight()
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def main():
+        return await asyncio.gather(*(flight.do("key", failing) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, ValueError) for r in results)
+
+def test_memory_backend_namespaces_and_counters():
+    backend = MemoryCacheBackend()
+    banks = backend.namespace("banks", max_size=10, ttl_seconds=60)
+    snapshots = backend.namespace("snapshots", max_size=10, ttl_seconds=60)
+
+    async def scenario():
+        await banks.set("python", {"question_ids": [1, 2]})
+        assert await banks.lookup("python") == {"question_ids": [1, 2]}
+        assert await banks.lookup("rust") is None
+        assert await snapshots.get("python") is None
+        await banks.delete("python")
+        assert not await banks.exists("python")
+        return await banks.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["size"] == 0
+
+def test_redis_backend_is_shared_between_clients():
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    worker_a = RedisCacheBackend(fakeredis.FakeAsyncRedis(server=server), prefix="test:")
+    worker_b = RedisCacheBackend(fakeredis.FakeAsyncRedis(server=server), prefix="test:")
+
+    async def scenario():
+        ns_a = worker_a.namespace("banks", max_size=10, ttl_seconds=60)
+        ns_b = worker_b.namespace("banks", max_size=10, ttl_seconds=60)
+        await ns_a.set("python", {"topic": "Python", "question_ids": [1, 2, 3]})
+        value = await ns_b.lookup("python")
+        await ns_a.lookup("rust")
+        stats = await ns_b.stats()
+
+        await ns_b.set("short", 1, ttl_seconds=0.01)
+        await asyncio.sleep(0.05)
+        expired = await ns_a.get("short")
+
+        await ns_a.clear()
+        cleared = await ns_b.get("python")
+        return value, stats, expired, cleared
+
+    value, stats, expired, cleared = asyncio.run(scenario())
+    assert value == {"topic": "Python", "question_ids": [1, 2, 3]}
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert expired is None
+    assert cleared is None
+
+@pytest.mark.parametrize("backend_name", ["memory", "redis"])
+def test_set_fields_merges_concurrent_writers(backend_name):
+    if backend_name == "redis":
+        fakeredis = pytest.importorskip("fakeredis")
+        backend = RedisCacheBackend(fakeredis.FakeAsyncRedis(), prefix="test:")
+    else:
+        backend = MemoryCacheBackend()
+    progress = backend.namespace("progress", max_size=10, ttl_seconds=60)
+
+    async def scenario():
+        await asyncio.gather(*(progress.set_fields("1", {str(i): i % 2}) for i in range(5)))
+        await progress.set_fields("1", {"loaded": 1})
+        fields = ["0", "1", "2", "3", "4", "5", "loaded"]
+        return await progress.get_fields("1", fields), await progress.get_fields("2", fields)
+
+    stored, missing = asyncio.run(scenario())
+    assert stored == {"0": 0, "1": 1, "2": 0, "3": 1, "4": 0, "loaded": 1}
+    assert missing == {}
+
+@pytest.mark.parametrize("backend_name", ["memory", "redis"])
+def test_get_and_set_many(backend_name):
+    if backend_name == "redis":
+        fakeredis = pytest.importorskip("fakeredis")
+        backend = RedisCacheBackend(fakeredis.FakeAsyncRedis(), prefix="test:")
+    else:
+        backend = MemoryCacheBackend()
+    questions = backend.namespace("questions", max_size=10, ttl_seconds=60)
+
+    async def scenario():
+        await questions.set_many({"1:q:0": {"id": 7}, "1:q:1": {"id": 8}})
+        return await questions.get_many(["1:q:1", "1:q:2", "1:q:0"]), await questions.get_many([])
+
+    found, empty = asyncio.run(scenario())
+    assert found == [{"id": 8}, None, {"id": 7}]
+    assert empty == []
@@ -1,8 +1,13 @@
+import asyncio
+import json
+import time
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
-from unittest.mock import patch, MagicMock
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from unittest.mock import patch, MagicMock, AsyncMock
 import sys
 import os
 
@@ -10,55 +15,514 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.getcwd(), "src")))
 
 from app.main import app
+from app.core.cache import RedisCacheBackend, set_cache_backend
+from app.core.config import settings
 from app.core.database import Base, get_db
-from app.models.session import QuizSession, UserAnswer
+from app.core.http_metrics import http_requests
+from app.core.query_budget import instrument_engine
+from app.models.session import QuizSession, SessionQuestion, UserAnswer
 from app.models.quiz import Question, Choice
 from app.models.result import QuizResult
+from app.models.topic import Topic
+from app.agent.tools import initialize_quiz_session
+from app.services import quiz_cache, session_cache
+from app.services.question_index import reset_question_index
+from app.services.generation import generation_flight, runner_pool
+from app.services.generation_jobs import GenerationJobManager, job_manager
 
 # --- Database Setup for Testing ---
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test_endpoints.db"
 engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-def override_get_db():
-    try:
-        db = TestingSessionLocal()
+# The app talks to the same SQLite file through the async driver
+async_engine = create_async_engine("sqlite+aiosqlite:///./test_endpoints.db")
+AsyncTestingSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+async def override_get_db():
+    async with AsyncTestingSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 app.dependency_overrides[get_db] = override_get_db
+instrument_engine(async_engine)
+
+class QueryCounter:
+    """Collects the SQL statements the routes send through the test engine."""
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+@contextmanager
+def count_queries():
+    counter = QueryCounter()
+    event.listen(async_engine.sync_engine, "before_cursor_execute", counter)
+    try:
+        yield counter
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", counter)
 
 client = TestClient(app)
 
 @pytest.fixture(autouse=True)
 def setup_db():
     Base.metadata.create_all(bind=engine)
+    set_cache_backend(None)  # a fresh in-memory backend per test
+    job_manager.clear()
+    generation_flight.reset()
+    runner_pool.reset()
+    reset_question_index()
     yield
     Base.metadata.drop_all(bind=engine)
 
 # --- Tests ---
 
-@patch("app.api.quiz_routes.InMemoryRunner")
-def test_generate_quiz(mock_runner_class):
+def agent_events(session_id):
+    """Builds the runner events of an agent run that called initialize_quiz_session."""
+    part = MagicMock()
+    part.function_response.name = "initialize_quiz_session"
+    part.function_response.response = {"result": session_id}
+    event = MagicMock()
+    event.content.parts = [part]
+    return [event]
+
+def tool_call_event(tool_name):
+    part = MagicMock(function_response=None)
+    part.function_call.name = tool_name
+    event = MagicMock()
+    event.content.parts = [part]
+    return event
+
+def mock_runner(runner, events):
+    """Makes a patched runner stream `events` and records how many were consumed."""
+    runner.session_service.create_session = AsyncMock(return_value=MagicMock(id="adk-session"))
+    runner.session_service.delete_session = AsyncMock()
+    runner.consumed = []
+
+    async def run_async(**kwargs):
+        for event in events:
+            runner.consumed.append(event)
+            yield event
+
+    runner.run_async = run_async
+    return runner
+
+def wait_for_job(live_client, job_id):
+    for _ in range(100):
+        data = live_client.get(f"/quiz/jobs/{job_id}").json()
+        if data["status"] in ("completed", "failed"):
+            return data
+        time.sleep(0.02)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+@patch("app.services.generation.get_educator_agent")
+@patch("app.services.generation.InMemoryRunner")
+def test_generate_quiz(mock_runner_class, mock_get_agent):
     """Test POST /quiz/generate"""
-    mock_runner = mock_runner_class.return_value
-    mock_runner.run.return_value = [] # Generate just calls it for side effects
     # 1. Mock the agent initializing a session in the DB
-    # In real flow, the agent calls a tool. Here we manually add data to mock that tool's effect.
+    # In real flow, the agent calls a tool. Here we call it ourselves to mock that tool's effect,
+    # on another topic so the request does not reuse the stored questions instead.
+    session_id = asyncio.run(initialize_quiz_session("FastAPI basics", quiz_payload(settings.QUIZ_DEFAULT_QUESTIONS)))
+
+    # The run keeps going after the quiz is saved, those events should not be read
+    events = [tool_call_event("get_educational_context")] + agent_events(session_id) + [MagicMock()] * 3
+    runner = mock_runner(mock_runner_class.return_value, events)
+
+    # The context manager keeps one event loop alive for the background job
+    with TestClient(app) as live_client:
+        response = live_client.post("/quiz/generate", json={"topic": "FastAPI"})
+
+        assert response.status_code == 202
+        data = wait_for_job(live_client, response.json()["job_id"])
+
+    assert data["status"] == "completed"
+    assert data["session_id"] == session_id
+    assert "generated successfully" in data["message"]
+    assert len(runner.consumed) == 2
+    runner.session_service.delete_session.assert_awaited_once()
+    progress = [e["message"] for e in asyncio.run(job_manager.get(data["job_id"])).events if e["type"] == "progress"]
+    assert "The AI agent is researching the topic" in progress
+
+def test_generate_quiz_streams_job_events():
+    """Test GET /quiz/jobs/{id}/events pushes progress and the final session_id"""
+    async def fake_generate(topic, question_count, report_progress):
+        await report_progress("Writing questions")
+        return 42
+
+    with patch("app.api.quiz_routes.generate_quiz_session", fake_generate), TestClient(app) as live_client:
+        job_id = live_client.post("/quiz/generate", json={"topic": "SSE"}).json()["job_id"]
+
+        with live_client.stream("GET", f"/quiz/jobs/{job_id}/events") as response:
+            assert response.headers["content-type"].startswith("text/event-stream")
+            body = "".join(response.iter_text())
+
+    assert "event: progress" in body
+    assert "event: completed" in body
+    assert '"session_id": 42' in body
+
+def test_generation_job_is_visible_from_another_worker():
+    """Test a job's status and events are read from the cache backend by a worker that does not run it"""
+    async def fake_generate(topic, question_count, report_progress):
+        await report_progress("Writing questions")
+        return 7
+
+    async def scenario():
+        running = GenerationJobManager(max_concurrency=1, max_pending=5, job_ttl_seconds=60)
+        other = GenerationJobManager(max_concurrency=1, max_pending=5, job_ttl_seconds=60)
+        job = await running.submit("Go", 5, fake_generate)
+        streamed = [event async for event in other.stream(job.id)]
+        return job.id, streamed, await other.get(job.id)
+
+    with patch("app.services.generation_jobs.REMOTE_POLL_SECONDS", 0.01):
+        job_id, streamed, snapshot = asyncio.run(scenario())
+
+    assert [e["type"] for e in streamed] == ["queued", "started", "progress", "completed"]
+    assert snapshot.id == job_id
+    assert snapshot.status == "completed"
+    assert snapshot.session_id == 7
+
+def test_generate_quiz_single_flight_per_topic():
+    """Test concurrent requests for one topic share an agent run but get their own sessions"""
     db = TestingSessionLocal()
-    session = QuizSession(topic="FastAPI", status="active")
-    db.add(session)
+    leader = QuizSession(topic="Rust", status="active")
+    questions = [Question(question_text=f"Question {i}", topic="Rust") for i in range(5)]
+    db.add(leader)
+    db.add_all(questions)
+    db.flush()
+    db.add_all([
+        SessionQuestion(session_id=leader.id, position=i, question_id=q.id)
+        for i, q in enumerate(questions)
+    ])
     db.commit()
-    db.refresh(session)
+    leader_id = leader.id
     db.close()
 
-    response = client.post("/quiz/generate", json={"topic": "FastAPI"})
-    
+    calls = []
+
+    async def slow_agent_run(topic, question_count, report_progress):
+        calls.append(topic)
+        await asyncio.sleep(0.2)
+        return leader_id
+
+    with patch("app.services.generation.run_generation", slow_agent_run), TestClient(app) as live_client:
+        job_ids = [
+            live_client.post("/quiz/generate", json={"topic": topic}).json()["job_id"]
+            for topic in ("Rust", " rust", "RUST")
+        ]
+        results = [wait_for_job(live_client, job_id) for job_id in job_ids]
+        stats = live_client.get("/quiz/generation/stats").json()
+
+    # Any of the requests may lead, the first one builds the question index meanwhile
+    assert [topic.strip().casefold() for topic in calls] == ["rust"]
+    assert len(set(job_ids)) == 3
+    session_ids = [r["session_id"] for r in results]
+    assert leader_id in session_ids
+    assert len(set(session_ids)) == 3
+    assert stats["executions"] == 1
+    assert stats["deduplicated"] == 2
+
+def test_single_flight_followers_do_not_hold_generation_slots():
+    """Test only the run leader takes a generation slot, so followers join it even when all slots are busy"""
+    leader_id = asyncio.run(initialize_quiz_session("Zig basics", quiz_payload(5)))
+
+    async def run(topic, question_count, report_progress):
+        await asyncio.sleep(0.2)
+        return leader_id
+
+    with patch.object(job_manager, "max_concurrency", 1), \
+            patch("app.services.generation.run_generation", run), TestClient(app) as live_client:
+        job_ids = [
+            live_client.post("/quiz/generate", json={"topic": topic}).json()["job_id"]
+            for topic in ("Zig", "zig", "Elm", "ZIG")
+        ]
+        results = [wait_for_job(live_client, job_id) for job_id in job_ids]
+        stats = live_client.get("/quiz/generation/stats").json()
+
+    assert [r["status"] for r in results] == ["completed"] * 4
+    # The Zig followers joined the run in flight instead of waiting behind Elm for the one slot
+    assert (stats["executions"], stats["deduplicated"]) == (2, 2)
+    waited = [
+        any(e["message"] == "Your quiz is waiting for a free generator" for e in asyncio.run(job_manager.get(job_id)).events)
+        for job_id in job_ids
+    ]
+    # Whichever of the Zig and Elm runs came second waited for the slot
+    assert waited.count(True) == 1
+
+def test_generate_quiz_direct_mode():
+    """Test GENERATION_MODE=direct saves the quiz from one structured-output call"""
+    import litellm
+    reply = litellm.ModelResponse(
+        model="mock",
+        choices=[{"index": 0, "finish_reason": "stop", "message": {
+            "role": "assistant",
+            "content": "```json\n" + json.dumps({"questions": quiz_payload(5)}) + "\n```",
+        }}],
+        usage={"prompt_tokens": 250, "completion_tokens": 600, "total_tokens": 850},
+    )
+    completion = AsyncMock(return_value=reply)
+
+    with patch.object(settings, "GENERATION_MODE", "direct"), patch("litellm.acompletion", completion), \
+            TestClient(app) as live_client:
+        job_id = live_client.post("/quiz/generate", json={"topic": "Direct"}).json()["job_id"]
+        data = wait_for_job(live_client, job_id)
+
+    assert data["status"] == "completed"
+    completion.assert_awaited_once()
+    assert completion.call_args.kwargs["response_format"]["type"] == "json_schema"
+
+    db = TestingSessionLocal()
+    session = db.get(QuizSession, data["session_id"])
+    assert session.topic == "Direct"
+    assert len(session.questions) == 5
+    db.close()
+
+def test_generate_quiz_direct_mode_rejects_invalid_json():
+    import litellm
+    reply = litellm.ModelResponse(
+        model="mock",
+        choices=[{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "not json"}}],
+    )
+
+    with patch.object(settings, "GENERATION_MODE", "direct"), \
+            patch("litellm.acompletion", AsyncMock(return_value=reply)), TestClient(app) as live_client:
+        job_id = live_client.post("/quiz/generate", json={"topic": "Broken"}).json()["job_id"]
+        data = wait_for_job(live_client, job_id)
+
+    assert data["status"] == "failed"
+
+def test_generate_long_quiz_in_chunks():
+    """Test question_count sets the quiz length and long quizzes are generated in chunks"""
+    import litellm
+    from app.services.direct_generation import chunk_sizes
+
+    async def completion(**kwargs):
+        # Each chunk asks for "Write N questions focusing on ... Topic: ..."
+        count = int(kwargs["messages"][-1]["content"].split()[1])
+        chunk = completion.await_count
+        payload = [{**q, "question_text": f"Question {chunk * 100 + i}?"} for i, q in enumerate(quiz_payload(count))]
+        return litellm.ModelResponse(model="mock", choices=[{"index": 0, "finish_reason": "stop", "message": {
+            "role": "assistant", "content": json.dumps({"questions": payload}),
+        }}])
+    completion = AsyncMock(side_effect=completion)
+
+    # 4 questions fit in one reply, the agent mode quiz is too long for a single tool call
+    with patch.object(settings, "OPENROUTER_MAX_TOKENS", 600), \
+            patch.object(settings, "GENERATION_TOKENS_PER_QUESTION", 150), \
+            patch("litellm.acompletion", completion), TestClient(app) as live_client:
+        assert chunk_sizes(10) == [4, 3, 3]
+        response = live_client.post("/quiz/generate", json={"topic": "Long", "question_count": 10})
+        assert response.json()["total_questions"] == 10
+        data = wait_for_job(live_client, response.json()["job_id"])
+
+        assert data["status"] == "completed"
+        assert completion.await_count == 3
+        question = live_client.get("/quiz/next", params={"session_id": data["session_id"]}).json()
+        assert question["total_questions"] == 10
+
+        # A shorter quiz on the same topic is cut from the cached bank
+        cached = live_client.post("/quiz/generate", json={"topic": "long", "question_count": 6}).json()
+        assert cached["status"] == "completed"
+        assert live_client.get("/quiz/next", params={"session_id": cached["session_id"]}).json()["total_questions"] == 6
+        assert completion.await_count == 3
+
+        assert live_client.post("/quiz/generate", json={"topic": "Long", "question_count": 0}).status_code == 422
+        too_long = settings.QUIZ_MAX_QUESTIONS + 1
+        assert live_client.post("/quiz/generate", json={"topic": "Long", "question_count": too_long}).status_code == 422
+
+    db = TestingSessionLocal()
+    session = db.get(QuizSession, data["session_id"])
+    assert session.question_count == 10
+    assert len({sq.question_id for sq in session.questions}) == 10
+    db.close()
+
+def test_chunked_generation_is_concurrent_and_deduplicated():
+    """Test chunks run in parallel, repeated questions are dropped and the shortfall is asked for again"""
+    from app.schemas.quiz import GeneratedQuiz
+    from app.services.chunked_generation import generate_quiz_chunked
+
+    in_flight = 0
+    max_in_flight = 0
+    focuses = []
+
+    async def request_quiz(topic, question_count, focus=None):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.05)
+        in_flight -= 1
+        focuses.append(focus)
+        chunk = len(focuses)
+        # The second chunk rewords the first chunk's questions, the third one fails
+        if chunk == 3:
+            raise RuntimeError("upstream timeout")
+        text = "In this topic, what is item {i} about exactly?" if chunk == 2 else "In this topic, what is item {i} about?"
+        if chunk > 3:
+            text = f"Follow-up {chunk} question {{i}}?"
+        payload = [{**q, "question_text": text.format(i=i)} for i, q in enumerate(quiz_payload(question_count))]
+        return GeneratedQuiz.model_validate({"questions": payload})
+
+    saved = AsyncMock(return_value=42)
+    with patch.object(settings, "OPENROUTER_MAX_TOKENS", 600), \
+            patch.object(settings, "GENERATION_TOKENS_PER_QUESTION", 150), \
+            patch("app.services.chunked_generation.request_quiz", request_quiz), \
+            patch("app.services.chunked_generation.initialize_quiz_session", saved):
+        session_id = asyncio.run(generate_quiz_chunked("Items", 12, AsyncMock()))
+
+    assert session_id == 42
+    assert max_in_flight == 3
+    assert len(set(focuses)) == len(focuses)
+    questions = saved.await_args.args[1]
+    assert len(questions) == 12
+    assert len({q["question_text"] for q in questions}) == 12
+    # 4 kept from the first chunks, the 8 missing ones asked for in a second round
+    assert len(focuses) == 5
+
+def test_short_generated_quiz_fails_the_job():
+    """Test a quiz left short by duplicate or failed chunks is not saved and its job fails"""
+    import litellm
+
+    async def completion(**kwargs):
+        # Every chunk writes the same questions, every other one fails
+        completion.calls = getattr(completion, "calls", 0) + 1
+        if completion.calls % 2 == 0:
+            raise RuntimeError("upstream timeout")
+        count = int(kwargs["messages"][-1]["content"].split()[1])
+        return litellm.ModelResponse(model="mock", choices=[{"index": 0, "finish_reason": "stop", "message": {
+            "role": "assistant", "content": json.dumps({"questions": quiz_payload(count)}),
+        }}])
+
+    with patch.object(settings, "OPENROUTER_MAX_TOKENS", 600), \
+            patch.object(settings, "GENERATION_TOKENS_PER_QUESTION", 150), \
+            patch("litellm.acompletion", AsyncMock(side_effect=completion)), TestClient(app) as live_client:
+        chunked = wait_for_job(live_client, live_client.post(
+            "/quiz/generate", json={"topic": "Repeats", "question_count": 12}
+        ).json()["job_id"])
+
+        # A direct reply with fewer questions than asked for
+        reply = litellm.ModelResponse(model="mock", choices=[{"index": 0, "finish_reason": "stop", "message": {
+            "role": "assistant", "content": json.dumps({"questions": quiz_payload(3)}),
+        }}])
+        with patch.object(settings, "GENERATION_MODE", "direct"), \
+                patch("litellm.acompletion", AsyncMock(return_value=reply)):
+            direct = wait_for_job(live_client, live_client.post(
+                "/quiz/generate", json={"topic": "Terse", "question_count": 4}
+            ).json()["job_id"])
+
+    assert (chunked["status"], chunked["session_id"]) == ("failed", None)
+    assert "Only 4 of 12 questions" in chunked["error"]
+    assert (direct["status"], direct["session_id"]) == ("failed", None)
+    assert "3 of 4 questions" in direct["error"]
+
+    db = TestingSessionLocal()
+    assert db.query(QuizSession).count() == 0
+    db.close()
+
+@patch("app.services.generation.get_educator_agent")
+@patch("app.services.generation.InMemoryRunner")
+def test_agent_quiz_saved_short_fails_the_job(mock_runner_class, mock_get_agent):
+    """Test an agent run that saved fewer questions than asked for fails its job"""
+    session_id = asyncio.run(initialize_quiz_session("Agent basics", quiz_payload(2)))
+    mock_runner(mock_runner_class.return_value, agent_events(session_id))
+
+    with TestClient(app) as live_client:
+        data = wait_for_job(live_client, live_client.post(
+            "/quiz/generate", json={"topic": "Agent", "question_count": 3}
+        ).json()["job_id"])
+
+    assert data["status"] == "failed"
+    assert "2 of 3 questions" in data["error"]
+
+def test_get_unknown_job():
+    response = client.get("/quiz/jobs/does-not-exist")
+    assert response.status_code == 404
+
+@patch("app.api.quiz_routes.generate_quiz_session")
+def test_generate_quiz_uses_cached_bank(mock_generate):
+    """Test POST /quiz/generate is served from the question bank cache"""
+    db = TestingSessionLocal()
+    questions = [Question(question_text=f"Question {i}", topic="Python") for i in range(5)]
+    db.add_all(questions)
+    db.commit()
+    question_ids = tuple(q.id for q in questions)
+    db.close()
+
+    asyncio.run(quiz_cache.store_bank("Python", quiz_cache.QuizBank(topic="Python", question_ids=question_ids)))
+
+    response = client.post("/quiz/generate", json={"topic": "  python "})
+
+    assert response.status_code == 202
+    assert response.json()["status"] == "completed"
+    mock_generate.assert_not_called()
+
+    db = TestingSessionLocal()
+    session = db.get(QuizSession, response.json()["session_id"])
+    assert session.topic == "Python"
+    db.close()
+
+    stats = client.get("/quiz/cache/stats").json()
+    assert stats["hits"] == 1
+    assert stats["size"] == 1
+
+def test_prewarm_loads_popular_topics():
+    """Test the cache pre-warm job picks up topics from quiz results"""
+    db = TestingSessionLocal()
+    db.add_all([Question(question_text=f"Question {i}", topic="Python") for i in range(5)])
+    db.add(Topic(key="python", name="Python", question_count=5))
+    db.add(QuizResult(user_name="Test User", user_email="test@example.com", topic="Python", score=3))
+    db.commit()
+    db.close()
+
+    warmed = asyncio.run(quiz_cache.prewarm_popular_topics(limit=5))
+
+    assert warmed == 1
+    assert asyncio.run(quiz_cache.get_cached_bank("python", 5)) is not None
+
+def test_topic_spellings_share_stored_questions():
+    """Test topics are normalized and a known topic is served from its stored questions"""
+    first = asyncio.run(initialize_quiz_session("Machine  Learning ", quiz_payload(5)))
+    second = asyncio.run(initialize_quiz_session("machine learning", [
+        {**q, "question_text": f"Which answer fits case {i}?"} for i, q in enumerate(quiz_payload(3))
+    ]))
+
+    db = TestingSessionLocal()
+    assert db.get(QuizSession, first).topic == db.get(QuizSession, second).topic == "Machine Learning"
+    assert db.get(Topic, "machine learning").question_count == 8
+    assert {q.topic for q in db.query(Question).all()} == {"Machine Learning"}
+    db.close()
+
+    # The cache is empty, the job finds the stored questions instead of generating
+    with patch("app.services.generation.run_generation") as run_generation, TestClient(app) as live_client:
+        response = live_client.post("/quiz/generate", json={"topic": "  MACHINE learning", "question_count": 8})
+        assert response.json()["topic"] == "MACHINE learning"
+        data = wait_for_job(live_client, response.json()["job_id"])
+        assert live_client.post("/quiz/generate", json={"topic": "   "}).status_code == 422
+    run_generation.assert_not_called()
+    assert data["status"] == "completed"
+
+    db = TestingSessionLocal()
+    assert db.get(QuizSession, data["session_id"]).topic == "Machine Learning"
+    assert len(db.get(QuizSession, data["session_id"]).questions) == 8
+    db.close()
+
+def test_topic_search_suggests_ready_topics():
+    """Test GET /topics/search autocompletes topics that have a question bank"""
+    for topic, count in (("Python basics", 5), ("Python", 10), ("Pythagoras", 2), ("Rust", 5)):
+        asyncio.run(initialize_quiz_session(topic, [
+            {**q, "question_text": f"{topic} question {i}?"} for i, q in enumerate(quiz_payload(count))
+        ]))
+
+    response = client.get("/topics/search", params={"q": "pyth"})
     assert response.status_code == 200
-    data = response.json()
-    assert data["session_id"] is not None
-    assert "generated successfully" in data["message"]
+    # Pythagoras has too few questions for a quiz
+    assert [s["topic"] for s in response.json()["suggestions"]] == ["Python", "Python basics"]
+    assert response.json()["suggestions"][0]["question_count"] == 10
+
+    suggestions = client.get("/topics/search", params={"q": "BAS pyt"}).json()["suggestions"]
+    assert [s["topic"] for s in suggestions] == ["Python basics"]
+    assert client.get("/topics/search", params={"q": "go"}).json()["suggestions"] == []
+    assert client.get("/topics/search", params={"q": "?!"}).json()["suggestions"] == []
+    assert client.get("/topics/search", params={"q": ""}).status_code == 422
 
 def test_get_next_question():
     """Test GET /quiz/next"""
@@ -77,6 +541,7 @@ def test_get_next_question():
     c1 = Choice(choice_text="Language", is_correct=True, question_id=q.id)
     c2 = Choice(choice_text="Snake", is_correct=False, question_id=q.id)
     db.add_all([c1, c2])
+    db.add(SessionQuestion(session_id=session_id, position=0, question_id=q.id))
     db.commit()
     db.close()
 
@@ -89,16 +554,188 @@ def test_get_next_question():
     assert len(data["choices"]) == 2
     assert data["current_number"] == 1
 
-@patch("app.api.quiz_routes.InMemoryRunner")
-def test_submit_answer(mock_runner_class):
-    """Test POST /quiz/submit"""
-    mock_runner = mock_runner_class.return_value
-    
-    # Mock events for explanation
-    mock_event = MagicMock()
-    mock_event.content.parts = [MagicMock(text="Explanation of Python")]
-    mock_runner.run.return_value = [mock_event]
+def test_get_next_question_is_scoped_to_session():
+    """Test GET /quiz/next only serves the session's own questions, in order"""
+    older = asyncio.run(initialize_quiz_session("Python", quiz_payload(5)))
+    session_id = asyncio.run(initialize_quiz_session("Python", [
+        {**q, "question_text": f"Which answer fits case {i}?"} for i, q in enumerate(quiz_payload(5))
+    ]))
+
+    first = client.get(f"/quiz/next?session_id={session_id}").json()
+    assert first["current_number"] == 1
+
+    db = TestingSessionLocal()
+    own_question_ids = [sq.question_id for sq in db.get(QuizSession, session_id).questions]
+    older_question_ids = [sq.question_id for sq in db.get(QuizSession, older).questions]
+    db.close()
+    assert first["id"] == own_question_ids[0]
+
+    client.post("/quiz/submit", json={
+        "session_id": session_id,
+        "question_id": first["id"],
+        "choice_id": first["choices"][0]["id"]
+    })
+
+    second = client.get(f"/quiz/next?session_id={session_id}").json()
+    assert second["id"] == own_question_ids[1]
+    assert second["id"] not in older_question_ids
+    assert second["current_number"] == 2
 
+def test_snapshot_cache_avoids_database_reads():
+    """Test /quiz/next is served from the snapshot and /quiz/submit only writes"""
+    session_id = asyncio.run(initialize_quiz_session("Python", quiz_payload(5)))
+    with count_queries() as queries:
+        client.get(f"/quiz/next?session_id={session_id}")  # warms the snapshot
+    assert len(queries.statements) == 1  # session, questions, choices and answers joined
+
+    with count_queries() as queries:
+        question = client.get(f"/quiz/next?session_id={session_id}").json()
+    assert queries.statements == []
+
+    wrong_choice = question["choices"][1]["id"]
+    with count_queries() as queries:
+        response = client.post("/quiz/submit", json={
+            "session_id": session_id,
+            "question_id": question["id"],
+            "choice_id": wrong_choice
+        })
+    assert response.json()["is_correct"] is False
+    assert len(queries.statements) == 2
+    assert queries.statements[0].startswith("INSERT INTO user_answers")
+    assert queries.statements[1].startswith("UPDATE quiz_sessions")
+
+    with count_queries() as queries:
+        assert client.get(f"/quiz/next?session_id={session_id}").json()["current_number"] == 2
+    assert queries.statements == []
+
+def test_snapshot_cache_reads_do_not_grow_with_quiz_length():
+    """Test cached /quiz/next and /quiz/submit decode only the question they serve, for any quiz length"""
+    from app.core.cache import MemoryCacheNamespace
+
+    def warm_round_trip(question_count):
+        session_id = asyncio.run(initialize_quiz_session(f"Length {question_count}", quiz_payload(question_count)))
+        client.get(f"/quiz/next?session_id={session_id}")  # warms the snapshot
+        reads = {"get": 0, "get_many": 0, "get_fields": 0}
+
+        def spy(name):
+            original = getattr(MemoryCacheNamespace, name)
+            async def counted(self, *args, **kwargs):
+                reads[name] += 1
+                return await original(self, *args, **kwargs)
+            return patch.object(MemoryCacheNamespace, name, counted)
+
+        decode = MagicMock(side_effect=session_cache.CachedQuestion.from_dict)
+        with spy("get"), spy("get_many"), spy("get_fields"), \
+                patch.object(session_cache.CachedQuestion, "from_dict", decode), count_queries() as queries:
+            question = client.get(f"/quiz/next?session_id={session_id}").json()
+            response = client.post("/quiz/submit", json={
+                "session_id": session_id, "question_id": question["id"], "choice_id": question["choices"][0]["id"]
+            })
+            assert client.get(f"/quiz/next?session_id={session_id}").json()["current_number"] == 2
+        assert response.json()["next_question_available"] is True
+        assert [q.split()[0] for q in queries.statements] == ["INSERT", "UPDATE"]
+        return decode.call_count, reads
+
+    assert warm_round_trip(5) == warm_round_trip(150)
+    assert warm_round_trip(3)[0] == 3  # one question per request
+
+def test_query_stats_headers_in_debug_mode():
+    """Test DEBUG responses report the statements each request issued"""
+    session_id = asyncio.run(initialize_quiz_session("Python", quiz_payload(5)))
+
+    with patch.object(settings, "DEBUG", True):
+        cold = client.get(f"/quiz/next?session_id={session_id}")
+        warm = client.get(f"/quiz/next?session_id={session_id}")
+
+    assert int(cold.headers["x-db-query-count"]) > 0
+    assert float(cold.headers["x-db-query-time-ms"]) > 0
+    assert warm.headers["x-db-query-count"] == "0"
+    assert "x-db-query-count" not in client.get(f"/quiz/next?session_id={session_id}").headers
+
+def test_route_over_query_budget_fails():
+    """Test a route issuing more statements than its query_budget is turned into a 500"""
+    from fastapi import FastAPI
+    from sqlalchemy import text
+    from app.core.query_budget import QueryStatsMiddleware, query_budget
+
+    budget_app = FastAPI()
+    budget_app.add_middleware(QueryStatsMiddleware)
+
+    @budget_app.get("/reads/{count}")
+    @query_budget(2)
+    async def reads(count: int):
+        async with AsyncTestingSessionLocal() as db:
+            for _ in range(count):
+                await db.execute(text("SELECT 1"))
+        return {"reads": count}
+
+    with TestClient(budget_app) as budget_client:
+        assert budget_client.get("/reads/2").status_code == 200
+        response = budget_client.get("/reads/3")
+    assert response.status_code == 500
+    assert response.headers["x-query-budget-exceeded"] == "3/2"
+
+def test_snapshot_shared_through_redis_backend():
+    """Test a snapshot written by one worker is served to another through Redis"""
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    session_id = asyncio.run(initialize_quiz_session("Python", quiz_payload(5)))
+
+    # Two app workers, each with its own Redis client
+    worker_a = RedisCacheBackend(fakeredis.FakeAsyncRedis(server=server), prefix="test:")
+    worker_b = RedisCacheBackend(fakeredis.FakeAsyncRedis(server=server), prefix="test:")
+
+    set_cache_backend(worker_a)
+    with TestClient(app) as live_client:
+        question = live_client.get(f"/quiz/next?session_id={session_id}").json()
+        live_client.post("/quiz/submit", json={
+            "session_id": session_id,
+            "question_id": question["id"],
+            "choice_id": question["choices"][0]["id"]
+        })
+
+    set_cache_backend(worker_b)
+    with TestClient(app) as live_client:
+        with count_queries() as queries:
+            response = live_client.get(f"/quiz/next?session_id={session_id}")
+    assert response.json()["current_number"] == 2
+    assert queries.statements == []
+
+def test_metrics_report_pool_usage():
+    """Test GET /metrics exposes the connection pool counters and saturation"""
+    asyncio.run(initialize_quiz_session("Python", quiz_payload(5)))
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert "db_pool_checkouts_total{worker=" in body
+    assert "db_pool_wait_seconds_count{worker=" in body
+    assert 'state="saturation"' in body
+
+def test_metrics_record_routes_and_agent_phases():
+    """Test /metrics has per-route latency and the agent phase histograms"""
+    ok = {"method": "GET", "route": "/quiz/next", "status": "200"}
+    not_found = {**ok, "status": "404"}
+    before_ok, before_not_found = http_requests.value(**ok), http_requests.value(**not_found)
+
+    session_id = asyncio.run(initialize_quiz_session("Python", quiz_payload(5)))
+    client.get(f"/quiz/next?session_id={session_id}")
+    client.get("/quiz/next?session_id=999999")
+
+    body = client.get("/metrics").text
+
+    assert http_requests.value(**ok) == before_ok + 1
+    assert http_requests.value(**not_found) == before_not_found + 1
+    assert 'http_request_seconds_count{method="GET",route="/quiz/next",status="200"}' in body
+    assert 'initialize_quiz_session_seconds_count{outcome="ok"}' in body
+    assert "# TYPE agent_llm_call_seconds histogram" in body
+    assert "# TYPE agent_tool_call_seconds histogram" in body
+    assert "# TYPE agent_llm_call_tokens histogram" in body
+
+def test_submit_answer():
+    """Test POST /quiz/submit"""
     # 1. Setup Data
     db = TestingSessionLocal()
     session = QuizSession(topic="Python", status="active")
@@ -107,16 +744,23 @@ def test_submit_answer(mock_runner_class):
     session_id = session.id
     
     q = Question(question_text="What is Python?", topic="Python")
-    db.add(q)
+    q2 = Question(question_text="What is PyPI?", topic="Python")
+    db.add_all([q, q2])
     db.commit()
-    q_id = q.id
+    q_id, q2_id = q.id, q2.id
     
     c_correct = Choice(choice_text="Language", is_correct=True, question_id=q_id)
     c_wrong = Choice(choice_text="Snake", is_correct=False, question_id=q_id)
-    db.add_all([c_correct, c_wrong])
+    c2_correct = Choice(choice_text="Package index", is_correct=True, question_id=q2_id)
+    c2_wrong = Choice(choice_text="A pie", is_correct=False, question_id=q2_id)
+    db.add_all([c_correct, c_wrong, c2_correct, c2_wrong])
+    db.add(SessionQuestion(session_id=session_id, position=0, question_id=q_id))
+    db.add(SessionQuestion(session_id=session_id, position=1, question_id=q2_id))
     db.commit()
     c_correct_id = c_correct.id
     c_wrong_id = c_wrong.id
+    c2_correct_id = c2_correct.id
+    c2_wrong_id = c2_wrong.id
     db.close()
 
     # 2. Test Correct Answer
@@ -127,22 +771,120 @@ def test_submit_answer(mock_runner_class):
     })
     assert response.status_code == 200
     assert response.json()["is_correct"] is True
+    assert response.json()["next_question_available"] is True
 
-    # 3. Test Wrong Answer (with AI explanation trigger)
+    # 3. A re-submit of an answered question returns the answer recorded first
     response = client.post("/quiz/submit", json={
         "session_id": session_id,
         "question_id": q_id,
         "choice_id": c_wrong_id
     })
     assert response.status_code == 200
+    assert response.json()["is_correct"] is True
+
+    # 4. Test Wrong Answer (with explanation)
+    response = client.post("/quiz/submit", json={
+        "session_id": session_id,
+        "question_id": q2_id,
+        "choice_id": c2_wrong_id
+    })
+    assert response.status_code == 200
     assert response.json()["is_correct"] is False
-    assert response.json()["explanation"] == "Explanation of Python"
+    assert response.json()["correct_choice_id"] == c2_correct_id
+    assert "The correct answer is 'Package index'" in response.json()["explanation"]
+    assert response.json()["next_question_available"] is False
+
+    db = TestingSessionLocal()
+    session = db.get(QuizSession, session_id)
+    assert (session.total_score, session.answered_count) == (1, 2)
+    assert db.query(UserAnswer).filter_by(session_id=session_id).count() == 2
+    db.close()
+
+def test_submit_answers_in_batch():
+    """Test POST /quiz/submit/batch grades a whole quiz in one transaction"""
+    session_id = asyncio.run(initialize_quiz_session("Python", quiz_payload(50)))
+    db = TestingSessionLocal()
+    answers = []
+    for sq in db.query(SessionQuestion).filter_by(session_id=session_id).order_by(SessionQuestion.position):
+        choices = {c.is_correct: c.id for c in db.get(Question, sq.question_id).choices}
+        # Every third answer is wrong
+        answers.append({"question_id": sq.question_id, "choice_id": choices[sq.position % 3 != 0]})
+    db.close()
+
+    # An unknown choice rejects the whole batch
+    response = client.post("/quiz/submit/batch", json={
+        "session_id": session_id, "answers": answers[:2] + [{"question_id": answers[2]["question_id"], "choice_id": -1}]
+    })
+    assert response.status_code == 404
+
+    with count_queries() as queries:
+        response = client.post("/quiz/submit/batch", json={"session_id": session_id, "answers": answers})
+    assert response.status_code == 200
+    # The snapshot is cached by now: one insert for the 50 answers and one score update
+    assert [q.split()[0] for q in queries.statements] == ["INSERT", "UPDATE"]
+
+    data = response.json()
+    assert (data["score"], data["answered_count"], data["next_question_available"]) == (33, 50, False)
+    assert [r["is_correct"] for r in data["results"]] == [i % 3 != 0 for i in range(50)]
+    assert data["results"][0]["explanation"].startswith("The correct answer is 'Right 0'")
+    assert not any(r["already_answered"] for r in data["results"])
+
+    # Sending the batch again changes nothing
+    data = client.post("/quiz/submit/batch", json={"session_id": session_id, "answers": answers}).json()
+    assert (data["score"], data["answered_count"]) == (33, 50)
+    assert all(r["already_answered"] for r in data["results"])
+
+    duplicate = client.post("/quiz/submit/batch", json={"session_id": session_id, "answers": answers[:1] * 2})
+    assert duplicate.status_code == 400
+
+    db = TestingSessionLocal()
+    assert db.query(UserAnswer).filter_by(session_id=session_id).count() == 50
+    assert db.get(QuizSession, session_id).total_score == 33
+    db.close()
+
+def test_concurrent_submits_keep_score_consistent():
+    """Test parallel submits, duplicates included, never lose or double count an answer"""
+    import httpx
+
+    session_id = asyncio.run(initialize_quiz_session("Python", quiz_payload(5)))
+    db = TestingSessionLocal()
+    questions = [
+        (sq.question_id, [c.id for c in db.get(Question, sq.question_id).choices if c.is_correct][0])
+        for sq in db.query(SessionQuestion).filter_by(session_id=session_id).order_by(SessionQuestion.position)
+    ]
+    db.close()
+
+    async def submit_all():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as async_client:
+            # Every question answered correctly four times at once, like double clicks and retries
+            return await asyncio.gather(*(
+                async_client.post("/quiz/submit", json={
+                    "session_id": session_id, "question_id": question_id, "choice_id": choice_id
+                })
+                for question_id, choice_id in questions
+                for _ in range(4)
+            ))
+
+    responses = asyncio.run(submit_all())
+    assert [r.status_code for r in responses] == [200] * 20
+    assert all(r.json()["is_correct"] for r in responses)
+
+    db = TestingSessionLocal()
+    session = db.get(QuizSession, session_id)
+    assert (session.total_score, session.answered_count) == (5, 5)
+    assert db.query(UserAnswer).filter_by(session_id=session_id).count() == 5
+    db.close()
+
+    # The cached progress kept every answer, none of the racing submits undid another's
+    response = client.get(f"/quiz/next?session_id={session_id}")
+    assert response.status_code == 400
 
 def test_finalize_quiz():
     """Test POST /quiz/finalize"""
     # 1. Setup Data
     db = TestingSessionLocal()
-    session = QuizSession(topic="Testing", status="active", total_score=4)
+    session = QuizSession(topic="Testing", status="active", total_score=4, question_count=5)
     db.add(session)
     db.commit()
     session_id = session.id
@@ -160,3 +902,181 @@ def test_finalize_quiz():
     assert data["user_name"] == "Test User"
     assert data["score"] == 4
     assert data["percentage"] == 80.0
+
+def test_finalize_quiz_twice_keeps_the_first_result():
+    """Test a repeated POST /quiz/finalize is rejected and adds no result or topic attempt"""
+    db = TestingSessionLocal()
+    session = QuizSession(topic="Testing", status="active", total_score=4, question_count=5)
+    db.add(session)
+    db.commit()
+    session_id = session.id
+    db.close()
+
+    request = {"session_id": session_id, "user_name": "Test User", "user_email": "test@example.com"}
+    assert client.post("/quiz/finalize", json=request).status_code == 200
+    response = client.post("/quiz/finalize", json=request)
+
+    assert response.status_code == 409
+    db = TestingSessionLocal()
+    assert db.query(QuizResult).count() == 1
+    db.close()
+    assert client.get("/results/topics/Testing/stats").json()["attempts"] == 1
+
+def test_results_leaderboard_and_topic_stats():
+    """Test /results/leaderboard pages through results and topic stats follow finalize"""
+    db = TestingSessionLocal()
+    sessions = [QuizSession(topic=topic, status="active", total_score=score, question_count=5)
+                for topic, score in [("Testing", 3), ("Testing", 5), ("Other", 2), ("Testing", 4), ("Testing", 5)]]
+    db.add_all(sessions)
+    db.commit()
+    session_ids = [s.id for s in sessions]
+    db.close()
+
+    for i, session_id in enumerate(session_ids):
+        response = client.post("/quiz/finalize", json={
+            "session_id": session_id, "user_name": f"User {i}", "user_email": f"user{i}@example.com"
+        })
+        assert response.status_code == 200
+
+    stats = client.get("/results/topics/Testing/stats").json()
+    assert stats["attempts"] == 4
+    assert stats["average_score"] == 4.25
+    assert stats["average_percentage"] == 85.0
+    assert stats["best_score"] == 5
+    assert client.get("/results/topics/Unknown/stats").status_code == 404
+
+    pages, cursor = [], None
+    while True:
+        params = {"topic": "Testing", "limit": 2, **({"cursor": cursor} if cursor else {})}
+        page = client.get("/results/leaderboard", params=params).json()
+        pages.append([(e["user_name"], e["score"]) for e in page["entries"]])
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    # Ties go to whoever got there first
+    assert pages == [[("User 1", 5), ("User 4", 5)], [("User 3", 4), ("User 0", 3)]]
+
+    overall = client.get("/results/leaderboard").json()
+    assert [e["score"] for e in overall["entries"]] == [5, 5, 4, 3, 2]
+    assert overall["next_cursor"] is None
+    assert client.get("/results/leaderboard", params={"cursor": "not-a-cursor"}).status_code == 400
+
+def test_results_resolve_topic_spelling():
+    """Test topic stats and the leaderboard filter accept any spelling of a registered topic"""
+    session_id = asyncio.run(initialize_quiz_session("Machine Learning", quiz_payload(5)))
+    client.post("/quiz/finalize", json={
+        "session_id": session_id, "user_name": "Test User", "user_email": "test@example.com"
+    })
+
+    stats = client.get("/results/topics/machine  LEARNING /stats").json()
+    assert (stats["topic"], stats["attempts"]) == ("Machine Learning", 1)
+    entries = client.get("/results/leaderboard", params={"topic": "machine learning"}).json()["entries"]
+    assert [e["topic"] for e in entries] == ["Machine Learning"]
+
+def quiz_payload(count):
+    return [
+        {
+            "question_text": f"Question {i}?",
+            "choices": [
+                {"choice_text": f"Right {i}", "is_correct": True},
+                {"choice_text": f"Wrong {i}", "is_correct": False},
+            ],
+        }
+        for i in range(count)
+    ]
+
+def test_initialize_quiz_session_saves_questions():
+    """Test the initialize_quiz_session tool writes the whole quiz"""
+    session_id = asyncio.run(initialize_quiz_session("Python", quiz_payload(5)))
+
+    db = TestingSessionLocal()
+    assert db.get(QuizSession, session_id).topic == "Python"
+    questions = db.query(Question).filter(Question.topic == "Python").order_by(Question.id).all()
+    assert [q.question_text for q in questions] == [f"Question {i}?" for i in range(5)]
+    assert all(len(q.choices) == 2 for q in questions)
+    assert all(c.choice_text.startswith("Right") for q in questions for c in q.choices if c.is_correct)
+    db.close()
+
+def test_initialize_quiz_session_reuses_near_identical_questions():
+    """Test questions close to stored ones of the topic are linked instead of inserted again"""
+    def payload(texts):
+        return [{**q, "question_text": text} for q, text in zip(quiz_payload(len(texts)), texts)]
+
+    first = asyncio.run(initialize_quiz_session("Python", payload([
+        "Which keyword defines a function in Python?",
+        "What does the len() built-in return for a list?",
+        "Which data type is immutable: list, dict or tuple?",
+    ])))
+    second = asyncio.run(initialize_quiz_session(" python", payload([
+        "In Python, which keyword defines a function?",
+        "what does the LEN() built-in return for a list",
+        "Which statement exits a loop early?",
+    ])))
+    other_topic = asyncio.run(initialize_quiz_session("Go", payload([
+        "What does the len() built-in return for a list?",
+    ])))
+
+    db = TestingSessionLocal()
+    first_ids = [sq.question_id for sq in db.get(QuizSession, first).questions]
+    second_ids = [sq.question_id for sq in db.get(QuizSession, second).questions]
+    assert second_ids[:2] == first_ids[:2]
+    assert second_ids[2] not in first_ids
+    assert db.get(QuizSession, other_topic).questions[0].question_id not in first_ids
+    assert db.query(Question).count() == 5
+    db.close()
+
+    # A bank never serves two versions of the same question
+    index = asyncio.run(_question_index())
+    assert index.distinct(first_ids + second_ids) == first_ids + second_ids[2:]
+
+async def _question_index():
+    from app.services.question_index import get_question_index
+    async with AsyncTestingSessionLocal() as db:
+        return await get_question_index(db)
+
+def test_question_index_is_built_off_the_event_loop():
+    """Test callers arriving while the index is built get no index instead of waiting"""
+    from app.services.question_index import get_question_index
+    first = asyncio.run(initialize_quiz_session("Python", quiz_payload(3)))
+    reset_question_index()
+
+    async def scenario():
+        async with AsyncTestingSessionLocal() as db, AsyncTestingSessionLocal() as other_db:
+            build = asyncio.create_task(get_question_index(db))
+            await asyncio.sleep(0)
+            during = await get_question_index(other_db)
+            return during, await build
+
+    during, index = asyncio.run(scenario())
+    assert during is None
+    assert len(index) == 3
+    db = TestingSessionLocal()
+    assert [sq.question_id for sq in db.get(QuizSession, first).questions] == list(index._signatures)
+    db.close()
+
+def test_question_index_signatures():
+    """Test the MinHash estimate tells rewordings from different questions, word order included"""
+    from app.services.question_index import QuestionIndex
+
+    index = QuestionIndex(threshold=0.8)
+    index.add(1, "Python", "Which keyword defines a function in Python?")
+    index.add(2, "Math", "What is the derivative of x squared with respect to x?")
+    index.add(3, "Math", "What is 2 + 3?")
+
+    assert index.find_similar("python ", "In Python, which keyword defines a function?")[0] == 1
+    assert index.find_similar("Math", "What is the derivative of x squared with respect to x ?") == (2, 1.0)
+    assert index.find_similar("Math", "What is the derivative of x cubed with respect to x?") is None
+    assert index.find_similar("Math", "What is 3 + 2?") is None
+    assert index.find_similar("Physics", "What is 2 + 3?") is None
+
+def test_initialize_quiz_session_rejects_invalid_payload():
+    """Test an invalid payload is rejected before anything is written"""
+    payload = quiz_payload(3)
+    payload[2]["choices"][1]["is_correct"] = True  # two correct answers
+
+    assert asyncio.run(initialize_quiz_session("Python", payload)) == -1
+
+    db = TestingSessionLocal()
+    assert db.query(QuizSession).count() == 0
+    assert db.query(Question).count() == 0
+    db.close()
@@ -0,0 +1,56 @@
+import io
+import json
+import logging
+import queue
+import sys
+import os
+
+# Set up path to import app correctly
+sys.path.insert(0, os.path.abspath(os.path.join(os.getcwd(), "src")))
+
+from app.core.logging_config import ExceptionKeepingQueueHandler, JsonFormatter, Truncated
+
+def test_json_formatter_includes_extra_fields():
+    record = logging.LogRecord("app.test", logging.INFO, __file__, 1, "quiz %s ready", ("42",), None)
+    record.session_id = 42
+
+    payload = json.loads(JsonFormatter().format(record))
+
+    assert payload["message"] == "quiz 42 ready"
+    assert payload["level"] == "INFO"
+    assert payload["logger"] == "app.test"
+    assert payload["session_id"] == 42
+
+def test_queued_records_keep_their_traceback():
+    log_queue = queue.SimpleQueue()
+    stream = io.StringIO()
+    output = logging.StreamHandler(stream)
+    output.setFormatter(JsonFormatter())
+    logger = logging.getLogger("app.test.queued")
+    logger.addHandler(ExceptionKeepingQueueHandler(log_queue))
+    logger.propagate = False
+
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("generation %s failed", 7)
+    output.handle(log_queue.get_nowait())
+
+    payload = json.loads(stream.getvalue())
+    assert payload["message"] == "generation 7 failed"
+    assert "ValueError: boom" in payload["exc_info"]
+
+def test_truncated_is_lazy_and_cut_short():
+    class Event:
+        formatted = 0
+
+        def __str__(self):
+            Event.formatted += 1
+            return "x" * 50
+
+    logger = logging.getLogger("app.test.truncated")
+    logger.setLevel(logging.INFO)
+    logger.debug("event %s", Truncated(Event(), max_chars=10))
+    assert Event.formatted == 0
+
+    assert str(Truncated(Event(), max_chars=10)) == "x" * 10 + "... [40 more chars]"
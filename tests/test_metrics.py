@@ -0,0 +1,55 @@
+import asyncio
+import sys
+import os
+from unittest.mock import MagicMock
+
+# Set up path to import app correctly
+sys.path.insert(0, os.path.abspath(os.path.join(os.getcwd(), "src")))
+
+from app.core.metrics import MetricsRegistry
+
+def test_counter_and_gauge_render_in_prometheus_format():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests", "Requests served", ["route"])
+    registry.gauge("pool", "Pool usage", ["state"], callback=lambda: [({"state": "idle"}, 3)])
+
+    requests.inc(route="/quiz/next")
+    requests.inc(2, route="/quiz/next")
+
+    output = registry.render()
+    assert "# TYPE requests counter" in output
+    assert 'requests_total{route="/quiz/next"} 3' in output
+    assert 'pool{state="idle"} 3' in output
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+
+    for value in (0.05, 0.5, 0.5, 5.0):
+        latency.observe(value)
+
+    output = registry.render()
+    assert 'latency_seconds_bucket{le="0.1"} 1' in output
+    assert 'latency_seconds_bucket{le="1"} 3' in output
+    assert 'latency_seconds_bucket{le="+Inf"} 4' in output
+    assert "latency_seconds_count 4" in output
+    assert "latency_seconds_sum 6.05" in output
+
+def test_agent_callbacks_record_llm_latency_and_tokens():
+    from app.agent import telemetry
+
+    callback_context = MagicMock(invocation_id="inv-1")
+    llm_request = MagicMock(model="test-model")
+    llm_response = MagicMock(partial=False, error_code=None)
+    llm_response.usage_metadata.prompt_token_count = 300
+    llm_response.usage_metadata.candidates_token_count = 900
+    before = telemetry.llm_call_seconds.count(model="test-model", outcome="ok")
+
+    async def scenario():
+        await telemetry.before_model(callback_context=callback_context, llm_request=llm_request)
+        await telemetry.after_model(callback_context=callback_context, llm_response=llm_response)
+
+    asyncio.run(scenario())
+
+    assert telemetry.llm_call_seconds.count(model="test-model", outcome="ok") == before + 1
+    assert telemetry.llm_tokens_total.value(model="test-model", direction="out") >= 900
@@ -0,0 +1,98 @@
+import asyncio
+from datetime import datetime
+from unittest.mock import patch
+import pytest
+import sys
+import os
+
+# Set up path to import app correctly
+sys.path.insert(0, os.path.abspath(os.path.join(os.getcwd(), "src")))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.core.config import settings
+from app.core.database import Base
+from app.models.topic import Topic
+from app.services import results_repository
+
+alembic_command = pytest.importorskip("alembic.command")
+from alembic.config import Config
+
+ALEMBIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic")
+
+def migrate(url: str, action: str, revision: str) -> None:
+    config = Config()
+    config.set_main_option("script_location", ALEMBIC_DIR)
+    # env.py reads the database URL from the settings
+    with patch.object(settings, "DATABASE_URL", url):
+        getattr(alembic_command, action)(config, revision)
+
+def test_topics_migration_merges_spellings(tmp_path):
+    """Test the topics backfill moves every row to one spelling and merges the topic stats"""
+    path = tmp_path / "migration.db"
+    engine = create_engine(f"sqlite:///{path}")
+    # The schema of the revision before topics
+    Base.metadata.create_all(engine)
+    Topic.__table__.drop(engine)
+    migrate(f"sqlite:///{path}", "stamp", "9d2b6f4e8a1c")
+
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO questions (id, question_text, topic) VALUES (:id, :text, :topic)"), [
+            {"id": 1, "text": "Q1", "topic": "python "},
+            {"id": 2, "text": "Q2", "topic": "Python"},
+            {"id": 3, "text": "Q3", "topic": "Python  basics"},
+            {"id": 4, "text": "Q4", "topic": "python basics"},
+        ])
+        conn.execute(text("INSERT INTO quiz_sessions (id, topic, status) VALUES (:id, :topic, 'completed')"), [
+            {"id": 1, "topic": "Python"}, {"id": 2, "topic": "PYTHON"}, {"id": 3, "topic": "Python  basics"},
+        ])
+        conn.execute(text(
+            "INSERT INTO quiz_results (user_name, topic, score, total_questions, completed_at) "
+            "VALUES (:user, :topic, :score, 5, :completed_at)"
+        ), [
+            {"user": "A", "topic": "Python", "score": 3, "completed_at": "2026-01-01 00:00:00.000000"},
+            {"user": "B", "topic": "python ", "score": 5, "completed_at": "2026-01-02 00:00:00.000000"},
+            {"user": "C", "topic": "PYTHON", "score": 4, "completed_at": "2026-01-03 00:00:00.000000"},
+        ])
+        conn.execute(text(
+            "INSERT INTO topic_stats (topic, attempts, total_score, total_questions, best_score, last_completed_at) "
+            "VALUES (:topic, :attempts, :total_score, :total_questions, :best_score, :last_completed_at)"
+        ), [
+            {"topic": "Python", "attempts": 1, "total_score": 3, "total_questions": 5, "best_score": 3,
+             "last_completed_at": "2026-01-01 00:00:00.000000"},
+            {"topic": "python ", "attempts": 1, "total_score": 5, "total_questions": 5, "best_score": 5,
+             "last_completed_at": "2026-01-02 00:00:00.000000"},
+            {"topic": "PYTHON", "attempts": 1, "total_score": 4, "total_questions": 5, "best_score": 4,
+             "last_completed_at": "2026-01-03 00:00:00.000000"},
+        ])
+
+    migrate(f"sqlite:///{path}", "upgrade", "b7e3d1f9c2a4")
+
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT key, name, question_count FROM topics ORDER BY key")).all() == [
+            ("python", "python", 2), ("python basics", "Python basics", 2)
+        ]
+        assert {row.topic for row in conn.execute(text("SELECT topic FROM quiz_sessions"))} == {
+            "python", "Python basics"
+        }
+        assert conn.execute(text("SELECT COUNT(*) FROM topic_stats")).scalar() == 1
+    engine.dispose()
+
+    async def read_back():
+        async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        async with AsyncSession(async_engine) as db:
+            stats = await results_repository.get_topic_stats(db, "Python")
+            leaderboard = await results_repository.get_leaderboard(db, 10, topic=" PYTHON")
+            found = await db.execute(text("SELECT name FROM topics_fts WHERE topics_fts MATCH 'basics'"))
+            result = stats, leaderboard, found.scalars().all()
+        await async_engine.dispose()
+        return result
+
+    stats, leaderboard, search = asyncio.run(read_back())
+    assert (stats.topic, stats.attempts, stats.total_score, stats.total_questions, stats.best_score) == (
+        "python", 3, 12, 15, 5
+    )
+    assert stats.last_completed_at == datetime(2026, 1, 3)
+    assert [(r.user_name, r.topic) for r in leaderboard] == [("B", "python"), ("C", "python"), ("A", "python")]
+    assert search == ["Python basics"]
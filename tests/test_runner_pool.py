@@ -0,0 +1,53 @@
+import asyncio
+import sys
+import os
+from unittest.mock import patch
+from google.adk.agents import BaseAgent
+from google.adk.events import Event
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+# Set up path to import app correctly
+sys.path.insert(0, os.path.abspath(os.path.join(os.getcwd(), "src")))
+
+from app.agent.runner_pool import RunnerPool
+from app.services import generation
+
+class FakeEducator(BaseAgent):
+    """Answers every run with an initialize_quiz_session result, like the real agent's last step."""
+
+    async def _run_async_impl(self, ctx):
+        yield Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            content=types.Content(role="model", parts=[types.Part(
+                function_response=types.FunctionResponse(name="initialize_quiz_session", response={"result": 7})
+            )]),
+        )
+        # Never reached, generation stops reading once the session id is known
+        yield Event(author=self.name, invocation_id=ctx.invocation_id)
+
+def test_runner_pool_soak_keeps_sessions_flat():
+    """Thousands of generations reuse the pooled runners and leave no ADK sessions behind"""
+    agent = FakeEducator(name="FakeEducator")
+    pool = RunnerPool(size=2, runner_factory=lambda: InMemoryRunner(agent=agent, app_name="agents"))
+    live_counts = []
+
+    async def soak():
+        for batch in range(10):
+            results = await asyncio.gather(*(
+                generation._run_agent("Soak", 5, generation._noop_progress) for _ in range(200)
+            ))
+            assert set(results) == {7}
+            live_counts.append(await pool.live_sessions())
+
+    with patch.object(generation, "runner_pool", pool):
+        asyncio.run(soak())
+
+    assert live_counts == [0] * 10
+    assert pool.stats() == {
+        "runners": 2,
+        "max_runners": 2,
+        "sessions_created": 2000,
+        "sessions_deleted": 2000,
+    }